@@ -1,22 +1,28 @@
 import asyncio
 import json
+import os
 import uuid
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Any, AsyncIterable, List
 from dotenv import load_dotenv
 
-import httpx
 import nest_asyncio
 import asyncio
 
-from a2a.client import A2ACardResolver
 from a2a.types import (
     AgentCard,
+    Message,
     MessageSendParams,
+    Part,
     SendMessageRequest,
     SendMessageResponse,
     SendMessageSuccessResponse,
+    SendStreamingMessageRequest,
+    SendStreamingMessageSuccessResponse,
     Task,
+    TaskArtifactUpdateEvent,
+    TaskStatusUpdateEvent,
 )
 
 
@@ -35,17 +41,40 @@ from google.adk.tools.agent_tool import AgentTool
 from .sub_agents.tracking_agent import tracking_agent
 from .sub_agents.booking_agent import booking_agent
 from .sub_agents.faq_agent import faq_agent
+from .sub_agents.tool_runtime import tool_executor
 
 # Instantiate constants
 APP_NAME = "logistics-customer-support"
 #MODEL="gemini-2.0-flash"
 MODEl = "gemini-2.5-pro-preview-05-06"
 
-from .remote_agent_connection import RemoteAgentConnections
+from .remote_agent_connection import RemoteAgentConnections, close_shared_pool, get_shared_pool
+from .agent_card_cache import AgentCardDiscovery
+from .pre_router import PreRouter
+from .history_compactor import HistoryCompactor
+from .util.session_store import SqliteSessionService
 
 load_dotenv()
 nest_asyncio.apply()
 
+# Use the A2A streaming API for remote agents whose card advertises it
+REMOTE_STREAMING_ENABLED = os.environ.get("REMOTE_STREAMING_ENABLED", "true").lower() == "true"
+
+# Queue that HostAgent.stream drains while a turn is running. send_message
+# publishes partial remote output to it; it is unset outside of stream().
+_remote_updates: ContextVar[asyncio.Queue | None] = ContextVar("remote_updates", default=None)
+
+
+def _part_text(part: Part) -> str:
+    return getattr(part.root, "text", None) or ""
+
+
+def _publish_update(agent_name: str, kind: str, parts: list[Part]):
+    queue = _remote_updates.get()
+    text = "\n".join(t for t in (_part_text(p) for p in parts) if t)
+    if queue is not None and text:
+        queue.put_nowait(("update", {"agent": agent_name, "kind": kind, "text": text}))
+
 class HostAgent:
     """The Host agent."""
 
@@ -55,38 +84,73 @@ class HostAgent:
         self.remote_agent_connections: dict[str, RemoteAgentConnections] = {}
         self.cards: dict[str, AgentCard] = {}
         self.agents: str = ""
+        self._history_compactor = HistoryCompactor()
         self._agent = self.create_agent()
         self._user_id = "host_agent"
         self._runner = Runner(
             app_name=self._agent.name,
             agent=self._agent,
             artifact_service=InMemoryArtifactService(),
-            session_service=InMemorySessionService(),
+            session_service=SqliteSessionService(),
             memory_service=InMemoryMemoryService(),
         )
+        self._pre_router = PreRouter()
+        self._direct_runners = self._create_direct_runners()
 
-    async def _async_init_components(self, remote_agent_addresses: List[str]):
-        async with httpx.AsyncClient(timeout=30) as client:
-            for address in remote_agent_addresses:
-                card_resolver = A2ACardResolver(client, address)
-                try:
-                    card = await card_resolver.get_agent_card()
-                    remote_connection = RemoteAgentConnections(
-                        agent_card=card, agent_url=address
-                    )
-                    self.remote_agent_connections[card.name] = remote_connection
-                    self.cards[card.name] = card
-                except httpx.ConnectError as e:
-                    print(f"ERROR: Failed to get agent card from {address}: {e}")
-                except Exception as e:
-                    print(f"ERROR: Failed to initialize connection for {address}: {e}")
+    def _create_direct_runners(self) -> dict[str, Runner]:
+        """Runners used by the pre-router to reach a sub-agent without the root LLM.
 
+        They share the host runner's services and app name, so a routed turn
+        lands in the same session history as a turn handled by the root agent.
+        Each runs a copy of the sub-agent whose model calls go through the
+        history compactor first, since it replays the whole shared session.
+        """
+        return {
+            sub_agent.name: Runner(
+                app_name=self._agent.name,
+                agent=sub_agent.model_copy(update={
+                    "before_model_callback": self._history_compactor.chain(sub_agent.before_model_callback),
+                }),
+                artifact_service=self._runner.artifact_service,
+                session_service=self._runner.session_service,
+                memory_service=self._runner.memory_service,
+            )
+            for sub_agent in (tracking_agent, booking_agent, faq_agent)
+        }
+
+    async def _async_init_components(self, remote_agent_addresses: List[str]):
+        discovery = AgentCardDiscovery()
+        cards = await discovery.resolve(remote_agent_addresses)
+        for address, card in cards.items():
+            try:
+                await self.replace_agent_card(card, address)
+            except Exception as e:
+                print(f"ERROR: Failed to initialize connection for {address}: {e}")
+        if not self.cards:
+            self.agents = "No friends found"
+        print("agent_info:", self.agents)
+
+    def register_agent_card(self, card: AgentCard, address: str) -> RemoteAgentConnections | None:
+        """Adds or replaces the connection for a resolved remote agent card.
+
+        Returns the connection that was replaced, if any; the caller closes it.
+        """
+        remote_connection = RemoteAgentConnections(agent_card=card, agent_url=address)
+        replaced = self.remote_agent_connections.get(card.name)
+        self.remote_agent_connections[card.name] = remote_connection
+        self.cards[card.name] = card
         agent_info = [
             json.dumps({"name": card.name, "description": card.description})
             for card in self.cards.values()
         ]
-        print("agent_info:", agent_info)
         self.agents = "\n".join(agent_info) if agent_info else "No friends found"
+        return replaced
+
+    async def replace_agent_card(self, card: AgentCard, address: str):
+        """Registers a card and closes the connection it replaces."""
+        replaced = self.register_agent_card(card, address)
+        if replaced is not None:
+            await replaced.aclose()
 
     @classmethod
     async def create(
@@ -97,11 +161,24 @@ class HostAgent:
         await instance._async_init_components(remote_agent_addresses)
         return instance
 
+    def pool_metrics(self) -> dict:
+        """Saturation metrics of the HTTP pool shared by all remote agents."""
+        return get_shared_pool().metrics()
+
+    def tool_metrics(self) -> dict:
+        """Queue depth and latency of the executor that runs the blocking sub-agent tools."""
+        return tool_executor.metrics()
+
+    async def aclose(self):
+        """Closes the shared HTTP pool used by the remote agent connections."""
+        await close_shared_pool()
+
     def create_agent(self) -> Agent:
         return Agent(
             model="gemini-2.5-flash-preview-04-17",
             name="Host_Agent",
             instruction=self.root_instruction,
+            before_model_callback=self._history_compactor.before_model_callback,
             description="Main agent for Glide Logistics company's customer support"
             "Handles customer interaction, delegates to agents",
             tools=[
@@ -157,28 +234,64 @@ class HostAgent:
                 state={},
                 session_id=session_id,
             )
-        async for event in self._runner.run_async(
-            user_id=self._user_id, session_id=session.id, new_message=content
-        ):
-            if event.is_final_response():
-                response = ""
-                if (
-                    event.content
-                    and event.content.parts
-                    and event.content.parts[0].text
+        runner = self._runner
+        decision = self._pre_router.route(query)
+        if decision and decision.intent in self._direct_runners:
+            print(f"Pre-routed to {decision.intent} (confidence {decision.confidence})")
+            runner = self._direct_runners[decision.intent]
+
+        # The runner is pumped on its own task so partial output published by
+        # remote agents can be yielded while a tool call is still running.
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def _pump():
+            _remote_updates.set(queue)
+            try:
+                async for event in runner.run_async(
+                    user_id=self._user_id, session_id=session.id, new_message=content
                 ):
-                    response = "\n".join(
-                        [p.text for p in event.content.parts if p.text]
-                    )
-                yield {
-                    "is_task_complete": True,
-                    "content": response,
-                }
-            else:
-                yield {
-                    "is_task_complete": False,
-                    "updates": "The host agent is thinking...",
-                }
+                    queue.put_nowait(("event", event))
+            except Exception as e:
+                queue.put_nowait(("error", e))
+            finally:
+                queue.put_nowait(("done", None))
+
+        pump_task = asyncio.create_task(_pump())
+        try:
+            while True:
+                kind, item = await queue.get()
+                if kind == "done":
+                    break
+                if kind == "error":
+                    raise item
+                if kind == "update":
+                    yield {
+                        "is_task_complete": False,
+                        "updates": item["text"],
+                        "source": item["agent"],
+                    }
+                elif item.is_final_response():
+                    response = ""
+                    if (
+                        item.content
+                        and item.content.parts
+                        and item.content.parts[0].text
+                    ):
+                        response = "\n".join(
+                            [p.text for p in item.content.parts if p.text]
+                        )
+                    yield {
+                        "is_task_complete": True,
+                        "content": response,
+                    }
+                else:
+                    yield {
+                        "is_task_complete": False,
+                        "updates": "The host agent is thinking...",
+                    }
+        finally:
+            if not pump_task.done():
+                pump_task.cancel()
 
     async def send_message(self, agent_name: str, task: str, tool_context: ToolContext):
         """Sends a task to a remote friend agent."""
@@ -212,9 +325,11 @@ class HostAgent:
 
         print(f"Payload prepared: {payload}")
 
-        message_request = SendMessageRequest(
-            id=message_id, params=MessageSendParams.model_validate(payload)
-        )
+        params = MessageSendParams.model_validate(payload)
+        if REMOTE_STREAMING_ENABLED and client.card.capabilities.streaming:
+            return await self._send_message_streaming(agent_name, client, message_id, params)
+
+        message_request = SendMessageRequest(id=message_id, params=params)
         send_response: SendMessageResponse = await client.send_message(message_request)
         print("send_response", send_response)
 
@@ -224,16 +339,53 @@ class HostAgent:
             print("Received a non-success or non-task response. Cannot proceed.")
             return
 
-        response_content = send_response.root.model_dump_json(exclude_none=True)
-        json_content = json.loads(response_content)
-
         resp = []
-        if json_content.get("result", {}).get("artifacts"):
-            for artifact in json_content["result"]["artifacts"]:
-                if artifact.get("parts"):
-                    resp.extend(artifact["parts"])
+        for artifact in send_response.root.result.artifacts or []:
+            resp.extend(p.model_dump(mode="json", exclude_none=True) for p in artifact.parts)
         return resp
 
+    async def _send_message_streaming(
+        self,
+        agent_name: str,
+        client: RemoteAgentConnections,
+        message_id: str,
+        params: MessageSendParams,
+    ):
+        """Streams a task from a remote agent, publishing partial output as it arrives.
+
+        Returns the same list of artifact parts as the blocking path once the
+        remote task has finished.
+        """
+        message_request = SendStreamingMessageRequest(id=message_id, params=params)
+        artifacts: dict[str, list[Part]] = {}
+        async for chunk in client.send_message_streaming(message_request):
+            if not isinstance(chunk.root, SendStreamingMessageSuccessResponse):
+                print(f"Received an error from {agent_name} while streaming: {chunk.root}")
+                break
+            result = chunk.root.result
+            if isinstance(result, TaskArtifactUpdateEvent):
+                artifact = result.artifact
+                if result.append and artifact.artifactId in artifacts:
+                    artifacts[artifact.artifactId].extend(artifact.parts)
+                else:
+                    artifacts[artifact.artifactId] = list(artifact.parts)
+                _publish_update(agent_name, "artifact", artifact.parts)
+            elif isinstance(result, TaskStatusUpdateEvent):
+                if result.status.message:
+                    _publish_update(agent_name, "status", result.status.message.parts)
+            elif isinstance(result, Task):
+                for artifact in result.artifacts or []:
+                    artifacts[artifact.artifactId] = list(artifact.parts)
+            elif isinstance(result, Message):
+                _publish_update(agent_name, "message", result.parts)
+                artifacts[result.messageId] = list(result.parts)
+
+        return [
+            p.model_dump(mode="json", exclude_none=True)
+            for parts in artifacts.values()
+            for p in parts
+        ]
+
 
 def _get_initialized_host_agent_sync():
     """Synchronously creates and initializes the HostAgent."""
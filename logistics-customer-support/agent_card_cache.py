@@ -0,0 +1,172 @@
+"""
+Concurrent agent card discovery with an on-disk cache.
+
+Cards are fetched for all remote agent addresses at once, each with its own
+timeout. The last-known cards are kept on disk together with their ETag, so a
+cold start serves fresh cached cards without a request. Stale cached cards
+are revalidated with a conditional request, bounded by the same per-address
+timeout, and served as they are if the agent cannot be reached in time.
+
+Revalidation is awaited rather than left to a background task: discovery
+runs once at startup on a short-lived event loop (asyncio.run), which
+cancels pending tasks when it returns.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import httpx
+from a2a.types import AgentCard
+
+AGENT_CARD_PATH = "/.well-known/agent.json"
+DEFAULT_CACHE_PATH = os.environ.get(
+    "AGENT_CARD_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".agent_card_cache.json"),
+)
+DEFAULT_CARD_TTL_SECONDS = float(os.environ.get("AGENT_CARD_TTL_SECONDS", 300))
+DEFAULT_CARD_TIMEOUT_SECONDS = float(os.environ.get("AGENT_CARD_TIMEOUT_SECONDS", 5))
+
+
+class AgentCardCache:
+    """A small JSON file holding the last-known card per agent address."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_CARD_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"WARNING: Ignoring unreadable agent card cache {self.path}: {e}")
+            return {}
+
+    def get(self, address: str) -> Optional[dict]:
+        with self._lock:
+            return self._entries.get(address)
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def put(self, address: str, card: dict, etag: Optional[str]) -> None:
+        with self._lock:
+            self._entries[address] = {"card": card, "etag": etag, "fetched_at": time.time()}
+            self._save()
+
+    def touch(self, address: str) -> None:
+        """Marks a cached card as revalidated (the server answered 304)."""
+        with self._lock:
+            if address in self._entries:
+                self._entries[address]["fetched_at"] = time.time()
+                self._save()
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"WARNING: Failed to write agent card cache {self.path}: {e}")
+
+
+async def fetch_agent_card(
+    client: httpx.AsyncClient,
+    address: str,
+    cache: AgentCardCache,
+    timeout: float = DEFAULT_CARD_TIMEOUT_SECONDS,
+) -> AgentCard:
+    """Fetches one agent card, revalidating the cached copy with its ETag."""
+    entry = cache.get(address)
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+
+    response = await asyncio.wait_for(
+        client.get(address.rstrip("/") + AGENT_CARD_PATH, headers=headers),
+        timeout=timeout,
+    )
+    if response.status_code == 304 and entry:
+        cache.touch(address)
+        return AgentCard.model_validate(entry["card"])
+
+    response.raise_for_status()
+    card_data = response.json()
+    card = AgentCard.model_validate(card_data)
+    cache.put(address, card_data, response.headers.get("ETag"))
+    return card
+
+
+class AgentCardDiscovery:
+    """Resolves agent cards for many addresses concurrently."""
+
+    def __init__(
+        self,
+        cache: Optional[AgentCardCache] = None,
+        timeout: float = DEFAULT_CARD_TIMEOUT_SECONDS,
+    ):
+        self.cache = cache or AgentCardCache()
+        self.timeout = timeout
+
+    async def _fetch_all(self, addresses: List[str]) -> Dict[str, AgentCard]:
+        if not addresses:
+            return {}
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            results = await asyncio.gather(
+                *(fetch_agent_card(client, address, self.cache, self.timeout) for address in addresses),
+                return_exceptions=True,
+            )
+        cards = {}
+        for address, result in zip(addresses, results):
+            if isinstance(result, asyncio.TimeoutError):
+                print(f"ERROR: Timed out after {self.timeout}s getting agent card from {address}")
+            elif isinstance(result, httpx.ConnectError):
+                print(f"ERROR: Failed to get agent card from {address}: {result}")
+            elif isinstance(result, Exception):
+                print(f"ERROR: Failed to resolve agent card for {address}: {result}")
+            else:
+                cards[address] = result
+        return cards
+
+    async def resolve(self, addresses: List[str]) -> Dict[str, AgentCard]:
+        """
+        Returns a card per reachable address.
+
+        Fresh cached cards are used as-is. Stale cached cards and addresses
+        with no cached card are fetched concurrently, each within the
+        per-address timeout. A stale card whose revalidation fails is still
+        returned.
+        """
+        cards: Dict[str, AgentCard] = {}
+        to_fetch: List[str] = []
+        for address in addresses:
+            entry = self.cache.get(address)
+            if entry is None:
+                to_fetch.append(address)
+                continue
+            try:
+                card = AgentCard.model_validate(entry["card"])
+            except Exception as e:
+                print(f"WARNING: Discarding invalid cached card for {address}: {e}")
+                to_fetch.append(address)
+                continue
+            # A stale card is kept in case its revalidation fails
+            cards[address] = card
+            if not self.cache.is_fresh(entry):
+                to_fetch.append(address)
+
+        fetched = await self._fetch_all(to_fetch)
+        for address in to_fetch:
+            if address in cards and address not in fetched:
+                print(f"WARNING: Serving the stale cached card for {address}")
+        cards.update(fetched)
+        return cards
@@ -16,6 +16,8 @@ from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 
 from util.util import load_instruction_from_file
+from util.runner_registry import RunnerRegistry
+from util.session_store import SqliteSessionService
 from sub_agents.tracking_agent import agent
 from sub_agents.tracking_agent import tracking_agent
 from sub_agents.booking_agent import booking_agent
@@ -48,7 +50,11 @@ except Exception as e:
 root_agent = logistics_coordinator_agent
 
 # Session
-session_service = InMemorySessionService()
+session_service = SqliteSessionService()
+
+# Runners are built once at startup and shared by all sessions
+runner_registry = RunnerRegistry(session_service=session_service)
+runner_registry.warm(APP_NAME, [logistics_coordinator_agent])
 
 #Root function call - can be called from other services
 async def call_agent(query, user_id, session_id):
@@ -70,9 +76,7 @@ async def call_agent(query, user_id, session_id):
         #print(f"Got session: {session.id}")
 
     
-    runner = Runner(
-        agent=logistics_coordinator_agent, app_name=APP_NAME, session_service=session_service
-    )
+    runner = runner_registry.get(APP_NAME, logistics_coordinator_agent)
 
     content = types.Content(role="user", parts=[types.Part(text=query)])
     #events = runner.run(user_id=user_id, session_id=session_id, new_message=content)
@@ -0,0 +1,227 @@
+"""
+Conversation history compaction for the Host_Agent and the sub-agents it runs
+directly.
+
+Once the replayed history of a session exceeds a token budget, the older
+turns are folded into one structured summary message carrying the booking and
+tracking details extracted so far. Only the most recent turns are sent to the
+model verbatim, so per-turn input stays roughly flat however long the
+conversation gets.
+
+The compacted prefix is kept in session state per agent. On the next turn,
+if the history still starts with that prefix, only the turns after it are
+summarized.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from .sub_agents.entity_patterns import EMAIL_PATTERN, SERVICE_LEVEL_PATTERN, TRACKING_NUMBER_PATTERN, WEIGHT_PATTERN
+
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", 4000))
+HISTORY_RECENT_TOKEN_BUDGET = int(os.environ.get("HISTORY_RECENT_TOKEN_BUDGET", HISTORY_TOKEN_BUDGET // 2))
+
+# Session state key holding the slots extracted from compacted turns
+COMPACTED_SLOTS_KEY = "compacted_slots"
+# Session state key prefix (":<agent name>" is appended) for the compacted prefix
+COMPACTED_PREFIX_KEY = "compacted_prefix"
+
+SUMMARY_MAX_LINES = 12
+SUMMARY_LINE_CHARS = 160
+MAX_TRACKING_NUMBERS = 10
+
+_ADDRESS_PATTERNS = {
+    "collection_address": re.compile(r"(?:collection|pick[- ]?up|from) address(?: is)?\s*[:\-]?\s*([^\n.;]+)", re.IGNORECASE),
+    "delivery_address": re.compile(r"(?:delivery|destination|to) address(?: is)?\s*[:\-]?\s*([^\n.;]+)", re.IGNORECASE),
+}
+_BOOKING_ID_PATTERN = re.compile(r"booking_id['\"]?\s*[:=]\s*['\"]?(\d+)")
+
+
+def _content_text(content: types.Content) -> str:
+    chunks = []
+    for part in content.parts or []:
+        if part.text:
+            chunks.append(part.text)
+        elif part.function_call:
+            chunks.append(json.dumps({"call": part.function_call.name, "args": part.function_call.args}, default=str))
+        elif part.function_response:
+            chunks.append(json.dumps({"result": part.function_response.name, "response": part.function_response.response}, default=str))
+    return "\n".join(chunks)
+
+
+def estimate_tokens(content: types.Content) -> int:
+    """Cheap token estimate (about four characters per token)."""
+    return len(_content_text(content)) // 4 + 1
+
+
+def _is_user_turn(content: types.Content) -> bool:
+    return content.role == "user" and any(part.text for part in content.parts or [])
+
+
+def extract_slots(contents: List[types.Content], slots: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Pulls booking and tracking details out of the given turns, newest value wins."""
+    slots = dict(slots or {})
+    tracking_numbers: List[str] = list(slots.get("tracking_numbers", []))
+    for content in contents:
+        text = _content_text(content)
+        for number in TRACKING_NUMBER_PATTERN.findall(text):
+            if number not in tracking_numbers:
+                tracking_numbers.append(number)
+        if content.role == "user":
+            if emails := EMAIL_PATTERN.findall(text):
+                slots["contact_email_address"] = emails[-1]
+            if weights := WEIGHT_PATTERN.findall(text):
+                slots["package_weight"] = float(weights[-1])
+            if levels := SERVICE_LEVEL_PATTERN.findall(text):
+                slots["service_level"] = levels[-1].upper()
+            for slot, pattern in _ADDRESS_PATTERNS.items():
+                if match := pattern.search(text):
+                    slots[slot] = match.group(1).strip()
+        if booking_ids := _BOOKING_ID_PATTERN.findall(text):
+            slots["booking_ids"] = sorted(set(slots.get("booking_ids", [])) | set(booking_ids))
+    if tracking_numbers:
+        slots["tracking_numbers"] = tracking_numbers[-MAX_TRACKING_NUMBERS:]
+    return slots
+
+
+def _digest(content: types.Content) -> str:
+    return hashlib.sha1(f"{content.role}\x1f{_content_text(content)}".encode("utf-8")).hexdigest()
+
+
+def _extend_prefix(prefix: Optional[Dict[str, Any]], older: List[types.Content], end: types.Content) -> Dict[str, Any]:
+    """Adds newly compacted turns to the prefix record, keeping the last SUMMARY_MAX_LINES lines."""
+    prefix = prefix or {"count": 0, "lines": [], "omitted": 0}
+    lines = list(prefix["lines"])
+    for content in older:
+        text = " ".join(_content_text(content).split())
+        if text:
+            lines.append(f"- {content.role}: {text[:SUMMARY_LINE_CHARS]}")
+    omitted = prefix["omitted"] + max(0, len(lines) - SUMMARY_MAX_LINES)
+    return {
+        "count": prefix["count"] + len(older),
+        "digest": _digest(end),
+        "lines": lines[-SUMMARY_MAX_LINES:],
+        "omitted": omitted,
+    }
+
+
+def _summarize(prefix: Dict[str, Any], slots: Dict[str, Any]) -> types.Content:
+    lines = list(prefix["lines"])
+    if prefix["omitted"]:
+        lines.insert(0, f"- ({prefix['omitted']} earlier messages omitted)")
+    summary = (
+        f"Summary of the earlier conversation ({prefix['count']} messages compacted):\n"
+        + "\n".join(lines)
+        + f"\nKnown booking and tracking details: {json.dumps(slots)}"
+    )
+    return types.Content(role="user", parts=[types.Part(text=summary)])
+
+
+class HistoryCompactor:
+    """A before_model_callback that keeps the replayed history within a token budget."""
+
+    def __init__(
+        self,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        recent_token_budget: int = HISTORY_RECENT_TOKEN_BUDGET,
+    ):
+        self.token_budget = token_budget
+        self.recent_token_budget = min(recent_token_budget, token_budget)
+
+    def _split_index(self, contents: List[types.Content]) -> int:
+        """Index of the first turn kept verbatim.
+
+        The split always lands on a user text message so function calls and
+        their responses are never separated.
+        """
+        kept = 0
+        split = len(contents)
+        for index in range(len(contents) - 1, -1, -1):
+            kept += estimate_tokens(contents[index])
+            if kept > self.recent_token_budget:
+                break
+            split = index
+        while split < len(contents) and not _is_user_turn(contents[split]):
+            split += 1
+        if split >= len(contents):
+            # The latest exchange alone is over budget, keep from the last user message
+            user_turns = [i for i, content in enumerate(contents) if _is_user_turn(content)]
+            split = user_turns[-1] if user_turns else len(contents)
+        return split
+
+    def compact(
+        self,
+        contents: List[types.Content],
+        slots: Optional[Dict[str, Any]] = None,
+        prefix: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Returns (contents, slots, prefix), with older turns folded into a summary if over budget.
+
+        prefix is the record returned for an earlier call. If contents still
+        start with the turns it covers, its summary is reused and only later
+        turns are summarized.
+        """
+        count = prefix["count"] if prefix else 0
+        if not (prefix and 0 < count <= len(contents) and _digest(contents[count - 1]) == prefix["digest"]):
+            prefix, count = None, 0
+        remaining = contents[count:]
+        tokens = sum(estimate_tokens(c) for c in remaining)
+        if prefix is not None:
+            tokens += estimate_tokens(_summarize(prefix, slots or {}))
+        if tokens > self.token_budget:
+            split = self._split_index(remaining)
+            if (prefix is not None or split > 1) and 0 < split < len(remaining):
+                slots = extract_slots(remaining[:split], slots)
+                prefix = _extend_prefix(prefix, remaining[:split], remaining[split - 1])
+                remaining = remaining[split:]
+        if prefix is None:
+            return contents, slots, None
+        return [_summarize(prefix, slots or {})] + remaining, slots, prefix
+
+    def before_model_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        state = callback_context.state
+        prefix_key = f"{COMPACTED_PREFIX_KEY}:{callback_context.agent_name}"
+        previous = state.get(prefix_key)
+        contents, slots, prefix = self.compact(llm_request.contents, state.get(COMPACTED_SLOTS_KEY), previous)
+        if contents is not llm_request.contents:
+            llm_request.contents = contents
+        if prefix is not None and prefix != previous:
+            print(f"Compacted history of {callback_context.agent_name}: {prefix['count']} messages summarized")
+            state[prefix_key] = prefix
+            state[COMPACTED_SLOTS_KEY] = slots
+        return None
+
+    def chain(self, callback: Optional[Callable] = None) -> Callable:
+        """
+        Returns a before_model_callback that compacts the history and then
+        runs the agent's own callback(s), if any.
+        """
+        callbacks = [self.before_model_callback]
+        if isinstance(callback, list):
+            callbacks.extend(callback)
+        elif callback is not None:
+            callbacks.append(callback)
+
+        async def before_model_callback(
+            callback_context: CallbackContext, llm_request: LlmRequest
+        ) -> Optional[LlmResponse]:
+            for each in callbacks:
+                response = each(callback_context=callback_context, llm_request=llm_request)
+                if inspect.isawaitable(response):
+                    response = await response
+                if response is not None:
+                    return response
+            return None
+
+        return before_model_callback
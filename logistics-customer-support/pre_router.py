@@ -0,0 +1,135 @@
+"""
+Deterministic pre-routing stage for the Host_Agent.
+
+Classifies an incoming customer message with compiled keyword rules and
+entity patterns before the root LLM is involved. High-confidence matches
+are dispatched straight to the matching sub-agent; everything else falls
+through to the root model as before.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Pattern
+
+from .sub_agents.entity_patterns import (
+    BOOKING_KEYWORD_PATTERN,
+    EMAIL_PATTERN,
+    PACKAGING_KEYWORD_PATTERN,
+    SERVICE_LEVEL_PATTERN,
+    TRACKING_KEYWORD_PATTERN,
+    TRACKING_NUMBER_PATTERN,
+    WEIGHT_PATTERN,
+    keyword_pattern as _keywords,
+)
+
+# Intents the pre-router can emit. They match the sub-agent names so the
+# host agent can look the target up directly.
+TRACKING_INTENT = "tracking_agent"
+BOOKING_INTENT = "booking_agent"
+FAQ_INTENT = "faq_agent"
+
+DEFAULT_CONFIDENCE_THRESHOLD = float(os.environ.get("PRE_ROUTER_THRESHOLD", 0.8))
+
+
+
+@dataclass
+class RoutingRule:
+    """A weighted rule contributing confidence towards one intent."""
+
+    intent: str
+    pattern: Pattern[str]
+    weight: float
+    entity: Optional[str] = None
+
+
+@dataclass
+class RouteDecision:
+    """Result of classifying a single message."""
+
+    intent: Optional[str]
+    confidence: float
+    scores: Dict[str, float] = field(default_factory=dict)
+    entities: Dict[str, List[str]] = field(default_factory=dict)
+
+    def is_confident(self, threshold: float = DEFAULT_CONFIDENCE_THRESHOLD) -> bool:
+        return self.intent is not None and self.confidence >= threshold
+
+
+DEFAULT_RULES: List[RoutingRule] = [
+    # Tracking: an explicit tracking number is the strongest signal
+    RoutingRule(TRACKING_INTENT, TRACKING_NUMBER_PATTERN, 0.6, entity="tracking_number"),
+    RoutingRule(TRACKING_INTENT, TRACKING_KEYWORD_PATTERN, 0.4),
+    RoutingRule(TRACKING_INTENT, _keywords("parcel", "package", "shipment", "consignment"), 0.1),
+    # Booking
+    RoutingRule(BOOKING_INTENT, BOOKING_KEYWORD_PATTERN, 0.6),
+    RoutingRule(BOOKING_INTENT, _keywords("collection address", "delivery address", "pick up", "pickup"), 0.2),
+    RoutingRule(BOOKING_INTENT, SERVICE_LEVEL_PATTERN, 0.2, entity="service_level"),
+    RoutingRule(BOOKING_INTENT, WEIGHT_PATTERN, 0.15, entity="package_weight"),
+    RoutingRule(BOOKING_INTENT, EMAIL_PATTERN, 0.1, entity="contact_email_address"),
+    # Packaging FAQ
+    RoutingRule(FAQ_INTENT, PACKAGING_KEYWORD_PATTERN, 0.5),
+    RoutingRule(FAQ_INTENT, _keywords("liquid", "liquids", "fragile", "glass", "batteries", "battery", "perishable"), 0.3),
+    RoutingRule(FAQ_INTENT, re.compile(r"^\s*(?:how|what|can|should|is|are)\b.*\?\s*$", re.IGNORECASE), 0.15),
+]
+
+
+class PreRouter:
+    """
+    Scores a message against a set of compiled routing rules.
+
+    Rules for the same intent add up (capped at 1.0). The winning intent must
+    also beat the runner-up by a margin, so mixed messages such as
+    "track 123456789 and book a new pickup" are left to the root LLM.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[List[RoutingRule]] = None,
+        threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+        margin: float = 0.3,
+    ):
+        self.rules = list(rules) if rules is not None else list(DEFAULT_RULES)
+        self.threshold = threshold
+        self.margin = margin
+
+    def add_rule(self, rule: RoutingRule) -> None:
+        self.rules.append(rule)
+
+    def classify(self, message: str) -> RouteDecision:
+        scores: Dict[str, float] = {}
+        entities: Dict[str, List[str]] = {}
+        if not message or not message.strip():
+            return RouteDecision(intent=None, confidence=0.0)
+
+        for rule in self.rules:
+            matches = rule.pattern.findall(message)
+            if not matches:
+                continue
+            scores[rule.intent] = min(1.0, scores.get(rule.intent, 0.0) + rule.weight)
+            if rule.entity:
+                values = [m if isinstance(m, str) else m[0] for m in matches]
+                entities.setdefault(rule.entity, []).extend(values)
+
+        if not scores:
+            return RouteDecision(intent=None, confidence=0.0, entities=entities)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        intent, confidence = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if confidence - runner_up < self.margin:
+            # Ambiguous between intents, report the lower confidence
+            confidence = confidence - runner_up
+        return RouteDecision(
+            intent=intent,
+            confidence=round(confidence, 3),
+            scores={name: round(score, 3) for name, score in scores.items()},
+            entities=entities,
+        )
+
+    def route(self, message: str) -> Optional[RouteDecision]:
+        """Returns the decision if it is confident enough to bypass the root LLM."""
+        decision = self.classify(message)
+        if decision.is_confident(self.threshold):
+            return decision
+        return None
@@ -1,4 +1,8 @@
-from typing import Callable
+import asyncio
+import os
+import time
+import weakref
+from typing import AsyncIterator, Callable, Optional
 
 import httpx
 from a2a.client import A2AClient
@@ -6,6 +10,8 @@ from a2a.types import (
     AgentCard,
     SendMessageRequest,
     SendMessageResponse,
+    SendStreamingMessageRequest,
+    SendStreamingMessageResponse,
     Task,
     TaskArtifactUpdateEvent,
     TaskStatusUpdateEvent,
@@ -17,20 +23,233 @@ load_dotenv()
 TaskCallbackArg = Task | TaskStatusUpdateEvent | TaskArtifactUpdateEvent
 TaskUpdateCallback = Callable[[TaskCallbackArg, AgentCard], Task]
 
+POOL_MAX_CONNECTIONS = int(os.environ.get("A2A_POOL_MAX_CONNECTIONS", 100))
+POOL_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("A2A_POOL_MAX_KEEPALIVE_CONNECTIONS", 20))
+POOL_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get("A2A_POOL_KEEPALIVE_EXPIRY_SECONDS", 30))
+POOL_PER_HOST_LIMIT = int(os.environ.get("A2A_POOL_PER_HOST_LIMIT", 10))
+POOL_HTTP2 = os.environ.get("A2A_POOL_HTTP2", "true").lower() == "true"
+POOL_TIMEOUT_SECONDS = float(os.environ.get("A2A_POOL_TIMEOUT_SECONDS", 30))
+
+
+class PoolStats:
+    """Counters describing how close the shared pool is to saturation."""
+
+    def __init__(self, per_host_limit: int):
+        self.per_host_limit = per_host_limit
+        self.requests_total = 0
+        self.errors_total = 0
+        self.saturated_total = 0
+        self.wait_seconds_total = 0.0
+        self.in_flight: dict[str, int] = {}
+        self.waiting: dict[str, int] = {}
+        self.peak_in_flight: dict[str, int] = {}
+
+    def snapshot(self) -> dict:
+        hosts = {}
+        for host in set(self.in_flight) | set(self.waiting):
+            in_flight = self.in_flight.get(host, 0)
+            hosts[host] = {
+                "in_flight": in_flight,
+                "waiting": self.waiting.get(host, 0),
+                "peak_in_flight": self.peak_in_flight.get(host, 0),
+                "utilization": in_flight / self.per_host_limit if self.per_host_limit else 0.0,
+            }
+        return {
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "saturated_total": self.saturated_total,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "per_host_limit": self.per_host_limit,
+            "hosts": hosts,
+        }
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response stream that frees its per-host slot once the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class _HostLimitedTransport(httpx.AsyncBaseTransport):
+    """Caps concurrent requests per host and records pool saturation."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, per_host_limit: int, stats: PoolStats):
+        self._transport = transport
+        self._per_host_limit = per_host_limit
+        self._stats = stats
+        # Semaphores belong to an event loop, so keep one set per loop, keyed
+        # by the loop object itself (a new loop can reuse a closed one's id)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            for closed in [other for other in self._semaphores if other.is_closed()]:
+                del self._semaphores[closed]
+        semaphores = self._semaphores.setdefault(loop, {})
+        if host not in semaphores:
+            semaphores[host] = asyncio.Semaphore(self._per_host_limit)
+        return semaphores[host]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self._stats
+        host = request.url.host
+        semaphore = self._semaphore(host)
+        stats.requests_total += 1
+        if semaphore.locked():
+            stats.saturated_total += 1
+        stats.waiting[host] = stats.waiting.get(host, 0) + 1
+        started = time.perf_counter()
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.waiting[host] -= 1
+        stats.wait_seconds_total += time.perf_counter() - started
+        stats.in_flight[host] = stats.in_flight.get(host, 0) + 1
+        stats.peak_in_flight[host] = max(stats.peak_in_flight.get(host, 0), stats.in_flight[host])
+
+        def release():
+            stats.in_flight[host] -= 1
+            semaphore.release()
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e:
+            # Includes CancelledError, when a caller gives up on the request
+            if isinstance(e, Exception):
+                stats.errors_total += 1
+            release()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, release),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class SharedHttpPool:
+    """
+    One keep-alive HTTP connection pool shared by all remote agent connections.
+
+    The underlying client is created lazily on first use and must be closed
+    with aclose() on shutdown.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = POOL_MAX_CONNECTIONS,
+        max_keepalive_connections: int = POOL_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = POOL_KEEPALIVE_EXPIRY_SECONDS,
+        per_host_limit: int = POOL_PER_HOST_LIMIT,
+        http2: bool = POOL_HTTP2,
+        timeout: float = POOL_TIMEOUT_SECONDS,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.per_host_limit = per_host_limit
+        self.http2 = http2 and self._http2_available()
+        self.timeout = timeout
+        self.stats = PoolStats(per_host_limit)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @staticmethod
+    def _http2_available() -> bool:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("WARNING: h2 is not installed, the shared A2A pool falls back to HTTP/1.1")
+            return False
+        return True
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            transport = _HostLimitedTransport(
+                httpx.AsyncHTTPTransport(http2=self.http2, limits=self.limits),
+                self.per_host_limit,
+                self.stats,
+            )
+            self._client = httpx.AsyncClient(transport=transport, timeout=self.timeout)
+        return self._client
+
+    def metrics(self) -> dict:
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            **self.stats.snapshot(),
+        }
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_shared_pool: Optional[SharedHttpPool] = None
+
+
+def get_shared_pool() -> SharedHttpPool:
+    """Returns the process-wide pool, creating it on first use."""
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = SharedHttpPool()
+    return _shared_pool
+
+
+async def close_shared_pool() -> None:
+    global _shared_pool
+    if _shared_pool is not None:
+        await _shared_pool.aclose()
+        _shared_pool = None
+
 
 class RemoteAgentConnections:
     """A class to hold the connections to the remote agents."""
 
-    def __init__(self, agent_card: AgentCard, agent_url: str):
+    def __init__(self, agent_card: AgentCard, agent_url: str, pool: Optional[SharedHttpPool] = None):
         print(f"agent_card: {agent_card}")
         print(f"agent_url: {agent_url}")
-        self._httpx_client = httpx.AsyncClient(timeout=30)
-        self.agent_client = A2AClient(self._httpx_client, agent_card, url=agent_url)
+        self._pool = pool or get_shared_pool()
+        self._agent_url = agent_url
+        self._agent_client: Optional[A2AClient] = None
         self.card = agent_card
         self.conversation_name = None
         self.conversation = None
         self.pending_tasks = set()
 
+    @property
+    def agent_client(self) -> A2AClient:
+        # Rebuild if the shared pool has been closed and reopened since
+        http_client = self._pool.client
+        if self._agent_client is None or self._agent_client.httpx_client is not http_client:
+            self._agent_client = A2AClient(http_client, self.card, url=self._agent_url)
+        return self._agent_client
+
     def get_agent(self) -> AgentCard:
         return self.card
 
@@ -38,3 +257,20 @@ class RemoteAgentConnections:
         self, message_request: SendMessageRequest
     ) -> SendMessageResponse:
         return await self.agent_client.send_message(message_request)
+
+    async def send_message_streaming(
+        self, message_request: SendStreamingMessageRequest
+    ) -> AsyncIterator[SendStreamingMessageResponse]:
+        async for response in self.agent_client.send_message_streaming(message_request):
+            yield response
+
+    async def aclose(self) -> None:
+        """Waits for this connection's pending tasks and drops its A2A client.
+
+        The HTTP pool is shared with the other connections and stays open; it
+        is closed with close_shared_pool() on shutdown.
+        """
+        if self.pending_tasks:
+            await asyncio.gather(*self.pending_tasks, return_exceptions=True)
+            self.pending_tasks.clear()
+        self._agent_client = None
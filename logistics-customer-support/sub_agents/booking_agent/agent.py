@@ -1,14 +1,27 @@
+import sqlite3
+import uuid
+
 from google.adk import Agent
-import random
+from google.adk.tools.tool_context import ToolContext
+
+from ..tool_runtime import offload_tool
+from .id_allocator import booking_id_allocator
+from .ledger import get_booking_ledger
+from .rates import quote_options
+from .slots import before_model_callback, reset_booking_slots, validate_booking
 
 MODEl = "gemini-2.5-pro-preview-05-06"
 
+# Per-conversation part of the booking idempotency key
+BOOKING_SESSION_KEY_STATE_KEY = "booking_session_key"
+
 def booking_tool(collection_address: str, 
                  delivery_address: str, 
                  package_description: str,
                  package_weight:float,
                  service_level: str,
-                 contact_email_address: str
+                 contact_email_address: str,
+                 tool_context: ToolContext
                  ) -> dict:
     """Creates a new booking based on booking information shared
 
@@ -19,6 +32,7 @@ def booking_tool(collection_address: str,
             package_weight: Weight of the package in kgs
             service_level: Choice between "ECONOMY" and "EXPRESS"
             contact_email_address: Valid Email address
+            tool_context: The tool context
         Returns:
             A dictionary indicating the status
 
@@ -29,24 +43,68 @@ def booking_tool(collection_address: str,
             package_weight='1',
             service_level='EXPRESS',
             contact_email_address='contact@gmail.com')
-            {'status': 'success', 'booking_id':'10155'}
+            {'status': 'success', 'booking_id':'237056244197036032'}
     """    
 
     print(f"Booking Details: \n collection_address: {collection_address} \n delivery_address: {delivery_address} \n  package_description:  {package_description} \n package_weight: {package_weight} \n" +
             f"service_level: {service_level} \n contact_email_address: {contact_email_address}")
     
-    #Call the API to get the Booking Created
-    booking_id = generate_booking_id()
-    result = "{'status': 'success', 'booking_id':" + booking_id + "}"
+    # Repeated calls with the same details in this conversation return the existing booking
+    session_key = tool_context.state.get(BOOKING_SESSION_KEY_STATE_KEY)
+    if not session_key:
+        session_key = uuid.uuid4().hex
+        tool_context.state[BOOKING_SESSION_KEY_STATE_KEY] = session_key
+
+    fields, errors = validate_booking({
+        "collection_address": collection_address,
+        "delivery_address": delivery_address,
+        "package_description": package_description,
+        "package_weight": package_weight,
+        "service_level": service_level,
+        "contact_email_address": contact_email_address,
+    })
+    if errors:
+        print(f"Booking rejected: {errors}")
+        return {"status": "error", "message": "Invalid booking details", "errors": errors}
+
+    try:
+        booking, created = get_booking_ledger().record_booking(session_key, fields)
+    except sqlite3.IntegrityError as e:
+        print(f"Booking could not be stored: {e}")
+        return {"status": "error", "message": "The booking could not be stored, please try again"}
+    reset_booking_slots(tool_context.state)
+    result = {"status": "success", "booking_id": str(booking["booking_id"])}
+    if not created:
+        result["message"] = "A booking with these details was already created in this conversation"
 
     print(f"Result of Booking: {result}")
     
     return result
 
 
+def quote_tool(collection_address: str,
+               delivery_address: str,
+               package_weight: float
+               ) -> dict:
+    """Quotes the price of a parcel for both the ECONOMY and EXPRESS service levels
+
+        Args:
+            collection_address: Address from where the package needs to be collected
+            delivery_address: Address to where the package needs to be delivered
+            package_weight: Weight of the package in kgs
+        Returns:
+            A dictionary with the price per service level and the currency
+    """
+    try:
+        result = quote_options(collection_address, delivery_address, float(package_weight))
+    except (TypeError, ValueError) as e:
+        return {"status": "error", "message": str(e)}
+    print(f"Quote: {result}")
+    return result
+
+
 def generate_booking_id():
-    last_two_digits = random.randint(0, 99)
-    return f"101{last_two_digits:02d}"
+    return str(booking_id_allocator.next_id())
 
 booking_agent = None
 
@@ -63,6 +121,8 @@ BOOKING_AGENT_INSTRUCTIONS="""
         - contact_email_address - Valid email address 
 
         If any of the information is missing or incorrect, you must ask the user to provide the correct information.
+        The system extracts and validates the fields for you and adds a "Booking slot status" section to these
+        instructions. Trust it, and ask only for the field it tells you to ask for next.
 
         Do not proceed untill all the information is correct and complete
         Once all the information is gathered and validated, you must always ask for explicit confirmation from the user for every new booking request.
@@ -70,6 +130,8 @@ BOOKING_AGENT_INSTRUCTIONS="""
 
         Tools:
         - booking_tool - Use this tool to create a new booking in the system
+        - quote_tool - Use this tool to get the ECONOMY and EXPRESS price once the addresses and weight are known,
+          and whenever the user asks what a shipment costs. Never estimate prices yourself.
 
         Format the response from the tool  in a user friendly manner and share with the user. 
               
@@ -80,7 +142,8 @@ try:
         model=MODEl,
         name="booking_agent",
         instruction=BOOKING_AGENT_INSTRUCTIONS,
-        tools=[booking_tool]
+        tools=[offload_tool(booking_tool), quote_tool],
+        before_model_callback=before_model_callback,
     )
 except Exception as e:
     print(f"Error in creating booking_agent. Error: {e}")
\ No newline at end of file
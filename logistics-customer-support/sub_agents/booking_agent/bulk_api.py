@@ -0,0 +1,251 @@
+"""
+Bulk booking import and quote API.
+
+POST a CSV file (with a header row of booking field names) or a JSONL file (one
+booking object per line) as the raw request body:
+
+    curl -X POST "http://localhost:8090/bookings/bulk?format=csv&import_id=acme-2025-06-11" \
+         --data-binary @bookings.csv
+
+The body is read as a stream, line by line. A CSV header with unknown
+columns is rejected with a 400 before any result is streamed. Rows are checked with the same
+validation rules as booking_tool. Valid rows are written to the booking
+ledger in batches, with IDs allocated one block per batch. One NDJSON result
+per row is streamed back as soon as its batch is written, followed by a
+summary line. Memory use depends on the batch size, not the file size.
+
+Re-posting a file with the same import_id returns the bookings already
+created for its rows instead of booking them twice.
+
+POST /quotes/bulk takes the same formats (collection_address,
+delivery_address, package_weight and service_level per row). It streams back
+one price per row. Rows are priced in vectorized batches of
+BULK_QUOTE_BATCH_SIZE.
+
+CSV fields must not contain line breaks.
+"""
+
+import codecs
+import csv
+import json
+import os
+import sqlite3
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from .ledger import get_booking_ledger
+from .rates import quote_parcels
+from .slots import SLOT_NAMES, validate_booking
+
+BULK_BOOKING_BATCH_SIZE = int(os.environ.get("BULK_BOOKING_BATCH_SIZE", 500))
+BULK_MAX_LINE_BYTES = int(os.environ.get("BULK_MAX_LINE_BYTES", 64 * 1024))
+BULK_QUOTE_BATCH_SIZE = int(os.environ.get("BULK_QUOTE_BATCH_SIZE", 10_000))
+
+app = FastAPI()
+
+
+class LineTooLongError(ValueError):
+    pass
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: Optional[int] = None) -> AsyncIterator[str]:
+    """Splits a byte stream into decoded lines without buffering more than one line."""
+    max_line_bytes = max_line_bytes or BULK_MAX_LINE_BYTES
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+
+    def check(line: str) -> str:
+        # Limits are in bytes, and a character can take up to 4 of them
+        if len(line) * 4 > max_line_bytes and len(line.encode("utf-8")) > max_line_bytes:
+            raise LineTooLongError(f"Line longer than {max_line_bytes} bytes")
+        return line
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield check(line).rstrip("\r")
+        check(pending)
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield check(pending).rstrip("\r")
+
+
+async def read_csv_header(lines: AsyncIterator[str]) -> List[str]:
+    """Reads the header row and checks its columns. Raises HTTPException(400) for unknown ones."""
+    try:
+        async for line in lines:
+            if not line.strip():
+                continue
+            header = [name.strip() for name in next(csv.reader([line]))]
+            unknown = set(header) - set(SLOT_NAMES)
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown CSV columns: {sorted(unknown)}")
+            return header
+    except (LineTooLongError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read the CSV header: {e}") from None
+    return []
+
+
+async def iter_rows(lines: AsyncIterator[str], fmt: str, header: Optional[List[str]] = None) -> AsyncIterator[tuple]:
+    """
+    Yields (row_number, fields, parse_error) for each non-empty data line.
+
+    For CSV, pass the header already read with read_csv_header.
+    """
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            if fmt == "csv":
+                fields = dict(zip(header, next(csv.reader([line]))))
+            else:
+                fields = json.loads(line)
+                if not isinstance(fields, dict):
+                    raise ValueError("row is not a JSON object")
+            yield row_number, fields, None
+        except (ValueError, csv.Error) as e:
+            yield row_number, None, f"Could not parse row: {e}"
+
+
+async def _write_batch(import_id: str, batch: List[tuple]) -> List[dict]:
+    """Writes the valid rows of a batch and returns one result per row, in order."""
+    valid = [(row, fields) for row, fields, error in batch if error is None]
+    entries = [(f"bulk:{import_id}:{row}", fields) for row, fields in valid]
+    written = dict(zip(
+        (row for row, _ in valid),
+        await run_in_threadpool(get_booking_ledger().record_bookings, entries),
+    ))
+    results = []
+    for row, _, error in batch:
+        if error is not None:
+            results.append({"row": row, "status": "error", "errors": error})
+        else:
+            booking, created = written[row]
+            results.append({"row": row, "status": "success", "booking_id": str(booking["booking_id"]), "duplicate": not created})
+    return results
+
+
+async def process_bulk_import(rows: AsyncIterator[tuple], import_id: str) -> AsyncIterator[str]:
+    counts: Dict[str, int] = {"rows": 0, "booked": 0, "duplicates": 0, "errors": 0}
+    batch: List[tuple] = []
+
+    async def flush():
+        for result in await _write_batch(import_id, batch):
+            counts["rows"] += 1
+            if result["status"] == "error":
+                counts["errors"] += 1
+            elif result["duplicate"]:
+                counts["duplicates"] += 1
+            else:
+                counts["booked"] += 1
+            yield json.dumps(result) + "\n"
+        batch.clear()
+
+    try:
+        async for row, fields, parse_error in rows:
+            if parse_error is not None:
+                batch.append((row, None, {"row": parse_error}))
+            else:
+                values, errors = validate_booking(fields)
+                batch.append((row, values, errors or None))
+            if len(batch) >= BULK_BOOKING_BATCH_SIZE:
+                async for line in flush():
+                    yield line
+        async for line in flush():
+            yield line
+    except LineTooLongError as e:
+        yield json.dumps({"status": "aborted", "message": str(e)}) + "\n"
+    except sqlite3.IntegrityError as e:
+        print(f"Bulk import {import_id} could not store a batch: {e}")
+        yield json.dumps({"status": "aborted", "message": "A batch could not be stored, re-post the file with the same import_id"}) + "\n"
+    yield json.dumps({"summary": {"import_id": import_id, **counts}}) + "\n"
+
+
+async def process_bulk_quotes(rows: AsyncIterator[tuple]) -> AsyncIterator[str]:
+    batch: List[tuple] = []
+
+    def flush() -> List[str]:
+        parcels = [fields for _, fields, error in batch if error is None]
+        quotes = iter(quote_parcels(parcels))
+        lines = []
+        for row, _, error in batch:
+            result = {"row": row, "error": error} if error is not None else {"row": row, **next(quotes)}
+            lines.append(json.dumps(result) + "\n")
+        batch.clear()
+        return lines
+
+    try:
+        async for row, fields, parse_error in rows:
+            batch.append((row, fields, parse_error))
+            if len(batch) >= BULK_QUOTE_BATCH_SIZE:
+                for line in flush():
+                    yield line
+        for line in flush():
+            yield line
+    except LineTooLongError as e:
+        yield json.dumps({"status": "aborted", "message": str(e)}) + "\n"
+
+
+class _RequestBodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for a body that is generated while the request body is read.
+
+    The stock response also listens for a disconnect on the same receive
+    channel under ASGI spec < 2.4 (uvicorn), which would swallow request body
+    chunks. A client that goes away still shows up as a failed send.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _request_format(request: Request, fmt: Optional[str]) -> str:
+    fmt = (fmt or "").lower()
+    if not fmt:
+        content_type = request.headers.get("content-type", "")
+        fmt = "csv" if "csv" in content_type else "jsonl"
+    if fmt not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'jsonl'")
+    return fmt
+
+
+async def _open_rows(request: Request, fmt: str) -> AsyncIterator[tuple]:
+    """Starts reading the body. A bad CSV header fails here, before the response starts."""
+    lines = iter_lines(request.stream())
+    header = await read_csv_header(lines) if fmt == "csv" else None
+    return iter_rows(lines, fmt, header)
+
+
+@app.post("/quotes/bulk")
+async def bulk_quotes(request: Request, format: Optional[str] = None):
+    rows = await _open_rows(request, _request_format(request, format))
+    return _RequestBodyStreamingResponse(process_bulk_quotes(rows), media_type="application/x-ndjson")
+
+
+@app.post("/bookings/bulk")
+async def bulk_bookings(request: Request, format: Optional[str] = None, import_id: Optional[str] = None):
+    fmt = _request_format(request, format)
+    import_id = import_id or request.headers.get("idempotency-key") or uuid.uuid4().hex
+
+    rows = await _open_rows(request, fmt)
+    return _RequestBodyStreamingResponse(
+        process_bulk_import(rows, import_id),
+        media_type="application/x-ndjson",
+        headers={"X-Import-Id": import_id},
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(os.environ.get("BULK_BOOKING_PORT", 8090))
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,297 @@
+"""
+Collision-free booking ID allocator.
+
+Booking IDs are 63-bit snowflake-style integers:
+
+    | 41 bits: ms since BOOKING_ID_EPOCH_MS | 10 bits: node | 12 bits: sequence |
+
+Each process (or replica) has its own node id, so IDs are unique across the
+fleet with no central round trip. Within a node, IDs strictly increase. If the
+wall clock steps backwards, or the 4096 sequence numbers of a millisecond run
+out, the allocator keeps counting on its own logical clock instead of
+waiting. allocate_block() reserves many IDs under one lock acquisition, for
+bulk imports.
+
+Set BOOKING_NODE_ID (0-1023) explicitly per replica in production. Without it
+the process leases a free node id from a lease table in a SQLite database
+(BOOKING_NODE_LEASE_DB, the booking ledger by default). A lease lasts
+BOOKING_NODE_LEASE_TTL_SECONDS from its last renewal. The allocator renews it
+whenever it allocates and a third of the TTL has passed, and releases it when
+the process exits. An allocator whose lease lapsed while it was idle checks
+that before allocating and leases again, so processes sharing that database
+never share a node id. A lease left by a crashed process or a replaced
+container expires after the TTL. Replicas on different hosts do not share the
+database and need BOOKING_NODE_ID.
+"""
+
+import atexit
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+# 2025-01-01T00:00:00Z, leaves ~69 years of 41-bit timestamps
+BOOKING_ID_EPOCH_MS = 1735689600000
+
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+TIMESTAMP_SHIFT = NODE_BITS + SEQUENCE_BITS
+
+# The booking ledger by default (same default as ledger.BOOKING_DB_PATH)
+BOOKING_NODE_LEASE_DB = os.path.abspath(os.environ.get(
+    "BOOKING_NODE_LEASE_DB",
+    os.environ.get("BOOKING_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "bookings.db")),
+))
+BOOKING_NODE_LEASE_TTL_SECONDS = float(os.environ.get("BOOKING_NODE_LEASE_TTL_SECONDS", 300))
+
+_LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS booking_node_leases (
+    node_id INTEGER PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    owner TEXT NOT NULL,
+    -- Time of the last renewal
+    leased_at REAL NOT NULL
+);
+"""
+
+
+def _configured_node_id() -> Optional[int]:
+    configured = os.environ.get("BOOKING_NODE_ID")
+    if not configured:
+        return None
+    node_id = int(configured)
+    if not 0 <= node_id <= MAX_NODE_ID:
+        raise ValueError(f"BOOKING_NODE_ID must be between 0 and {MAX_NODE_ID}, got {node_id}")
+    return node_id
+
+
+def _lease_connection(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.executescript(_LEASE_SCHEMA)
+    return conn
+
+
+def lease_node_id(owner: str, db_path: str = BOOKING_NODE_LEASE_DB, ttl: float = BOOKING_NODE_LEASE_TTL_SECONDS) -> int:
+    """
+    Leases the lowest node id with no unexpired lease, for one allocator.
+
+    Expired leases are taken over, as is the owner's previous lease. Raises
+    RuntimeError if all 1024 node ids are held.
+    """
+    host, pid = socket.gethostname(), os.getpid()
+    conn = _lease_connection(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            held = {
+                node_id
+                for (node_id,) in conn.execute(
+                    "SELECT node_id FROM booking_node_leases WHERE owner != ? AND leased_at > ?",
+                    (owner, now - ttl),
+                )
+            }
+            node_id = next((n for n in range(MAX_NODE_ID + 1) if n not in held), None)
+            if node_id is None:
+                raise RuntimeError(f"All {MAX_NODE_ID + 1} booking node ids are leased; set BOOKING_NODE_ID explicitly")
+            conn.execute("DELETE FROM booking_node_leases WHERE owner = ?", (owner,))
+            conn.execute(
+                "INSERT OR REPLACE INTO booking_node_leases (node_id, host, pid, owner, leased_at) VALUES (?, ?, ?, ?, ?)",
+                (node_id, host, pid, owner, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return node_id
+
+
+def renew_node_lease(node_id: int, owner: str, db_path: str = BOOKING_NODE_LEASE_DB) -> bool:
+    """Extends a lease. Returns False if the owner no longer holds it (it expired and was taken)."""
+    conn = _lease_connection(db_path)
+    try:
+        cursor = conn.execute(
+            "UPDATE booking_node_leases SET leased_at = ? WHERE node_id = ? AND owner = ?",
+            (time.time(), node_id, owner),
+        )
+        return cursor.rowcount == 1
+    finally:
+        conn.close()
+
+
+def release_node_lease(owner: str, db_path: str = BOOKING_NODE_LEASE_DB, pid: Optional[int] = None) -> None:
+    """Drops the owner's lease. With pid, only from that process, so a forked child keeps its parent's lease."""
+    if pid is not None and os.getpid() != pid:
+        return
+    try:
+        conn = _lease_connection(db_path)
+        try:
+            conn.execute("DELETE FROM booking_node_leases WHERE owner = ?", (owner,))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Could not release booking node lease of {owner}: {e}")
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000 - BOOKING_ID_EPOCH_MS
+
+
+class BookingIdAllocator:
+    """Thread-safe snowflake ID allocator for one node."""
+
+    def __init__(
+        self,
+        node_id: int = None,
+        lease_db_path: str = BOOKING_NODE_LEASE_DB,
+        lease_ttl: float = BOOKING_NODE_LEASE_TTL_SECONDS,
+    ):
+        if node_id is None:
+            node_id = _configured_node_id()
+        if node_id is not None and not 0 <= node_id <= MAX_NODE_ID:
+            raise ValueError(f"node_id must be between 0 and {MAX_NODE_ID}, got {node_id}")
+        # Without an assigned node id, one is leased on first use
+        self._leased = node_id is None
+        self._lease_db_path = lease_db_path
+        self._lease_ttl = lease_ttl
+        self._lease_owner: Optional[str] = None
+        self._lease_renewed_at = 0.0
+        self.node_id = node_id
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = MAX_SEQUENCE
+        self._pid = os.getpid()
+
+    def _reserve(self, count: int) -> List[Tuple[int, int, int]]:
+        """Reserves count (ms, sequence_start, sequence_end) runs. Caller holds the lock."""
+        if os.getpid() != self._pid:
+            # A forked child would replay the parent's sequence under the same node id
+            if not self._leased:
+                raise RuntimeError(
+                    f"Booking ID allocator with node id {self.node_id} used in a forked process; "
+                    "give every worker process its own BOOKING_NODE_ID"
+                )
+            self._pid = os.getpid()
+            self.node_id = None
+        if self._leased:
+            self._hold_lease()
+        runs = []
+        now = _now_ms()
+        if now > self._last_ms:
+            self._last_ms, self._sequence = now, -1
+        while count > 0:
+            if self._sequence >= MAX_SEQUENCE:
+                # Millisecond exhausted (or clock behind): move the logical clock on
+                self._last_ms += 1
+                self._sequence = -1
+            start = self._sequence + 1
+            take = min(count, MAX_SEQUENCE - start + 1)
+            runs.append((self._last_ms, start, start + take - 1))
+            self._sequence = start + take - 1
+            count -= take
+        return runs
+
+    def _hold_lease(self) -> None:
+        """Leases a node id, or renews the lease once a third of its TTL has passed. Caller holds the lock."""
+        now = time.time()
+        if self.node_id is not None and now - self._lease_renewed_at < self._lease_ttl / 3:
+            return
+        if self.node_id is not None and renew_node_lease(self.node_id, self._lease_owner, self._lease_db_path):
+            self._lease_renewed_at = now
+            return
+        if self.node_id is not None:
+            print(f"Booking node id lease {self.node_id} expired while idle, leasing again")
+        owner = f"{socket.gethostname()}:{self._pid}:{id(self)}"
+        self.node_id = lease_node_id(owner, self._lease_db_path, self._lease_ttl)
+        self._lease_renewed_at = now
+        if owner != self._lease_owner:
+            self._lease_owner = owner
+            atexit.register(release_node_lease, owner, self._lease_db_path, self._pid)
+        print(f"Booking ID allocator leased node id {self.node_id}")
+
+    def _compose(self, ms: int, sequence: int) -> int:
+        return (ms << TIMESTAMP_SHIFT) | (self.node_id << SEQUENCE_BITS) | sequence
+
+    def next_id(self) -> int:
+        with self._lock:
+            (ms, sequence, _), = self._reserve(1)
+            return self._compose(ms, sequence)
+
+    def allocate_block(self, count: int) -> List[int]:
+        """Returns count increasing IDs reserved in one step."""
+        with self._lock:
+            runs = self._reserve(count)
+            node_bits = self.node_id << SEQUENCE_BITS
+        return [
+            (ms << TIMESTAMP_SHIFT) | node_bits | sequence
+            for ms, start, end in runs
+            for sequence in range(start, end + 1)
+        ]
+
+
+def decode_booking_id(booking_id: int) -> dict:
+    """Splits a booking ID into its creation time (unix ms), node and sequence."""
+    booking_id = int(booking_id)
+    return {
+        "created_at_ms": (booking_id >> TIMESTAMP_SHIFT) + BOOKING_ID_EPOCH_MS,
+        "node_id": (booking_id >> SEQUENCE_BITS) & MAX_NODE_ID,
+        "sequence": booking_id & MAX_SEQUENCE,
+    }
+
+
+booking_id_allocator = BookingIdAllocator()
+
+
+def _stress_process(args) -> List[int]:
+    node_id, count = args
+    allocator = BookingIdAllocator(node_id)
+    return allocator.allocate_block(count // 2) + [allocator.next_id() for _ in range(count - count // 2)]
+
+
+def stress_test(num_threads: int = 16, ids_per_thread: int = 50_000, num_processes: int = 4) -> dict:
+    """
+    Allocates IDs from many threads sharing one allocator and from several
+    processes with their own node ids. Checks that every ID is unique and
+    that each thread saw strictly increasing IDs.
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    allocator = BookingIdAllocator(node_id=1)
+
+    def worker(index: int) -> List[int]:
+        if index % 2:
+            ids = []
+            while len(ids) < ids_per_thread:
+                ids.extend(allocator.allocate_block(min(256, ids_per_thread - len(ids))))
+            return ids
+        return [allocator.next_id() for _ in range(ids_per_thread)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        per_thread = list(pool.map(worker, range(num_threads)))
+    thread_seconds = time.perf_counter() - start
+
+    with ProcessPoolExecutor(max_workers=num_processes) as pool:
+        per_process = list(pool.map(_stress_process, [(node_id, ids_per_thread) for node_id in range(2, 2 + num_processes)]))
+
+    all_ids = [i for ids in per_thread + per_process for i in ids]
+    monotonic = all(all(a < b for a, b in zip(ids, ids[1:])) for ids in per_thread + per_process)
+    return {
+        "ids": len(all_ids),
+        "unique": len(set(all_ids)) == len(all_ids),
+        "monotonic_per_thread": monotonic,
+        "threaded_ids_per_second": round(num_threads * ids_per_thread / thread_seconds),
+    }
+
+
+if __name__ == "__main__":
+    result = stress_test()
+    print(result)
+    assert result["unique"] and result["monotonic_per_thread"], "booking ID allocator produced duplicate or unordered IDs"
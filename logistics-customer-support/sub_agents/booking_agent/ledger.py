@@ -0,0 +1,271 @@
+"""
+Durable, idempotent booking ledger behind booking_tool.
+
+Every booking is written to a local SQLite database (WAL) under an
+idempotency key. The key is a hash of the conversation's session key and the
+normalized booking fields. When the agent loops, or a call is retried with
+the same details, the ledger returns the booking it already made instead of
+creating a duplicate. Bookings can be looked up by booking ID (primary key)
+and by contact email (secondary index).
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from .id_allocator import booking_id_allocator
+
+BOOKING_DB_PATH = os.path.abspath(os.environ.get(
+    "BOOKING_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "bookings.db"),
+))
+# Fresh booking IDs tried when an insert collides with an existing booking_id
+BOOKING_ID_MAX_ATTEMPTS = 3
+
+BOOKING_FIELDS = (
+    "collection_address",
+    "delivery_address",
+    "package_description",
+    "package_weight",
+    "service_level",
+    "contact_email_address",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id INTEGER PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    session_key TEXT NOT NULL,
+    collection_address TEXT NOT NULL,
+    delivery_address TEXT NOT NULL,
+    package_description TEXT NOT NULL,
+    package_weight REAL NOT NULL,
+    service_level TEXT NOT NULL,
+    contact_email_address TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bookings_by_email ON bookings (contact_email_address, created_at);
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_booking(fields: dict) -> dict:
+    """Canonical form of the booking fields, used for the idempotency key and storage."""
+    def text(value) -> str:
+        return _WHITESPACE.sub(" ", str(value or "")).strip()
+
+    return {
+        "collection_address": text(fields.get("collection_address")),
+        "delivery_address": text(fields.get("delivery_address")),
+        "package_description": text(fields.get("package_description")),
+        "package_weight": round(float(fields.get("package_weight") or 0), 3),
+        "service_level": text(fields.get("service_level")).upper(),
+        "contact_email_address": text(fields.get("contact_email_address")).lower(),
+    }
+
+
+def idempotency_key(session_key: str, booking: dict) -> str:
+    """Hash of the session key and the normalized fields (case-insensitive for text)."""
+    parts = [session_key] + [str(booking[field]).lower() for field in BOOKING_FIELDS]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class BookingLedger:
+    """
+    SQLite booking ledger with idempotent writes.
+
+    Safe to share between threads. All access is serialized on one connection.
+    """
+
+    def __init__(self, db_path: str = BOOKING_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def record_booking(self, session_key: str, fields: dict) -> Tuple[dict, bool]:
+        """
+        Creates the booking unless one with the same idempotency key exists.
+
+        Returns the booking and whether it was newly created. Raises
+        sqlite3.IntegrityError if BOOKING_ID_MAX_ATTEMPTS fresh booking IDs
+        all collide with existing bookings.
+        """
+        booking = normalize_booking(fields)
+        key = idempotency_key(session_key, booking)
+        with self._lock:
+            existing = self._conn.execute("SELECT * FROM bookings WHERE idempotency_key = ?", (key,)).fetchone()
+            if existing is not None:
+                return dict(existing), False
+            for attempt in range(1, BOOKING_ID_MAX_ATTEMPTS + 1):
+                booking_id = booking_id_allocator.next_id()
+                try:
+                    # The UNIQUE key also guards against another process writing the same booking
+                    cursor = self._conn.execute(
+                        "INSERT INTO bookings (booking_id, idempotency_key, session_key, collection_address, delivery_address, "
+                        "package_description, package_weight, service_level, contact_email_address, status, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'confirmed', ?) ON CONFLICT (idempotency_key) DO NOTHING",
+                        (booking_id, key, session_key, *(booking[f] for f in BOOKING_FIELDS), time.time()),
+                    )
+                    break
+                except sqlite3.IntegrityError:
+                    # Only booking_id can conflict here, another node minted the same ID
+                    print(f"Booking ID {booking_id} already exists (attempt {attempt} of {BOOKING_ID_MAX_ATTEMPTS})")
+                    if attempt == BOOKING_ID_MAX_ATTEMPTS:
+                        raise
+            row = self._conn.execute("SELECT * FROM bookings WHERE idempotency_key = ?", (key,)).fetchone()
+        return dict(row), cursor.rowcount == 1
+
+    def _select_by_keys(self, columns: str, keys: List[str]) -> List[sqlite3.Row]:
+        """Fetches bookings by idempotency key, 500 keys per query. Caller holds the lock."""
+        rows = []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows.extend(self._conn.execute(
+                f"SELECT {columns} FROM bookings WHERE idempotency_key IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return rows
+
+    def record_bookings(self, entries: List[Tuple[str, dict]]) -> List[Tuple[dict, bool]]:
+        """
+        Batch form of record_booking for (session_key, fields) entries.
+
+        IDs are allocated as one block and all rows are written in one
+        transaction. If a booking_id collides, the transaction is retried with
+        a fresh block, up to BOOKING_ID_MAX_ATTEMPTS times. Returns
+        (booking, created) per entry, in order.
+        """
+        if not entries:
+            return []
+        bookings = [normalize_booking(fields) for _, fields in entries]
+        keys = [idempotency_key(session_key, booking) for (session_key, _), booking in zip(entries, bookings)]
+        for attempt in range(1, BOOKING_ID_MAX_ATTEMPTS + 1):
+            try:
+                return self._insert_batch(entries, bookings, keys)
+            except sqlite3.IntegrityError:
+                print(f"Booking ID block collided with existing bookings (attempt {attempt} of {BOOKING_ID_MAX_ATTEMPTS})")
+                if attempt == BOOKING_ID_MAX_ATTEMPTS:
+                    raise
+
+    def _insert_batch(self, entries: List[Tuple[str, dict]], bookings: List[dict], keys: List[str]) -> List[Tuple[dict, bool]]:
+        booking_ids = booking_id_allocator.allocate_block(len(entries))
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                seen = {row["idempotency_key"] for row in self._select_by_keys("idempotency_key", keys)}
+                created, new_rows = [], []
+                for booking_id, key, (session_key, _), booking in zip(booking_ids, keys, entries, bookings):
+                    created.append(key not in seen)
+                    if key not in seen:
+                        seen.add(key)
+                        new_rows.append((booking_id, key, session_key, *(booking[f] for f in BOOKING_FIELDS), now))
+                self._conn.executemany(
+                    "INSERT INTO bookings (booking_id, idempotency_key, session_key, collection_address, delivery_address, "
+                    "package_description, package_weight, service_level, contact_email_address, status, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'confirmed', ?)",
+                    new_rows,
+                )
+                rows = {row["idempotency_key"]: dict(row) for row in self._select_by_keys("*", keys)}
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(rows[key], is_new) for key, is_new in zip(keys, created)]
+
+    def get_booking(self, booking_id) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM bookings WHERE booking_id = ?", (int(booking_id),)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_email(self, email: str, limit: int = 20) -> List[dict]:
+        """Most recent bookings for a contact email."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM bookings WHERE contact_email_address = ? ORDER BY created_at DESC LIMIT ?",
+                (email.strip().lower(), limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_ledger: Optional[BookingLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_booking_ledger() -> BookingLedger:
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = BookingLedger()
+    return _ledger
+
+
+def benchmark(num_bookings: int = 50_000, num_threads: int = 8, db_path: str = "booking_benchmark.db") -> dict:
+    """
+    Writes num_bookings distinct bookings from num_threads threads, then
+    replays all of them as retries. Reports write and retry throughput and
+    checks that the retries created nothing.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    ledger = BookingLedger(db_path=db_path)
+
+    def fields(i: int) -> dict:
+        return {
+            "collection_address": f"{i} W Cromwell Rd, London W14 8PB",
+            "delivery_address": "Rimsky-Korssakovweg 9, 1323 LP Almere",
+            "package_description": "Application documents",
+            "package_weight": 1 + i % 45,
+            "service_level": "EXPRESS" if i % 2 else "ECONOMY",
+            "contact_email_address": f"customer{i % 1000}@example.com",
+        }
+
+    def write(indices) -> int:
+        return sum(ledger.record_booking(f"session-{i % 5000}", fields(i))[1] for i in indices)
+
+    chunks = [range(t, num_bookings, num_threads) for t in range(num_threads)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        created = sum(pool.map(write, chunks))
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        duplicates_created = sum(pool.map(write, chunks))
+    retry_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(1000):
+        ledger.find_by_email(f"customer{i}@example.com")
+    email_lookup_us = (time.perf_counter() - start) / 1000 * 1e6
+
+    ledger.close()
+    return {
+        "bookings": num_bookings,
+        "created": created,
+        "duplicates_created_on_retry": duplicates_created,
+        "writes_per_second": round(num_bookings / write_seconds),
+        "retries_per_second": round(num_bookings / retry_seconds),
+        "email_lookup_us": round(email_lookup_us, 1),
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark())
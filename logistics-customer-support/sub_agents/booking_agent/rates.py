@@ -0,0 +1,195 @@
+"""
+Zone-based rate quotes for ECONOMY and EXPRESS parcels.
+
+A price is looked up, never computed per request:
+
+- each address is mapped to a region (by country name, ISO code or postcode
+  shape)
+- ZONE_MATRIX[origin_region, destination_region] gives the zone
+- RATE_TABLE[service_level, zone, weight_break] gives the price, where the
+  weight break is the first entry of WEIGHT_BREAKS_KG at or above the weight
+
+The tables are built once at import. quote() prices one parcel with plain
+list indexing. quote_batch() prices whole arrays of parcels with NumPy
+fancy indexing.
+"""
+
+import re
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+CURRENCY = "EUR"
+SERVICE_LEVELS = ("ECONOMY", "EXPRESS")
+
+REGIONS = ("UK", "EU", "NA", "IN", "ROW")
+# Zone by origin region (rows) and destination region (columns)
+ZONE_MATRIX = np.array([
+    # UK  EU  NA  IN  ROW
+    [0, 1, 3, 3, 4],  # UK
+    [1, 0, 3, 3, 4],  # EU
+    [3, 3, 0, 4, 4],  # NA
+    [3, 3, 4, 0, 4],  # IN
+    [4, 4, 4, 4, 2],  # ROW
+], dtype=np.int8)
+
+WEIGHT_BREAKS_KG = np.array([0.5, 1, 2, 5, 10, 20, 30, 45], dtype=np.float64)
+
+# Per zone: price of the first weight break and the extra price per kg above it
+_ECONOMY_BASE = np.array([5.50, 9.00, 14.00, 19.00, 26.00])
+_ECONOMY_PER_KG = np.array([0.80, 1.40, 2.10, 3.20, 4.50])
+_EXPRESS_MULTIPLIER = np.array([1.8, 1.9, 2.0, 2.2, 2.4])
+
+
+def _build_rate_table() -> np.ndarray:
+    extra_kg = WEIGHT_BREAKS_KG - WEIGHT_BREAKS_KG[0]
+    economy = _ECONOMY_BASE[:, None] + _ECONOMY_PER_KG[:, None] * extra_kg[None, :]
+    express = economy * _EXPRESS_MULTIPLIER[:, None]
+    return np.round(np.stack([economy, express]), 2)
+
+
+# RATE_TABLE[service, zone, weight_break]
+RATE_TABLE = _build_rate_table()
+_RATE_LIST = RATE_TABLE.tolist()
+_ZONE_LIST = ZONE_MATRIX.tolist()
+_WEIGHT_BREAKS_LIST = WEIGHT_BREAKS_KG.tolist()
+_REGION_INDEX = {region: i for i, region in enumerate(REGIONS)}
+_SERVICE_INDEX = {service: i for i, service in enumerate(SERVICE_LEVELS)}
+
+_COUNTRY_REGIONS = {
+    "uk": "UK", "gb": "UK", "united kingdom": "UK", "england": "UK", "scotland": "UK", "wales": "UK",
+    "nl": "EU", "netherlands": "EU", "the netherlands": "EU", "holland": "EU", "be": "EU", "belgium": "EU",
+    "de": "EU", "germany": "EU", "fr": "EU", "france": "EU", "es": "EU", "spain": "EU", "it": "EU",
+    "italy": "EU", "ie": "EU", "ireland": "EU", "pt": "EU", "portugal": "EU", "at": "EU", "austria": "EU",
+    "dk": "EU", "denmark": "EU", "se": "EU", "sweden": "EU", "pl": "EU", "poland": "EU", "lu": "EU",
+    "luxembourg": "EU", "fi": "EU", "finland": "EU",
+    "us": "NA", "usa": "NA", "united states": "NA", "ca": "NA", "canada": "NA",
+    "in": "IN", "india": "IN",
+}
+_UK_POSTCODE = re.compile(r"\b[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}\b", re.IGNORECASE)
+_NL_POSTCODE = re.compile(r"\b\d{4}\s?[A-Z]{2}\b")
+_IN_PINCODE = re.compile(r"\b\d{6}\b")
+_US_ZIP = re.compile(r"\b[A-Z]{2}\s+\d{5}(?:-\d{4})?\b")
+
+
+def address_region(address: str) -> Tuple[str, bool]:
+    """
+    Returns the region of an address and whether it was recognised.
+
+    Unrecognised addresses are priced as ROW (rest of world).
+    """
+    parts = [p.strip().lower() for p in re.split(r"[,\n]", address or "") if p.strip()]
+    for part in reversed(parts):
+        region = _COUNTRY_REGIONS.get(part)
+        if region:
+            return region, True
+    if _UK_POSTCODE.search(address or ""):
+        return "UK", True
+    if _NL_POSTCODE.search(address or ""):
+        return "EU", True
+    if _US_ZIP.search(address or ""):
+        return "NA", True
+    if _IN_PINCODE.search(address or ""):
+        return "IN", True
+    return "ROW", False
+
+
+def _weight_break(weight: float) -> int:
+    for index, limit in enumerate(_WEIGHT_BREAKS_LIST):
+        if weight <= limit:
+            return index
+    raise ValueError(f"Weight must be at most {_WEIGHT_BREAKS_LIST[-1]:g} kg")
+
+
+def quote(origin_region: str, destination_region: str, weight_kg: float, service_level: str) -> float:
+    """Price of one parcel."""
+    if not weight_kg > 0:
+        raise ValueError("Weight must be more than 0 kg")
+    zone = _ZONE_LIST[_REGION_INDEX[origin_region]][_REGION_INDEX[destination_region]]
+    return _RATE_LIST[_SERVICE_INDEX[service_level.upper()]][zone][_weight_break(weight_kg)]
+
+
+def quote_batch(
+    origin_regions: Sequence[str],
+    destination_regions: Sequence[str],
+    weights_kg: Sequence[float],
+    service_levels: Sequence[str],
+) -> np.ndarray:
+    """
+    Prices many parcels at once.
+
+    Returns a float array with NaN for parcels that cannot be priced (weight
+    out of range or unknown service level).
+    """
+    origins = np.fromiter((_REGION_INDEX.get(r, _REGION_INDEX["ROW"]) for r in origin_regions), dtype=np.int64)
+    destinations = np.fromiter((_REGION_INDEX.get(r, _REGION_INDEX["ROW"]) for r in destination_regions), dtype=np.int64)
+    weights = np.asarray(weights_kg, dtype=np.float64)
+    services = np.fromiter((_SERVICE_INDEX.get(str(s).upper(), -1) for s in service_levels), dtype=np.int64)
+
+    zones = ZONE_MATRIX[origins, destinations]
+    breaks = np.searchsorted(WEIGHT_BREAKS_KG, weights, side="left")
+    valid = (weights > 0) & (breaks < len(WEIGHT_BREAKS_KG)) & (services >= 0)
+    prices = np.full(weights.shape, np.nan)
+    prices[valid] = RATE_TABLE[services[valid], zones[valid], breaks[valid]]
+    return prices
+
+
+def quote_parcels(parcels: List[dict]) -> List[dict]:
+    """Quotes parcel dicts (collection_address, delivery_address, package_weight, service_level)."""
+    origins, destinations, weights, services = [], [], [], []
+    for parcel in parcels:
+        origins.append(address_region(parcel.get("collection_address", ""))[0])
+        destinations.append(address_region(parcel.get("delivery_address", ""))[0])
+        try:
+            weights.append(float(parcel.get("package_weight") or 0))
+        except (TypeError, ValueError):
+            weights.append(0.0)
+        services.append(parcel.get("service_level") or "")
+    prices = quote_batch(origins, destinations, weights, services)
+    return [
+        {"price": round(float(price), 2), "currency": CURRENCY} if not np.isnan(price)
+        else {"error": "Cannot price this parcel: check weight (0-45 kg) and service level"}
+        for price in prices
+    ]
+
+
+def quote_options(collection_address: str, delivery_address: str, package_weight: float) -> Dict:
+    """Quotes both service levels for one parcel, noting unrecognised addresses."""
+    origin, origin_known = address_region(collection_address)
+    destination, destination_known = address_region(delivery_address)
+    result = {
+        "status": "success",
+        "currency": CURRENCY,
+        "quotes": {service: quote(origin, destination, float(package_weight), service) for service in SERVICE_LEVELS},
+    }
+    unknown = [name for name, known in (("collection_address", origin_known), ("delivery_address", destination_known)) if not known]
+    if unknown:
+        result["note"] = f"Country not recognised for {', '.join(unknown)}; priced as rest of world"
+    return result
+
+
+def benchmark(batch_size: int = 1_000_000) -> dict:
+    import random
+    import time
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        quote("UK", "EU", 3.2, "EXPRESS")
+    single_us = (time.perf_counter() - start) / 100_000 * 1e6
+
+    origins = random.choices(REGIONS, k=batch_size)
+    destinations = random.choices(REGIONS, k=batch_size)
+    weights = np.random.uniform(0.1, 45, batch_size)
+    services = random.choices(SERVICE_LEVELS, k=batch_size)
+    start = time.perf_counter()
+    quote_batch(origins, destinations, weights, services)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "single_quote_us": round(single_us, 3),
+        "batch_size": batch_size,
+        "batch_quotes_per_second": round(batch_size / batch_seconds),
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark())
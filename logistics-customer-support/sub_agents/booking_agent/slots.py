@@ -0,0 +1,281 @@
+"""
+Deterministic slot filling for booking_agent.
+
+Before each booking_agent model call the engine:
+
+1. extracts booking fields from the user's message with fast parsers (email,
+   weight, service level, labelled addresses and description). If the
+   previous turn asked for a field, the whole reply is also read as that field,
+   as long as it is not a question and, for an address, has a house number
+   or postcode and words.
+2. validates the values locally and keeps the valid ones as typed slots in
+   session state.
+3. tells the model exactly what is collected, what was invalid and which
+   single field to ask for next. The model then only has to phrase that
+   question, or, once every slot is valid, ask for confirmation and call
+   booking_tool.
+
+Turns per booking and model calls per turn are both bounded, so a confused
+conversation stops instead of looping. A booking the user cancels, or leaves
+idle for BOOKING_IDLE_RESET_SECONDS, starts again from empty slots.
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from ..entity_patterns import EMAIL_PATTERN, SERVICE_LEVEL_PATTERN, WEIGHT_PATTERN
+
+MAX_PACKAGE_WEIGHT_KG = 45.0
+SERVICE_LEVELS = ("ECONOMY", "EXPRESS")
+
+BOOKING_MAX_TURNS = int(os.environ.get("BOOKING_MAX_TURNS", 12))
+BOOKING_MAX_MODEL_CALLS_PER_TURN = int(os.environ.get("BOOKING_MAX_MODEL_CALLS_PER_TURN", 6))
+BOOKING_IDLE_RESET_SECONDS = float(os.environ.get("BOOKING_IDLE_RESET_SECONDS", 1800))
+
+SLOTS_STATE_KEY = "booking_slots"
+AWAITING_SLOT_STATE_KEY = "booking_awaiting_slot"
+TURNS_STATE_KEY = "booking_turns"
+INVOCATION_STATE_KEY = "booking_slots_invocation"
+MODEL_CALLS_STATE_KEY = "booking_model_calls"
+LAST_TURN_AT_STATE_KEY = "booking_last_turn_at"
+
+_BARE_NUMBER_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*$")
+# Where a labelled address ends: a sentence break or the next labelled field
+_END = r"(?=[;\n]|\.\s|\.$|,?\s+(?:and\s+)?(?:deliver|to be delivered|collect|pick ?up|email|contains|weigh)|$)"
+_CANCEL_PATTERN = re.compile(r"^\s*(cancel|never ?mind|forget (about )?it|start (over|again))\b", re.IGNORECASE)
+_CONFIRMATION_PATTERN = re.compile(r"^\s*(yes|yep|yeah|no|nope|ok|okay|confirm(ed)?|correct|go ahead|sure)\b[\s.!]*$", re.IGNORECASE)
+
+
+def _text(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip(" .,")
+
+
+def _validate_address(value) -> Tuple[Optional[str], Optional[str]]:
+    value = _text(value)
+    if len(value) < 5 or not re.search(r"[A-Za-z]", value):
+        return None, "must be a full address"
+    return value, None
+
+
+def _looks_like_address(text: str) -> bool:
+    """A house number or postcode and at least two words, e.g. "1 Main Rd, Leeds"."""
+    return bool(re.search(r"\d", text)) and len(re.findall(r"[A-Za-z]{2,}", text)) >= 2
+
+
+def _validate_description(value) -> Tuple[Optional[str], Optional[str]]:
+    value = _text(value)
+    if not value:
+        return None, "must not be empty"
+    if len(value) > 200:
+        return None, "must be at most 200 characters"
+    return value, None
+
+
+def _validate_weight(value) -> Tuple[Optional[float], Optional[str]]:
+    try:
+        weight = float(value)
+    except (TypeError, ValueError):
+        return None, "must be a number of kg"
+    if not 0 < weight <= MAX_PACKAGE_WEIGHT_KG:
+        return None, f"must be more than 0 and at most {MAX_PACKAGE_WEIGHT_KG:g} kg"
+    return weight, None
+
+
+def _validate_service_level(value) -> Tuple[Optional[str], Optional[str]]:
+    value = _text(value).upper()
+    if value not in SERVICE_LEVELS:
+        return None, "must be ECONOMY or EXPRESS"
+    return value, None
+
+
+def _validate_email(value) -> Tuple[Optional[str], Optional[str]]:
+    value = _text(value).lower()
+    if not EMAIL_PATTERN.fullmatch(value):
+        return None, "must be a valid email address"
+    return value, None
+
+
+@dataclass
+class SlotSpec:
+    """One booking field: how to find it in free text, validate it and ask for it."""
+
+    name: str
+    question: str
+    validate: Callable[[object], Tuple[Optional[object], Optional[str]]]
+    pattern: Optional[Pattern[str]] = None
+    # Whether a reply to a question about this slot can be taken verbatim
+    free_text: bool = False
+
+
+SLOT_SPECS: List[SlotSpec] = [
+    SlotSpec(
+        "collection_address", "the address the package should be collected from", _validate_address,
+        re.compile(r"(?:collection address|collect(?:ed)? (?:it )?from|pick ?up (?:address|from))\s*(?:is|:)?\s*(.+?)" + _END, re.IGNORECASE),
+        free_text=True,
+    ),
+    SlotSpec(
+        "delivery_address", "the address the package should be delivered to", _validate_address,
+        re.compile(r"(?:delivery address|deliver(?:ed)? (?:it )?to|destination)\s*(?:is|:)?\s*(.+?)" + _END, re.IGNORECASE),
+        free_text=True,
+    ),
+    SlotSpec(
+        "package_description", "a brief description of the package contents", _validate_description,
+        re.compile(r"(?:package description|description|contains|containing)\s*(?:is|:)?\s*(.+?)(?=[;\n.]|$)", re.IGNORECASE),
+        free_text=True,
+    ),
+    SlotSpec("package_weight", f"the package weight in kg (at most {MAX_PACKAGE_WEIGHT_KG:g} kg)", _validate_weight, WEIGHT_PATTERN),
+    SlotSpec("service_level", "the service level, ECONOMY or EXPRESS", _validate_service_level, SERVICE_LEVEL_PATTERN),
+    SlotSpec("contact_email_address", "a contact email address", _validate_email, re.compile(f"({EMAIL_PATTERN.pattern})")),
+]
+SLOT_NAMES = [spec.name for spec in SLOT_SPECS]
+
+
+def validate_booking(fields: dict) -> Tuple[dict, Dict[str, str]]:
+    """
+    Validates a full set of booking fields.
+
+    Returns the normalized values and a {field: problem} dict, which is empty
+    when the booking is valid.
+    """
+    values, errors = {}, {}
+    for spec in SLOT_SPECS:
+        value, error = spec.validate(fields.get(spec.name))
+        if error:
+            errors[spec.name] = error
+        else:
+            values[spec.name] = value
+    return values, errors
+
+
+def extract_slots(text: str, awaiting: Optional[str] = None) -> Tuple[dict, Dict[str, str]]:
+    """
+    Reads booking fields from a user message.
+
+    Returns the valid values found and the problems with invalid ones.
+    """
+    raw_values = {}
+    for spec in SLOT_SPECS:
+        match = spec.pattern.search(text) if spec.pattern else None
+        if match:
+            raw_values[spec.name] = match.group(1)
+
+    # A reply with no recognisable field is the answer to the last question
+    spec = next((s for s in SLOT_SPECS if s.name == awaiting), None)
+    if spec is not None and not raw_values and not _CONFIRMATION_PATTERN.match(text):
+        bare = _BARE_NUMBER_PATTERN.match(text)
+        if spec.free_text and not text.rstrip().endswith("?"):
+            if spec.validate is not _validate_address or _looks_like_address(text):
+                raw_values[spec.name] = text
+        elif spec.name == "package_weight" and bare:
+            raw_values[spec.name] = bare.group(1)
+
+    values, errors = {}, {}
+    for spec in SLOT_SPECS:
+        if spec.name not in raw_values:
+            continue
+        value, error = spec.validate(raw_values[spec.name])
+        if error:
+            errors[spec.name] = error
+        else:
+            values[spec.name] = value
+    return values, errors
+
+
+def next_missing_slot(slots: dict) -> Optional[SlotSpec]:
+    return next((spec for spec in SLOT_SPECS if spec.name not in slots), None)
+
+
+def reset_booking_slots(state) -> None:
+    """Clears the slot-filling state, e.g. once a booking has been made."""
+    state[SLOTS_STATE_KEY] = {}
+    state[AWAITING_SLOT_STATE_KEY] = None
+    state[TURNS_STATE_KEY] = 0
+
+
+def _user_text(callback_context: CallbackContext) -> str:
+    content = callback_context.user_content
+    if not content or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+def _answers_booking_tool(llm_request: LlmRequest) -> bool:
+    if not llm_request.contents:
+        return False
+    parts = llm_request.contents[-1].parts or []
+    return any(part.function_response and part.function_response.name == "booking_tool" for part in parts)
+
+
+def _instruction(slots: dict, errors: Dict[str, str], missing: Optional[SlotSpec]) -> str:
+    lines = ["## Booking slot status (validated by the system, do not re-validate)"]
+    for spec in SLOT_SPECS:
+        lines.append(f"- {spec.name}: {slots[spec.name]}" if spec.name in slots else f"- {spec.name}: (missing)")
+    for name, problem in errors.items():
+        lines.append(f"The user gave an invalid {name}: it {problem}. Tell them briefly.")
+    if missing is not None:
+        lines.append(
+            f"Ask the user only for {missing.question}, in one short sentence. "
+            "Do not ask for any other field and do not call booking_tool yet."
+        )
+    else:
+        lines.append(
+            "All fields are collected and valid. If the user has not yet confirmed these exact details, "
+            "summarize them and ask for confirmation. Once they confirm, call booking_tool with exactly these values."
+        )
+    return "\n".join(lines)
+
+
+def before_model_callback(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """Updates the booking slots from the user's message and narrows the model's task."""
+    state = callback_context.state
+    new_turn = state.get(INVOCATION_STATE_KEY) != callback_context.invocation_id
+    slots = dict(state.get(SLOTS_STATE_KEY) or {})
+    errors: Dict[str, str] = {}
+
+    if new_turn:
+        text = _user_text(callback_context)
+        now = time.time()
+        last_turn_at = state.get(LAST_TURN_AT_STATE_KEY)
+        state[LAST_TURN_AT_STATE_KEY] = now
+        if _CANCEL_PATTERN.match(text):
+            reset_booking_slots(state)
+            state[INVOCATION_STATE_KEY] = callback_context.invocation_id
+            return LlmResponse(content=types.Content(role="model", parts=[types.Part(
+                text="Okay, I have cancelled this booking request."
+            )]))
+        if last_turn_at and now - last_turn_at > BOOKING_IDLE_RESET_SECONDS:
+            # The previous booking was abandoned, count turns from scratch
+            reset_booking_slots(state)
+            slots = {}
+        state[INVOCATION_STATE_KEY] = callback_context.invocation_id
+        state[MODEL_CALLS_STATE_KEY] = 0
+        state[TURNS_STATE_KEY] = (state.get(TURNS_STATE_KEY) or 0) + 1
+        found, errors = extract_slots(text, state.get(AWAITING_SLOT_STATE_KEY))
+        slots.update(found)
+        state[SLOTS_STATE_KEY] = slots
+
+    model_calls = (state.get(MODEL_CALLS_STATE_KEY) or 0) + 1
+    state[MODEL_CALLS_STATE_KEY] = model_calls
+    turns = state.get(TURNS_STATE_KEY) or 0
+    if model_calls > BOOKING_MAX_MODEL_CALLS_PER_TURN or turns > BOOKING_MAX_TURNS:
+        print(f"Booking slot filling stopped after {turns} turns / {model_calls} model calls")
+        reset_booking_slots(state)
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(
+            text="Sorry, I could not complete this booking. Please start a new booking request with all the details."
+        )]))
+
+    if _answers_booking_tool(llm_request):
+        # The booking is made; the model only has to report the tool result
+        return None
+
+    missing = next_missing_slot(slots)
+    state[AWAITING_SLOT_STATE_KEY] = missing.name if missing else None
+    llm_request.append_instructions([_instruction(slots, errors, missing)])
+    return None
@@ -0,0 +1,25 @@
+"""
+Entity and keyword patterns for reading customer messages.
+
+The pre-router, the history compactor, the tracking store, the tracking
+status cache and the booking slot filler all import these, so a shipment or
+booking field is recognised the same way at every stage.
+"""
+
+import re
+from typing import Pattern
+
+TRACKING_NUMBER_PATTERN = re.compile(r"(?<!\d)\d{9}(?!\d)")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+WEIGHT_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(?:kg|kgs|kilo|kilos|kilograms?)\b", re.IGNORECASE)
+SERVICE_LEVEL_PATTERN = re.compile(r"\b(economy|express)\b", re.IGNORECASE)
+
+
+def keyword_pattern(*words: str) -> Pattern[str]:
+    return re.compile(r"\b(?:" + "|".join(words) + r")\b", re.IGNORECASE)
+
+
+# Words asking where a shipment is, for starting a booking, and about packaging
+TRACKING_KEYWORD_PATTERN = keyword_pattern("track", "tracking", "where is", "where's", "status", "delivered")
+BOOKING_KEYWORD_PATTERN = keyword_pattern("book", "booking", "schedule a pickup", "send a parcel", "ship a")
+PACKAGING_KEYWORD_PATTERN = keyword_pattern("pack", "packing", "packaging", "wrap", "box", "boxes")
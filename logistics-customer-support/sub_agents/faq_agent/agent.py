@@ -1,5 +1,8 @@
 from google.adk.agents import Agent
 from .tools.rag_query import rag_query
+from .tools.rag_batch_query import rag_batch_query
+from .answer_cache import serve_cached_answer, store_answer
+from ..tool_runtime import offload_tool
 
 
 MODEl = "gemini-2.5-pro-preview-05-06"
@@ -28,6 +31,10 @@ FAQ_AGENT_INSTRUCTIONS = """
     1. `rag_query`: Query packaging_guidelines corpus to answer questions
        - Parameters:
          - query: The text question to ask
+    2. `rag_batch_query`: Query packaging_guidelines corpus with several sub-questions in one call
+       - Use this instead of calling `rag_query` several times when the question covers more than one topic
+       - Parameters:
+         - queries: The list of sub-questions to ask
     
     
     ## Communication Guidelines
@@ -41,7 +48,10 @@ try:
         model=MODEl,
         name="faq_agent",
         instruction=FAQ_AGENT_INSTRUCTIONS,
-        tools=[rag_query]
+        # Vertex retrieval is the slowest backend call, keep it from starving other tools
+        tools=[offload_tool(rag_query, max_concurrency=8), offload_tool(rag_batch_query, max_concurrency=4)],
+        before_agent_callback=serve_cached_answer,
+        after_model_callback=store_answer,
     )
     print(f"Agent {faq_agent.name} defined")
 except Exception as e:
@@ -0,0 +1,232 @@
+"""
+Semantic answer cache in front of faq_agent.
+
+Packaging questions repeat a lot, often with small wording changes. Answers
+are cached under the normalized question and also indexed by a local
+embedding. A new question is served from the cache when it normalizes to a
+known key, or when its cosine similarity to a cached question is above the
+threshold and it does not swap a word of the cached question for a different
+one ("cancel booking" is not "change booking"). Entries expire by TTL and are
+evicted least-recently-used.
+
+The cache is cleared whenever the index of the active retrieval backend
+changes. That version check can be a network call, so it runs on a
+background thread and never inside lookup().
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional, Set
+
+import numpy as np
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from .tools.embeddings import EMBEDDING_DIM, embed_text, normalize_query
+from .tools.rag_query import RAG_STATUS_STATE_KEY
+
+FAQ_CACHE_MAX_ENTRIES = int(os.environ.get("FAQ_CACHE_MAX_ENTRIES", 2048))
+FAQ_CACHE_TTL_SECONDS = float(os.environ.get("FAQ_CACHE_TTL_SECONDS", 24 * 3600))
+FAQ_CACHE_SIMILARITY_THRESHOLD = float(os.environ.get("FAQ_CACHE_SIMILARITY_THRESHOLD", 0.8))
+FAQ_CACHE_VERSION_CHECK_SECONDS = float(os.environ.get("FAQ_CACHE_VERSION_CHECK_SECONDS", 300))
+
+
+def _trigrams(word: str) -> Set[str]:
+    padded = f"#{word}#"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _is_variant(a: str, b: str) -> bool:
+    """Whether two words are spellings of the same word (typo, plural, inflection)."""
+    if min(len(a), len(b)) >= 3 and (a.startswith(b) or b.startswith(a)):
+        return True
+    ta, tb = _trigrams(a), _trigrams(b)
+    return len(ta & tb) / len(ta | tb) >= 0.5
+
+
+def swaps_words(key: str, cached_key: str) -> bool:
+    """
+    Whether each normalized question has a word the other lacks and has no
+    variant of. Extra filler words on one side are fine; a substituted word
+    changes the question.
+    """
+    words, cached_words = set(key.split()), set(cached_key.split())
+    only_new, only_cached = words - cached_words, cached_words - words
+    return any(
+        not any(_is_variant(word, other) for other in only_cached) for word in only_new
+    ) and any(
+        not any(_is_variant(word, other) for other in only_new) for word in only_cached
+    )
+
+
+@dataclass
+class _CacheEntry:
+    answer: str
+    slot: int
+    created_at: float
+
+
+class SemanticAnswerCache:
+    """LRU/TTL answer cache with an exact key and an embedding similarity index."""
+
+    def __init__(
+        self,
+        max_entries: int = FAQ_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = FAQ_CACHE_TTL_SECONDS,
+        similarity_threshold: float = FAQ_CACHE_SIMILARITY_THRESHOLD,
+        version_provider: Optional[Callable[[], Optional[str]]] = None,
+        version_check_seconds: float = FAQ_CACHE_VERSION_CHECK_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.version_provider = version_provider
+        self.version_check_seconds = version_check_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        # Row i of the matrix holds the embedding of the key stored in slot i
+        self._vectors = np.zeros((max_entries, EMBEDDING_DIM), dtype=np.float32)
+        self._slot_keys: list[Optional[str]] = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._corpus_version: Optional[str] = None
+        self._version_checked_at = 0.0
+        self._version_check: Optional[Future] = None
+        self._version_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="faq-cache-version")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._vectors[entry.slot] = 0.0
+        self._slot_keys[entry.slot] = None
+        self._free_slots.append(entry.slot)
+
+    def _is_expired(self, entry: _CacheEntry, now: float) -> bool:
+        return now - entry.created_at > self.ttl_seconds
+
+    def _schedule_version_check(self, now: float) -> None:
+        """Starts a background version check when one is due. Caller holds the lock."""
+        if self.version_provider is None or now - self._version_checked_at < self.version_check_seconds:
+            return
+        if self._version_check is not None and not self._version_check.done():
+            return
+        self._version_checked_at = now
+        self._version_check = self._version_executor.submit(self._check_corpus_version)
+
+    def _check_corpus_version(self) -> None:
+        try:
+            version = self.version_provider()
+        except Exception as e:
+            print(f"Could not check packaging corpus version: {e}")
+            return
+        with self._lock:
+            if version != self._corpus_version:
+                if self._corpus_version is not None:
+                    print(f"Packaging corpus changed ({self._corpus_version} -> {version}), clearing FAQ answer cache")
+                self._corpus_version = version
+                self._clear()
+
+    def _clear(self) -> None:
+        for key in list(self._entries):
+            self._remove(key)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def lookup(self, query: str) -> Optional[str]:
+        key = normalize_query(query)
+        if not key:
+            return None
+        now = time.time()
+        with self._lock:
+            self._schedule_version_check(now)
+            entry = self._entries.get(key)
+            if entry is None and self._entries:
+                scores = self._vectors @ embed_text(key)
+                slot = int(np.argmax(scores))
+                cached_key = self._slot_keys[slot]
+                if (
+                    scores[slot] >= self.similarity_threshold
+                    and cached_key is not None
+                    and not swaps_words(key, cached_key)
+                ):
+                    key = cached_key
+                    entry = self._entries[key]
+            if entry is not None and self._is_expired(entry, now):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.answer
+
+    def store(self, query: str, answer: str) -> None:
+        key = normalize_query(query)
+        if not key or not answer:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if not self._free_slots:
+                self._remove(next(iter(self._entries)))
+            slot = self._free_slots.pop()
+            self._vectors[slot] = embed_text(key)
+            self._slot_keys[slot] = key
+            self._entries[key] = _CacheEntry(answer=answer, slot=slot, created_at=time.time())
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _user_query(callback_context: CallbackContext) -> str:
+    content = callback_context.user_content
+    if not content or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+def _packaging_corpus_version() -> Optional[str]:
+    from .tools.retrieval import get_retrieval_backend
+
+    return get_retrieval_backend("packaging_guidelines").version()
+
+
+answer_cache = SemanticAnswerCache(version_provider=_packaging_corpus_version)
+
+
+def serve_cached_answer(callback_context: CallbackContext) -> Optional[types.Content]:
+    """before_agent_callback: answers from the cache and skips the agent on a hit."""
+    callback_context.state[RAG_STATUS_STATE_KEY] = None
+    query = _user_query(callback_context)
+    answer = answer_cache.lookup(query) if query else None
+    if answer is None:
+        return None
+    print(f"FAQ answer cache hit for: {query}")
+    return types.Content(role="model", parts=[types.Part(text=answer)])
+
+
+def store_answer(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+    """after_model_callback: caches final answers grounded in a successful rag_query."""
+    if llm_response.partial or not llm_response.content or not llm_response.content.parts:
+        return None
+    parts = llm_response.content.parts
+    if any(part.function_call for part in parts):
+        return None
+    if callback_context.state.get(RAG_STATUS_STATE_KEY) != "success":
+        return None
+    answer = "".join(part.text for part in parts if part.text)
+    query = _user_query(callback_context)
+    if query and answer:
+        answer_cache.store(query, answer)
+    return None
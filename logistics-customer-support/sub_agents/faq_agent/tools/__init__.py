@@ -3,6 +3,7 @@ RAG Tools package for interacting with Vertex AI RAG corpora.
 """
 
 from .rag_query import rag_query
+from .rag_batch_query import rag_batch_query
 from .utils import (
     check_corpus_exists,
     get_corpus_resource_name,
@@ -11,4 +12,5 @@ from .utils import (
 
 __all__ = [
     "rag_query",
+    "rag_batch_query",
 ]
@@ -0,0 +1,82 @@
+"""
+Latency and recall benchmark of the local retrieval backend against Vertex AI RAG.
+
+Vertex results are taken as the reference. Recall@k is the share of source
+documents returned by Vertex for a query that the local backend also returns.
+
+Usage (from the logistics-customer-support folder, after building the index):
+    python -m sub_agents.faq_agent.tools.benchmark_retrieval [queries.txt]
+"""
+
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from .rag_query import DEFAULT_DISTANCE_THRESHOLD, DEFAULT_TOP_K
+from .retrieval import RetrievalBackend, get_retrieval_backend
+
+CORPUS_NAME = "packaging_guidelines"
+
+SAMPLE_QUERIES = [
+    "How do I pack liquids?",
+    "Can I ship lithium batteries?",
+    "How should I pack glass items?",
+    "What is the maximum weight for a package?",
+    "How do I ship perishable food?",
+    "What box should I use for electronics?",
+    "How do I label a fragile package?",
+    "Can I reuse an old shipping box?",
+]
+
+
+def _latencies_ms(backend: RetrievalBackend, queries: List[str]) -> Dict[str, float]:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        backend.retrieve(query, DEFAULT_TOP_K, DEFAULT_DISTANCE_THRESHOLD)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+    }
+
+
+def _sources(contexts: List[Dict]) -> set:
+    return {context["source_name"] or context["source_uri"] for context in contexts}
+
+
+def run(queries: List[str]) -> Dict:
+    vertex = get_retrieval_backend(CORPUS_NAME, backend="vertex")
+    local = get_retrieval_backend(CORPUS_NAME, backend="local")
+
+    recalls = []
+    for query in queries:
+        expected = _sources(vertex.retrieve(query, DEFAULT_TOP_K, DEFAULT_DISTANCE_THRESHOLD))
+        if not expected:
+            continue
+        found = _sources(local.retrieve(query, DEFAULT_TOP_K, DEFAULT_DISTANCE_THRESHOLD))
+        recalls.append(len(expected & found) / len(expected))
+
+    start = time.perf_counter()
+    local.retrieve_batch(queries, DEFAULT_TOP_K, DEFAULT_DISTANCE_THRESHOLD)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "queries": len(queries),
+        "top_k": DEFAULT_TOP_K,
+        "vertex": _latencies_ms(vertex, queries),
+        "local": _latencies_ms(local, queries),
+        "local_batch_per_query_ms": round(batch_ms / len(queries), 3),
+        f"recall_at_{DEFAULT_TOP_K}": round(statistics.mean(recalls), 3) if recalls else None,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            benchmark_queries = [line.strip() for line in f if line.strip()]
+    else:
+        benchmark_queries = SAMPLE_QUERIES
+    print(run(benchmark_queries))
@@ -0,0 +1,114 @@
+"""
+Post-retrieval packing of FAQ contexts into a token budget.
+
+Retrieved guideline chunks are long and often overlap. Before contexts go
+back to the model they are:
+
+1. deduplicated, by dropping passages nearly identical to a better-ranked one
+2. trimmed to the max_sentences sentences most relevant to the query, kept
+   in their original order
+3. packed, best-ranked first, until FAQ_CONTEXT_TOKEN_BUDGET is reached
+
+Relevance and duplicate checks use the local hashing embeddings, so packing
+makes no model or network call.
+"""
+
+import os
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .embeddings import embed_texts
+
+FAQ_CONTEXT_TOKEN_BUDGET = int(os.environ.get("FAQ_CONTEXT_TOKEN_BUDGET", 1200))
+FAQ_CONTEXT_MAX_SENTENCES = int(os.environ.get("FAQ_CONTEXT_MAX_SENTENCES", 5))
+FAQ_CONTEXT_DEDUP_SIMILARITY = float(os.environ.get("FAQ_CONTEXT_DEDUP_SIMILARITY", 0.9))
+
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about 4 characters per token."""
+    return (len(text) + 3) // 4
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_PATTERN.split(text) if s and s.strip() and s.strip() != "..."]
+
+
+def _dedup(contexts: List[Dict]) -> Tuple[List[Dict], int]:
+    """Keeps contexts in rank order, dropping those too similar to one already kept."""
+    if len(contexts) < 2:
+        return contexts, 0
+    vectors = embed_texts(context["text"] for context in contexts)
+    kept: List[int] = []
+    for index in range(len(contexts)):
+        if kept and float(np.max(vectors[kept] @ vectors[index])) >= FAQ_CONTEXT_DEDUP_SIMILARITY:
+            continue
+        kept.append(index)
+    return [contexts[i] for i in kept], len(contexts) - len(kept)
+
+
+def _ranked_sentences(text: str, query_vectors: np.ndarray, max_sentences: int) -> List[Tuple[int, str]]:
+    """Returns up to max_sentences (position, sentence) pairs, most relevant to any query first."""
+    sentences = list(dict.fromkeys(split_sentences(text)))
+    if not sentences:
+        return []
+    scores = (embed_texts(sentences) @ query_vectors.T).max(axis=1)
+    order = np.argsort(-scores, kind="stable")[:max_sentences]
+    return [(int(i), sentences[int(i)]) for i in order]
+
+
+def pack_contexts(
+    queries: List[str],
+    contexts: List[Dict],
+    token_budget: int = FAQ_CONTEXT_TOKEN_BUDGET,
+    max_sentences: int = FAQ_CONTEXT_MAX_SENTENCES,
+) -> Tuple[List[Dict], Dict]:
+    """
+    Dedups, trims and packs ranked contexts into token_budget.
+
+    Returns the packed contexts and a stats dict with tokens_before,
+    tokens_after, tokens_saved, duplicates_dropped and contexts_dropped. A
+    budget of 0 or less disables packing. The packed list is empty when no
+    sentence fits the budget; callers report that rather than an answer.
+    """
+    tokens_before = sum(estimate_tokens(context["text"]) for context in contexts)
+    if token_budget <= 0 or not contexts:
+        stats = {
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_before,
+            "tokens_saved": 0,
+            "duplicates_dropped": 0,
+            "contexts_dropped": 0,
+        }
+        return contexts, stats
+
+    unique, duplicates = _dedup(contexts)
+    query_vectors = embed_texts(queries)
+
+    packed: List[Dict] = []
+    remaining = token_budget
+    for context in unique:
+        chosen = []
+        for position, sentence in _ranked_sentences(context["text"], query_vectors, max_sentences):
+            cost = estimate_tokens(sentence)
+            if cost <= remaining:
+                chosen.append((position, sentence))
+                remaining -= cost
+        if chosen:
+            text = " ".join(sentence for _, sentence in sorted(chosen))
+            packed.append({**context, "text": text})
+        if remaining <= 0:
+            break
+
+    tokens_after = sum(estimate_tokens(context["text"]) for context in packed)
+    stats = {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+        "duplicates_dropped": duplicates,
+        "contexts_dropped": len(unique) - len(packed),
+    }
+    return packed, stats
@@ -0,0 +1,55 @@
+"""
+Local text embeddings for the FAQ tools.
+
+A hashing vectorizer over word unigrams, word bigrams and character trigrams.
+It needs no model or network call, is stable across processes, and is good
+enough to tell near-duplicate packaging questions and passages apart.
+"""
+
+import re
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+EMBEDDING_DIM = 512
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the i me my we our you your it its is are was be do does did how what "
+    "can could should would to of in on for with and or please".split()
+)
+
+
+def normalize_query(text: str) -> str:
+    """Lowercases, strips punctuation and stopwords, and collapses whitespace."""
+    tokens = [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+    return " ".join(tokens)
+
+
+def _features(text: str) -> List[str]:
+    tokens = [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+    features = list(tokens)
+    features.extend(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    for token in tokens:
+        padded = f"#{token}#"
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+
+def embed_texts(texts: Iterable[str], dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Returns an L2-normalized float32 matrix with one row per text."""
+    texts = list(texts)
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            matrix[row, digest % dim] += sign
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def embed_text(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    return embed_texts([text], dim)[0]
@@ -0,0 +1,108 @@
+"""
+Tool for answering compound packaging questions with one batched retrieval.
+"""
+
+import logging
+from typing import List
+
+from google.adk.tools.tool_context import ToolContext
+
+from .context_packing import pack_contexts
+from .rag_query import DEFAULT_DISTANCE_THRESHOLD, DEFAULT_TOP_K, RAG_STATUS_STATE_KEY
+from .retrieval import FAQ_RETRIEVAL_BACKEND, get_retrieval_backend, merge_contexts
+from .utils import check_corpus_exists
+
+MAX_SUB_QUERIES = 8
+
+
+def rag_batch_query(
+    queries: List[str],
+    tool_context: ToolContext,
+) -> dict:
+    """
+    Query the packaging guidelines corpus with several sub-questions at once.
+
+    Use this instead of calling rag_query repeatedly when the user asks about
+    more than one thing, e.g. "can I ship batteries and how should I pack glass?"
+    becomes ["can I ship batteries", "how should I pack glass"].
+
+    Args:
+        queries (List[str]): The sub-questions to search for in the corpus
+        tool_context (ToolContext): The tool context
+
+    Returns:
+        dict: One merged result set, deduplicated by source and ranked by relevance
+    """
+    corpus_name = "packaging_guidelines"
+    queries = [q.strip() for q in queries if q and q.strip()][:MAX_SUB_QUERIES]
+    try:
+        if not queries:
+            return {
+                "status": "error",
+                "message": "No queries provided.",
+                "queries": queries,
+                "corpus_name": corpus_name,
+            }
+
+        tool_context.state["current_corpus"] = corpus_name
+        if FAQ_RETRIEVAL_BACKEND == "vertex" and not check_corpus_exists(corpus_name, tool_context):
+            return {
+                "status": "error",
+                "message": f"Corpus '{corpus_name}' does not exist. Please create it first using the create_corpus tool.",
+                "queries": queries,
+                "corpus_name": corpus_name,
+            }
+
+        print(f"Performing batched retrieval for {len(queries)} queries...")
+        backend = get_retrieval_backend(corpus_name)
+        per_query = backend.retrieve_batch(
+            queries,
+            top_k=DEFAULT_TOP_K,
+            distance_threshold=DEFAULT_DISTANCE_THRESHOLD,
+        )
+        results = merge_contexts(queries, per_query)
+
+        if not results:
+            return {
+                "status": "warning",
+                "message": f"No results found in corpus '{corpus_name}' for queries: {queries}",
+                "queries": queries,
+                "corpus_name": corpus_name,
+                "results": [],
+                "results_count": 0,
+            }
+
+        retrieved_count = len(results)
+        results, packing_stats = pack_contexts(queries, results)
+        print(f"Context packing saved {packing_stats['tokens_saved']} tokens")
+        if not results:
+            return {
+                "status": "warning",
+                "message": f"Found {retrieved_count} results in corpus '{corpus_name}' for queries: {queries}, but none fit the context token budget",
+                "queries": queries,
+                "corpus_name": corpus_name,
+                "results": [],
+                "results_count": 0,
+                "context_packing": packing_stats,
+            }
+
+        tool_context.state[RAG_STATUS_STATE_KEY] = "success"
+        return {
+            "status": "success",
+            "message": f"Successfully queried corpus '{corpus_name}' with {len(queries)} queries",
+            "queries": queries,
+            "corpus_name": corpus_name,
+            "results": results,
+            "results_count": len(results),
+            "context_packing": packing_stats,
+        }
+
+    except Exception as e:
+        error_msg = f"Error querying corpus: {str(e)}"
+        logging.error(error_msg)
+        return {
+            "status": "error",
+            "message": error_msg,
+            "queries": queries,
+            "corpus_name": corpus_name,
+        }
@@ -1,18 +1,23 @@
 """
-Tool for querying Vertex AI RAG corpora and retrieving relevant information.
+Tool for querying the packaging guidelines corpus (Vertex AI RAG or the local index) and retrieving relevant information.
 """
 
 import logging
 
 from google.adk.tools.tool_context import ToolContext
-from vertexai import rag
 
 DEFAULT_TOP_K = 3
 DEFAULT_DISTANCE_THRESHOLD = 0.5
 
+# Records the outcome of the latest query, so the answer cache only keeps
+# answers grounded in a successful retrieval
+RAG_STATUS_STATE_KEY = "faq_rag_status"
 
 
-from .utils import check_corpus_exists, get_corpus_resource_name
+
+from .context_packing import pack_contexts
+from .retrieval import FAQ_RETRIEVAL_BACKEND, get_retrieval_backend
+from .utils import check_corpus_exists
 
 
 def rag_query(
@@ -37,8 +42,8 @@ def rag_query(
         corpus_name = "packaging_guidelines"
         tool_context.state["current_corpus"] = corpus_name
 
-        # Check if the corpus exists
-        if not check_corpus_exists(corpus_name, tool_context):
+        # Only the Vertex backend needs the corpus to exist remotely
+        if FAQ_RETRIEVAL_BACKEND == "vertex" and not check_corpus_exists(corpus_name, tool_context):
             return {
                 "status": "error",
                 "message": f"Corpus '{corpus_name}' does not exist. Please create it first using the create_corpus tool.",
@@ -46,45 +51,15 @@ def rag_query(
                 "corpus_name": corpus_name,
             }
 
-        # Get the corpus resource name
-        corpus_resource_name = get_corpus_resource_name(corpus_name)
-
-        # Configure retrieval parameters
-        rag_retrieval_config = rag.RagRetrievalConfig(
-            top_k=DEFAULT_TOP_K,
-            filter=rag.Filter(vector_distance_threshold=DEFAULT_DISTANCE_THRESHOLD),
-        )
-
         # Perform the query
         print("Performing retrieval query...")
-        response = rag.retrieval_query(
-            rag_resources=[
-                rag.RagResource(
-                    rag_corpus=corpus_resource_name,
-                )
-            ],
-            text=query,
-            rag_retrieval_config=rag_retrieval_config,
+        backend = get_retrieval_backend(corpus_name)
+        results = backend.retrieve(
+            query,
+            top_k=DEFAULT_TOP_K,
+            distance_threshold=DEFAULT_DISTANCE_THRESHOLD,
         )
 
-        # Process the response into a more usable format
-        results = []
-        if hasattr(response, "contexts") and response.contexts:
-            for ctx_group in response.contexts.contexts:
-                result = {
-                    "source_uri": (
-                        ctx_group.source_uri if hasattr(ctx_group, "source_uri") else ""
-                    ),
-                    "source_name": (
-                        ctx_group.source_display_name
-                        if hasattr(ctx_group, "source_display_name")
-                        else ""
-                    ),
-                    "text": ctx_group.text if hasattr(ctx_group, "text") else "",
-                    "score": ctx_group.score if hasattr(ctx_group, "score") else 0.0,
-                }
-                results.append(result)
-
         # If we didn't find any results
         if not results:
             return {
@@ -96,6 +71,22 @@ def rag_query(
                 "results_count": 0,
             }
 
+        # Keep only the relevant sentences, within the context token budget
+        retrieved_count = len(results)
+        results, packing_stats = pack_contexts([query], results)
+        print(f"Context packing saved {packing_stats['tokens_saved']} tokens")
+        if not results:
+            return {
+                "status": "warning",
+                "message": f"Found {retrieved_count} results in corpus '{corpus_name}' for query: '{query}', but none fit the context token budget",
+                "query": query,
+                "corpus_name": corpus_name,
+                "results": [],
+                "results_count": 0,
+                "context_packing": packing_stats,
+            }
+
+        tool_context.state[RAG_STATUS_STATE_KEY] = "success"
         return {
             "status": "success",
             "message": f"Successfully queried corpus '{corpus_name}'",
@@ -103,6 +94,7 @@ def rag_query(
             "corpus_name": corpus_name,
             "results": results,
             "results_count": len(results),
+            "context_packing": packing_stats,
         }
 
     except Exception as e:
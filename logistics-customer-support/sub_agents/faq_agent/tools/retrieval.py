@@ -0,0 +1,328 @@
+"""
+Retrieval backends for the packaging guidelines.
+
+rag_query asks a RetrievalBackend for contexts instead of calling Vertex AI
+directly. Two backends are available, selected with FAQ_RETRIEVAL_BACKEND:
+
+- "vertex" (default): Vertex AI RAG retrieval against the corpus.
+- "local": an offline index of chunked guideline documents, with embeddings
+  kept in a memory-mapped NumPy matrix and searched in batches.
+
+Both return the same context dicts. Their "score" is a vector distance, where
+lower means closer, as in the Vertex response.
+
+build_local_index writes new index files next to the old ones and renames
+them into place, so a running backend keeps reading the files it mapped. The
+shared local backend is reloaded when the files on disk change.
+"""
+
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+from vertexai import rag
+
+from .embeddings import EMBEDDING_DIM, embed_texts
+from .utils import get_corpus_resource_name, get_corpus_version
+
+FAQ_RETRIEVAL_BACKEND = os.environ.get("FAQ_RETRIEVAL_BACKEND", "vertex").lower()
+FAQ_LOCAL_INDEX_DIR = os.environ.get(
+    "FAQ_LOCAL_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "local_index"),
+)
+
+# Hashing-embedding distances run higher than Vertex embedding distances, so
+# the local index has its own cut-off. Set to an empty value to apply the
+# caller's threshold (DEFAULT_DISTANCE_THRESHOLD) unchanged.
+FAQ_LOCAL_DISTANCE_THRESHOLD = os.environ.get("FAQ_LOCAL_DISTANCE_THRESHOLD", "0.8")
+
+# Concurrent Vertex retrieval calls made by one batched query
+FAQ_RETRIEVAL_MAX_WORKERS = int(os.environ.get("FAQ_RETRIEVAL_MAX_WORKERS", 8))
+
+CHUNK_CHARS = 800
+CHUNK_OVERLAP_CHARS = 100
+# Rows scored per block, bounds memory when the index is larger than RAM
+SEARCH_BLOCK_ROWS = 65536
+
+_EMBEDDINGS_FILE = "embeddings.npy"
+_CHUNKS_FILE = "chunks.jsonl"
+_DOCUMENT_EXTENSIONS = (".txt", ".md")
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalBackend:
+    """Base class for FAQ retrieval backends."""
+
+    name = "base"
+
+    def retrieve(self, query: str, top_k: int, distance_threshold: float) -> List[Dict]:
+        return self.retrieve_batch([query], top_k, distance_threshold)[0]
+
+    def retrieve_batch(self, queries: List[str], top_k: int, distance_threshold: float) -> List[List[Dict]]:
+        return [self.retrieve(query, top_k, distance_threshold) for query in queries]
+
+    def version(self) -> Optional[str]:
+        """A fingerprint that changes whenever the indexed documents change."""
+        return None
+
+
+class VertexRagBackend(RetrievalBackend):
+    """Retrieval through Vertex AI RAG (one network round trip per query)."""
+
+    name = "vertex"
+
+    def __init__(self, corpus_name: str):
+        self.corpus_name = corpus_name
+
+    def version(self) -> Optional[str]:
+        return get_corpus_version(self.corpus_name)
+
+    def retrieve(self, query: str, top_k: int, distance_threshold: float) -> List[Dict]:
+        rag_retrieval_config = rag.RagRetrievalConfig(
+            top_k=top_k,
+            filter=rag.Filter(vector_distance_threshold=distance_threshold),
+        )
+        response = rag.retrieval_query(
+            rag_resources=[
+                rag.RagResource(
+                    rag_corpus=get_corpus_resource_name(self.corpus_name),
+                )
+            ],
+            text=query,
+            rag_retrieval_config=rag_retrieval_config,
+        )
+
+        results = []
+        if hasattr(response, "contexts") and response.contexts:
+            for ctx_group in response.contexts.contexts:
+                results.append({
+                    "source_uri": (
+                        ctx_group.source_uri if hasattr(ctx_group, "source_uri") else ""
+                    ),
+                    "source_name": (
+                        ctx_group.source_display_name
+                        if hasattr(ctx_group, "source_display_name")
+                        else ""
+                    ),
+                    "text": ctx_group.text if hasattr(ctx_group, "text") else "",
+                    "score": ctx_group.score if hasattr(ctx_group, "score") else 0.0,
+                })
+        return results
+
+    def retrieve_batch(self, queries: List[str], top_k: int, distance_threshold: float) -> List[List[Dict]]:
+        """Runs one retrieval call per query, concurrently."""
+        if len(queries) <= 1:
+            return [self.retrieve(query, top_k, distance_threshold) for query in queries]
+        return list(_vertex_pool.map(
+            lambda query: self.retrieve(query, top_k, distance_threshold), queries
+        ))
+
+
+# Worker threads are only started once a batch actually needs them
+_vertex_pool = ThreadPoolExecutor(
+    max_workers=FAQ_RETRIEVAL_MAX_WORKERS, thread_name_prefix="faq-retrieval"
+)
+
+
+def merge_contexts(queries: List[str], results: List[List[Dict]]) -> List[Dict]:
+    """
+    Merges per-query contexts into one list ranked by distance.
+
+    Contexts from the same source_uri are folded into one entry. That entry
+    keeps the best (lowest) score, every distinct passage text, and the
+    sub-queries that matched it.
+    """
+    merged: Dict[str, Dict] = {}
+    for query, contexts in zip(queries, results):
+        for context in contexts:
+            key = context["source_uri"] or context["text"]
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = {**context, "passages": [context["text"]], "matched_queries": [query]}
+                continue
+            if context["text"] not in entry["passages"]:
+                entry["passages"].append(context["text"])
+            if query not in entry["matched_queries"]:
+                entry["matched_queries"].append(query)
+            entry["score"] = min(entry["score"], context["score"])
+
+    ranked = sorted(merged.values(), key=lambda entry: entry["score"])
+    for entry in ranked:
+        entry["text"] = "\n...\n".join(entry.pop("passages"))
+    return ranked
+
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP_CHARS) -> List[str]:
+    """Packs paragraphs into chunks of about chunk_chars, splitting long paragraphs with overlap."""
+    chunks: List[str] = []
+    current = ""
+    for paragraph in (p.strip() for p in text.split("\n\n")):
+        if not paragraph:
+            continue
+        while len(paragraph) > chunk_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:chunk_chars])
+            paragraph = paragraph[chunk_chars - overlap:]
+        if current and len(current) + len(paragraph) + 2 > chunk_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_local_index(docs_dir: str, index_dir: str = FAQ_LOCAL_INDEX_DIR) -> int:
+    """
+    Chunks every .txt/.md document under docs_dir and writes the local index.
+
+    Returns the number of chunks indexed.
+    """
+    chunks = []
+    for root, _, files in os.walk(docs_dir):
+        for filename in sorted(files):
+            if not filename.lower().endswith(_DOCUMENT_EXTENSIONS):
+                continue
+            path = os.path.join(root, filename)
+            with open(path, "r", encoding="utf-8") as f:
+                for text in chunk_text(f.read()):
+                    chunks.append({"source_uri": path, "source_name": filename, "text": text})
+
+    os.makedirs(index_dir, exist_ok=True)
+    embeddings = embed_texts(chunk["text"] for chunk in chunks)
+    # A running backend has the old embeddings memory-mapped; rewriting that
+    # file in place could hand it garbage or SIGBUS, so replace it instead
+    embeddings_path = os.path.join(index_dir, _EMBEDDINGS_FILE)
+    chunks_path = os.path.join(index_dir, _CHUNKS_FILE)
+    suffix = f".{os.getpid()}.tmp"
+    with open(embeddings_path + suffix, "wb") as f:
+        np.save(f, embeddings)
+    with open(chunks_path + suffix, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk) + "\n")
+    os.replace(embeddings_path + suffix, embeddings_path)
+    os.replace(chunks_path + suffix, chunks_path)
+    logger.info(f"Indexed {len(chunks)} chunks from {docs_dir} into {index_dir}")
+    return len(chunks)
+
+
+def local_index_version(index_dir: str = FAQ_LOCAL_INDEX_DIR) -> str:
+    """Size, modification time and inode of the index files, which build_local_index replaces."""
+    parts = []
+    for filename in (_EMBEDDINGS_FILE, _CHUNKS_FILE):
+        stat = os.stat(os.path.join(index_dir, filename))
+        parts.append(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}")
+    return ";".join(parts)
+
+
+class LocalVectorBackend(RetrievalBackend):
+    """Offline cosine search over a memory-mapped embedding matrix."""
+
+    name = "local"
+
+    def __init__(
+        self,
+        index_dir: str = FAQ_LOCAL_INDEX_DIR,
+        distance_threshold: Optional[float] = (
+            float(FAQ_LOCAL_DISTANCE_THRESHOLD) if FAQ_LOCAL_DISTANCE_THRESHOLD else None
+        ),
+    ):
+        self.index_dir = index_dir
+        self.distance_threshold = distance_threshold
+        self._version = local_index_version(index_dir)
+        self.embeddings = np.load(os.path.join(index_dir, _EMBEDDINGS_FILE), mmap_mode="r")
+        with open(os.path.join(index_dir, _CHUNKS_FILE), "r", encoding="utf-8") as f:
+            self.chunks = [json.loads(line) for line in f]
+        if self.embeddings.shape != (len(self.chunks), EMBEDDING_DIM):
+            raise ValueError(
+                f"Local index in {index_dir} is inconsistent: "
+                f"{self.embeddings.shape} embeddings for {len(self.chunks)} chunks"
+            )
+
+    def version(self) -> Optional[str]:
+        """The local_index_version of the files this backend loaded."""
+        return self._version
+
+    def retrieve_batch(self, queries: List[str], top_k: int, distance_threshold: float) -> List[List[Dict]]:
+        if not queries:
+            return []
+        num_chunks = len(self.chunks)
+        if num_chunks == 0:
+            return [[] for _ in queries]
+        top_k = min(top_k, num_chunks)
+        if self.distance_threshold is not None:
+            distance_threshold = self.distance_threshold
+        query_vectors = embed_texts(queries).T
+
+        # Keep the best top_k per query across blocks of the matrix
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, num_chunks, SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.embeddings[start:start + SEARCH_BLOCK_ROWS])
+            scores = (block @ query_vectors).T
+            rows = np.broadcast_to(np.arange(start, start + block.shape[0]), scores.shape)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            if best_scores.shape[1] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        results = []
+        for query_index in range(len(queries)):
+            contexts = []
+            for column in order[query_index]:
+                distance = 1.0 - float(best_scores[query_index, column])
+                if distance > distance_threshold:
+                    continue
+                chunk = self.chunks[int(best_rows[query_index, column])]
+                contexts.append({**chunk, "score": round(distance, 6)})
+            results.append(contexts)
+        return results
+
+
+_local_backend: Optional[LocalVectorBackend] = None
+_local_backend_lock = threading.Lock()
+
+
+def _current_local_backend() -> LocalVectorBackend:
+    """The shared local backend, reloaded if the index files changed since it was loaded."""
+    global _local_backend
+    with _local_backend_lock:
+        try:
+            if _local_backend is None or _local_backend.version() != local_index_version(FAQ_LOCAL_INDEX_DIR):
+                _local_backend = LocalVectorBackend(FAQ_LOCAL_INDEX_DIR)
+        except (OSError, ValueError) as e:
+            # Caught between the two renames of a rebuild, or the index was removed
+            if _local_backend is None:
+                raise
+            logger.warning(f"Keeping the loaded local index, could not reload it: {e}")
+        return _local_backend
+
+
+def get_retrieval_backend(corpus_name: str, backend: Optional[str] = None) -> RetrievalBackend:
+    """Returns the configured backend (FAQ_RETRIEVAL_BACKEND unless overridden)."""
+    backend = (backend or FAQ_RETRIEVAL_BACKEND).lower()
+    if backend == "local":
+        return _current_local_backend()
+    if backend == "vertex":
+        return VertexRagBackend(corpus_name)
+    raise ValueError(f"Unknown FAQ retrieval backend '{backend}', expected 'vertex' or 'local'")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m sub_agents.faq_agent.tools.retrieval <docs_dir> [index_dir]")
+        sys.exit(1)
+    count = build_local_index(*sys.argv[1:3])
+    print(f"Indexed {count} chunks")
@@ -2,8 +2,12 @@
 Utility functions for the RAG tools.
 """
 
+import hashlib
 import logging
 import re
+import threading
+import time
+from typing import Dict, Optional
 
 from google.adk.tools.tool_context import ToolContext
 from vertexai import rag
@@ -12,9 +16,122 @@ import os
 PROJECT_ID = os.environ.get("GOOGLE_CLOUD_PROJECT")
 LOCATION = os.environ.get("GOOGLE_CLOUD_LOCATION")
 
+CORPUS_REGISTRY_TTL_SECONDS = float(os.environ.get("CORPUS_REGISTRY_TTL_SECONDS", 300))
+# Minimum gap between forced refreshes when a lookup misses
+CORPUS_REGISTRY_MISS_REFRESH_SECONDS = float(os.environ.get("CORPUS_REGISTRY_MISS_REFRESH_SECONDS", 30))
+
 logger = logging.getLogger(__name__)
 
 
+class CorpusRegistry:
+    """
+    Process-wide map of RAG corpus display names to resource names.
+
+    The corpora are listed once on first use and shared by every session and
+    thread. When the TTL runs out, lookups keep using the current map while a
+    background thread lists the corpora again. A lookup miss forces at most
+    one synchronous refresh per CORPUS_REGISTRY_MISS_REFRESH_SECONDS, so a
+    newly created corpus is picked up quickly. Failed listings count towards
+    those limits too.
+
+    Only one listing runs at a time. A caller that needs a refresh while one
+    is running waits for its result instead of starting another.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = CORPUS_REGISTRY_TTL_SECONDS,
+        miss_refresh_seconds: float = CORPUS_REGISTRY_MISS_REFRESH_SECONDS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.miss_refresh_seconds = miss_refresh_seconds
+        self._lock = threading.Lock()
+        self._refreshed = threading.Condition(self._lock)
+        self._by_display_name: Dict[str, str] = {}
+        self._resource_names: frozenset = frozenset()
+        # Last successful listing, and last listing attempted (successful or not)
+        self._loaded_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._refreshing = False
+
+    def refresh(self) -> None:
+        """List the corpora and atomically swap in the new map, or wait for the listing already running."""
+        with self._lock:
+            if self._refreshing:
+                while self._refreshing:
+                    self._refreshed.wait()
+                return
+            self._refreshing = True
+        self._list_corpora()
+
+    def _list_corpora(self) -> None:
+        """Runs one listing. The caller has set _refreshing."""
+        try:
+            corpora = list(rag.list_corpora())
+        except Exception as e:
+            logger.warning(f"Error listing corpora: {str(e)}")
+            corpora = None
+        with self._lock:
+            if corpora is not None:
+                self._by_display_name = {
+                    corpus.display_name: corpus.name
+                    for corpus in corpora
+                    if getattr(corpus, "display_name", None)
+                }
+                self._resource_names = frozenset(corpus.name for corpus in corpora)
+                self._loaded_at = time.monotonic()
+            self._attempted_at = time.monotonic()
+            self._refreshing = False
+            self._refreshed.notify_all()
+
+    def _since_attempt(self) -> float:
+        """Seconds since the last listing attempt. Caller holds the lock."""
+        return float("inf") if self._attempted_at is None else time.monotonic() - self._attempted_at
+
+    def _ensure_fresh(self) -> None:
+        with self._lock:
+            never_loaded = self._loaded_at is None
+            if never_loaded:
+                # Not loaded yet: list now, unless a listing just failed
+                list_now = self._refreshing or self._since_attempt() >= self.miss_refresh_seconds
+                start_background = False
+            else:
+                list_now = False
+                start_background = not self._refreshing and self._since_attempt() >= self.ttl_seconds
+                if start_background:
+                    self._refreshing = True
+        if list_now:
+            self.refresh()
+        elif start_background:
+            threading.Thread(target=self._list_corpora, name="corpus-registry-refresh", daemon=True).start()
+
+    def _refresh_after_miss(self) -> bool:
+        with self._lock:
+            if not self._refreshing and self._since_attempt() < self.miss_refresh_seconds:
+                return False
+        self.refresh()
+        return True
+
+    def resolve(self, display_name: str) -> Optional[str]:
+        """Returns the resource name of the corpus with this display name, if any."""
+        self._ensure_fresh()
+        resource_name = self._by_display_name.get(display_name)
+        if resource_name is None and self._refresh_after_miss():
+            resource_name = self._by_display_name.get(display_name)
+        return resource_name
+
+    def exists(self, corpus_name: str, corpus_resource_name: str) -> bool:
+        self._ensure_fresh()
+
+        def _found() -> bool:
+            return corpus_resource_name in self._resource_names or corpus_name in self._by_display_name
+
+        return _found() or (self._refresh_after_miss() and _found())
+
+
+corpus_registry = CorpusRegistry()
+
+
 def get_corpus_resource_name(corpus_name: str) -> str:
     """
     Convert a corpus name to its full resource name if needed.
@@ -33,16 +150,9 @@ def get_corpus_resource_name(corpus_name: str) -> str:
         return corpus_name
 
     # Check if this is a display name of an existing corpus
-    try:
-        # List all corpora and check if there's a match with the display name
-        corpora = rag.list_corpora()
-        for corpus in corpora:
-            if hasattr(corpus, "display_name") and corpus.display_name == corpus_name:
-                return corpus.name
-    except Exception as e:
-        logger.warning(f"Error when checking for corpus display name: {str(e)}")
-        # If we can't check, continue with the default behavior
-        pass
+    resource_name = corpus_registry.resolve(corpus_name)
+    if resource_name:
+        return resource_name
 
     # If it contains partial path elements, extract just the corpus ID
     if "/" in corpus_name:
@@ -77,19 +187,14 @@ def check_corpus_exists(corpus_name: str, tool_context: ToolContext) -> bool:
         # Get full resource name
         corpus_resource_name = get_corpus_resource_name(corpus_name)
 
-        # List all corpora and check if this one exists
-        corpora = rag.list_corpora()
-        for corpus in corpora:
-            if (
-                corpus.name == corpus_resource_name
-                or corpus.display_name == corpus_name
-            ):
-                # Update state
-                tool_context.state[f"corpus_exists_{corpus_name}"] = True
-                # Also set this as the current corpus if no current corpus is set
-                if not tool_context.state.get("current_corpus"):
-                    tool_context.state["current_corpus"] = corpus_name
-                return True
+        # Check against the shared registry instead of listing corpora again
+        if corpus_registry.exists(corpus_name, corpus_resource_name):
+            # Update state
+            tool_context.state[f"corpus_exists_{corpus_name}"] = True
+            # Also set this as the current corpus if no current corpus is set
+            if not tool_context.state.get("current_corpus"):
+                tool_context.state["current_corpus"] = corpus_name
+            return True
 
         return False
     except Exception as e:
@@ -98,6 +203,31 @@ def check_corpus_exists(corpus_name: str, tool_context: ToolContext) -> bool:
         return False
 
 
+def get_corpus_version(corpus_name: str) -> Optional[str]:
+    """
+    Get a fingerprint that changes whenever files in the corpus are added, removed or updated.
+
+    Args:
+        corpus_name (str): The name of the corpus
+
+    Returns:
+        Optional[str]: A hash over the corpus files, or None if the corpus cannot be listed
+    """
+    try:
+        corpus_resource_name = get_corpus_resource_name(corpus_name)
+        fingerprint = hashlib.sha1()
+        files = sorted(
+            (rag_file.name, str(getattr(rag_file, "update_time", "")))
+            for rag_file in rag.list_files(corpus_name=corpus_resource_name)
+        )
+        for name, update_time in files:
+            fingerprint.update(f"{name}@{update_time};".encode("utf-8"))
+        return fingerprint.hexdigest()
+    except Exception as e:
+        logger.warning(f"Error getting version of corpus {corpus_name}: {str(e)}")
+        return None
+
+
 def set_current_corpus(corpus_name: str, tool_context: ToolContext) -> bool:
     """
     Set the current corpus in the tool context state.
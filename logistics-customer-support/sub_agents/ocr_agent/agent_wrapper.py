@@ -16,10 +16,10 @@ import logistics_ocr_agent
 from google.adk.agents import LoopAgent
 from google.adk.runners import Runner
 from google.adk.artifacts import InMemoryArtifactService
-from google.adk.sessions import InMemorySessionService
 from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
 from common.task_manager import AgentWithTaskManager
-
+# Resolved from the project root locally; the Dockerfile copies util/ into the image
+from util.session_store import SqliteSessionService
 
 
 class OcrAgent(AgentWithTaskManager):
@@ -37,7 +37,7 @@ class OcrAgent(AgentWithTaskManager):
             app_name=self._agent.name,
             agent=self._agent,
             artifact_service=InMemoryArtifactService(),
-            session_service=InMemorySessionService(),
+            session_service=SqliteSessionService(),
             memory_service=InMemoryMemoryService(),
         )
 
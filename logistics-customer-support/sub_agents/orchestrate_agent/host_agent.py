@@ -3,7 +3,10 @@ import asyncio
 import functools
 import json
 import uuid
+import os
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import List, Optional, Callable
 
 
@@ -32,6 +35,41 @@ from common.types import (
     TaskStatusUpdateEvent,
 )
 
+CARD_RESOLVE_TIMEOUT_SECONDS = float(os.environ.get("AGENT_CARD_TIMEOUT_SECONDS", 5))
+
+
+def resolve_agent_cards(
+    remote_agent_addresses: List[str],
+    timeout: float = CARD_RESOLVE_TIMEOUT_SECONDS,
+) -> List[AgentCard]:
+  """Resolves all agent cards concurrently.
+
+  Every address gets the same deadline measured from the start of discovery,
+  so one slow agent costs at most `timeout` seconds and is skipped rather
+  than blocking the others.
+  """
+  if not remote_agent_addresses:
+    return []
+  cards = []
+  executor = ThreadPoolExecutor(
+      max_workers=len(remote_agent_addresses),
+      thread_name_prefix="agent-card")
+  futures = {
+      address: executor.submit(A2ACardResolver(address).get_agent_card)
+      for address in remote_agent_addresses
+  }
+  deadline = time.monotonic() + timeout
+  for address, future in futures.items():
+    try:
+      cards.append(future.result(timeout=max(0, deadline - time.monotonic())))
+    except FutureTimeoutError:
+      print(f"Warning: Timed out resolving agent card from {address}", file=sys.stderr)
+    except Exception as e:
+      print(f"Warning: Failed to resolve agent card from {address}: {e}", file=sys.stderr)
+  # Don't wait for stragglers, they finish (or fail) on their own threads
+  executor.shutdown(wait=False)
+  return cards
+
 
 class HostAgent:
   """The orchestrate agent.
@@ -48,9 +86,7 @@ class HostAgent:
     self.task_callback = task_callback
     self.remote_agent_connections: dict[str, RemoteAgentConnections] = {}
     self.cards: dict[str, AgentCard] = {}
-    for address in remote_agent_addresses:
-      card_resolver = A2ACardResolver(address)
-      card = card_resolver.get_agent_card()
+    for card in resolve_agent_cards(remote_agent_addresses):
       remote_connection = RemoteAgentConnections(card)
       self.remote_agent_connections[card.name] = remote_connection
       self.cards[card.name] = card
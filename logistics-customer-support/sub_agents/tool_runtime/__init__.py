@@ -0,0 +1,5 @@
+"""Async execution layer for blocking tools, shared by the sub-agents and the OCR service."""
+
+from .executor import BlockingToolExecutor, ToolSaturatedError, offload_tool, tool_executor
+
+__all__ = ["BlockingToolExecutor", "ToolSaturatedError", "offload_tool", "tool_executor"]
@@ -0,0 +1,220 @@
+"""
+Runs blocking tool functions off the event loop.
+
+Tools such as rag_query, booking_tool or the OCR service's Vision and GCS
+helpers make blocking calls. Called directly from the event loop, one slow
+call freezes every other session in the process. offload_tool() wraps such a
+function in an async tool. The wrapper runs the function on a shared, bounded
+thread pool and caps how many calls of each tool run at once. Queue depth and
+timing counters are kept per tool.
+
+A tool can also be given admission control: max_queue caps how many calls
+may wait for a slot, and queue_timeout caps how long a call waits. A call
+over either limit raises ToolSaturatedError instead of queueing without bound.
+
+This is the only copy of the executor. The OCR service image (tools/) copies
+this package in at build time.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+TOOL_EXECUTOR_MAX_WORKERS = int(os.environ.get("TOOL_EXECUTOR_MAX_WORKERS", 32))
+TOOL_DEFAULT_CONCURRENCY = int(os.environ.get("TOOL_DEFAULT_CONCURRENCY", 8))
+
+
+def _configured_limit(tool_name: str, default: int) -> int:
+    """Per-tool override, e.g. TOOL_CONCURRENCY_RAG_QUERY=4."""
+    return int(os.environ.get(f"TOOL_CONCURRENCY_{tool_name.upper()}", default))
+
+
+def _configured_admission(tool_name: str, max_queue: Optional[int], queue_timeout: Optional[float]):
+    """Per-tool overrides, e.g. TOOL_MAX_QUEUE_UPLOAD_FILE=8 and TOOL_QUEUE_TIMEOUT_UPLOAD_FILE=2.5."""
+    max_queue = os.environ.get(f"TOOL_MAX_QUEUE_{tool_name.upper()}", max_queue)
+    queue_timeout = os.environ.get(f"TOOL_QUEUE_TIMEOUT_{tool_name.upper()}", queue_timeout)
+    return (
+        int(max_queue) if max_queue is not None else None,
+        float(queue_timeout) if queue_timeout is not None else None,
+    )
+
+
+class ToolSaturatedError(RuntimeError):
+    """Raised when a call is refused because the tool's queue is full or its wait timed out."""
+
+    def __init__(self, tool_name: str, reason: str, retry_after: float = 1.0):
+        super().__init__(f"{tool_name} is at capacity ({reason}), retry later")
+        self.tool_name = tool_name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ToolStats:
+    def __init__(self, limit: int, max_queue: Optional[int] = None, queue_timeout: Optional[float] = None):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_seconds_total = 0.0
+        self.run_seconds_total = 0.0
+
+    def snapshot(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "queue_timeout_s": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(self.wait_seconds_total / finished * 1000, 3) if finished else 0.0,
+            "avg_run_ms": round(self.run_seconds_total / finished * 1000, 3) if finished else 0.0,
+        }
+
+
+class BlockingToolExecutor:
+    """A bounded thread pool with a concurrency limit per tool."""
+
+    def __init__(
+        self,
+        max_workers: int = TOOL_EXECUTOR_MAX_WORKERS,
+        default_concurrency: int = TOOL_DEFAULT_CONCURRENCY,
+        thread_name_prefix: str = "agent-tool",
+    ):
+        self.default_concurrency = default_concurrency
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, ToolStats] = {}
+        # asyncio semaphores are bound to a loop, so keep one set per loop,
+        # keyed by the loop object itself. A semaphore refers back to its
+        # loop, so sets for closed loops are also pruned when a new loop shows up.
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def register(
+        self,
+        tool_name: str,
+        max_concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+    ) -> None:
+        limit = _configured_limit(tool_name, max_concurrency or self.default_concurrency)
+        max_queue, queue_timeout = _configured_admission(tool_name, max_queue, queue_timeout)
+        with self._lock:
+            if tool_name not in self._stats:
+                self._stats[tool_name] = ToolStats(limit, max_queue, queue_timeout)
+
+    def _semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._semaphores:
+                for closed in [other for other in self._semaphores if other.is_closed()]:
+                    del self._semaphores[closed]
+            semaphores = self._semaphores.setdefault(loop, {})
+            if tool_name not in semaphores:
+                semaphores[tool_name] = asyncio.Semaphore(self._stats[tool_name].limit)
+            return semaphores[tool_name]
+
+    async def run(self, tool_name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs func(*args, **kwargs) on the pool once a slot for the tool is free.
+
+        Raises ToolSaturatedError if the tool's queue is full, or if no slot
+        frees up within its queue timeout.
+        """
+        self.register(tool_name)
+        stats = self._stats[tool_name]
+        semaphore = self._semaphore(tool_name)
+
+        # Calls admitted but not finished: running, or waiting for a slot
+        admitted = stats.in_flight + stats.queued
+        if stats.max_queue is not None and admitted >= stats.limit + stats.max_queue:
+            stats.rejected += 1
+            raise ToolSaturatedError(tool_name, f"{stats.in_flight} running, {stats.queued} queued")
+        stats.queued += 1
+        stats.peak_queued = max(stats.peak_queued, stats.queued)
+        queued_at = time.perf_counter()
+        # Awaited in this task (not wrapped by wait_for), so a slot granted
+        # just as the timeout or a cancellation lands is released, not lost
+        acquired = False
+        try:
+            async with asyncio.timeout(stats.queue_timeout):
+                await semaphore.acquire()
+                acquired = True
+        except TimeoutError:
+            if acquired:
+                semaphore.release()
+            stats.timed_out += 1
+            raise ToolSaturatedError(tool_name, f"no slot within {stats.queue_timeout:g}s") from None
+        except BaseException:
+            if acquired:
+                semaphore.release()
+            raise
+        finally:
+            stats.queued -= 1
+        started_at = time.perf_counter()
+        stats.wait_seconds_total += started_at - queued_at
+        stats.in_flight += 1
+        try:
+            # Carry context variables over to the worker thread
+            call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+            result = await asyncio.get_running_loop().run_in_executor(self._pool, call)
+            stats.completed += 1
+            return result
+        except BaseException:
+            stats.failed += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.run_seconds_total += time.perf_counter() - started_at
+            semaphore.release()
+
+    def metrics(self) -> Dict[str, dict]:
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+tool_executor = BlockingToolExecutor()
+
+
+def offload_tool(
+    func: Callable[..., Any],
+    max_concurrency: Optional[int] = None,
+    executor: Optional[BlockingToolExecutor] = None,
+    max_queue: Optional[int] = None,
+    queue_timeout: Optional[float] = None,
+) -> Callable[..., Any]:
+    """
+    Wraps a blocking tool function in an async tool that runs on the executor.
+
+    The wrapper keeps the function's name, signature and docstring, so ADK
+    builds the same tool declaration (or MCP tool schema) as for the original.
+    """
+    executor = executor or tool_executor
+    tool_name = func.__name__
+    executor.register(tool_name, max_concurrency, max_queue, queue_timeout)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await executor.run(tool_name, func, *args, **kwargs)
+
+    return wrapper
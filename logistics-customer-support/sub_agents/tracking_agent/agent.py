@@ -1,8 +1,14 @@
 
 from google.adk import Agent
 
+from ..tool_runtime import offload_tool
+from .status_cache import serve_cached_status
+from .store import extract_tracking_numbers, get_tracking_store, sync_tracking_feed
+
 MODEl = "gemini-2.5-pro-preview-05-06"
 
+MAX_BULK_TRACKING_NUMBERS = 200
+
 
 def tracking_tool(tracking_number: str) -> dict:
     """Retrieves tracking based on tracking number
@@ -15,25 +21,61 @@ def tracking_tool(tracking_number: str) -> dict:
 
     """
 
-    mock_tracking_db = {
-        "123456789" : {"status": "delivered", "delivery_date":"11-June-2025", "delivery_note":"Package left with the neighbour. Mr. Jesper signed for the same."},
-        "987654321" : {"status": "delivered", "delivery_date":"12-June-2025"},
-        "123459876" : {"status": "depart_hub", "hub_depart_date":"09-June-2025"},
-    }
-
-    if tracking_number in mock_tracking_db:
-        data = mock_tracking_db[tracking_number]
+    sync_tracking_feed()
+    data = get_tracking_store().get(tracking_number)
+    if data is not None:
         print(f"Got Tracking Data: {data}")
         return data
     else:
         print(f"No tracking data found for tracking number: {tracking_number}")
-        return "No data found for tracking number {tracking_number}"
+        return f"No data found for tracking number {tracking_number}"
+
+def _last_update(data: dict) -> str:
+    for field in ("delivery_date", "hub_depart_date"):
+        if data.get(field):
+            return data[field]
+    return next((value for field, value in data.items() if field.endswith("_date") and value), "")
+
+
+def bulk_tracking_tool(message: str) -> dict:
+    """Retrieves tracking for every tracking number found in a message, in one lookup
+
+        Args:
+            message(str): The user's message, containing one or more 9 digit tracking numbers
+
+        Returns:
+            dict: A table with one row per tracking number and the numbers that were not found
+
+    """
+
+    tracking_numbers = extract_tracking_numbers(message)[:MAX_BULK_TRACKING_NUMBERS]
+    if not tracking_numbers:
+        return {"status": "error", "message": "No 9 digit tracking numbers found in the message"}
+
+    sync_tracking_feed()
+    found = get_tracking_store().get_many(tracking_numbers)
+    rows = ["tracking_number | status | last_update | note"]
+    for tracking_number in tracking_numbers:
+        data = found.get(tracking_number)
+        if data is None:
+            rows.append(f"{tracking_number} | not_found | |")
+        else:
+            rows.append(f"{tracking_number} | {data.get('status', '')} | {_last_update(data)} | {data.get('delivery_note', '')}")
+    print(f"Bulk tracking: {len(found)} of {len(tracking_numbers)} tracking numbers found")
+    return {
+        "status": "success",
+        "requested": len(tracking_numbers),
+        "found": len(found),
+        "table": "\n".join(rows),
+    }
 
 tracking_agent = None
 
 TRACKING_AGENT_INSTRUCTIONS="""You are Tracking Sub-Agent. 
             Your role is to get tracking data using the tracking_tool based on the tracking number. 
             The tracking_number is a 9 digit number. e.g., 987612345
+            If the message contains more than one tracking number, call bulk_tracking_tool once with the whole message
+            instead of calling tracking_tool for each number, and present its table to the user.
             Format the response based on the tools response in a user friendly format
             """
 
@@ -42,7 +84,8 @@ try:
         model=MODEl,
         name="tracking_agent",
         instruction=TRACKING_AGENT_INSTRUCTIONS,
-        tools=[tracking_tool]
+        tools=[offload_tool(tracking_tool, max_concurrency=16), offload_tool(bulk_tracking_tool)],
+        before_agent_callback=serve_cached_status,
     )
     print(f"Agent {tracking_agent.name} defined")
 except Exception as e:
@@ -0,0 +1,93 @@
+"""
+Answers repeat tracking questions from the latest_status view.
+
+The tracking store keeps a precomputed customer-facing summary per shipment.
+It is refreshed only when the change feed brings a new event for that
+shipment. A short status question for known tracking numbers is therefore
+answered from those summaries, and tracking_agent's model is skipped. A
+status question is nothing but tracking numbers, or tracking numbers with
+tracking words ("where is", "status") and no booking or packaging words, read
+with the same patterns the pre-router uses. Anything else, or a message with
+unknown numbers, still goes to the model.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from ..entity_patterns import (
+    BOOKING_KEYWORD_PATTERN,
+    PACKAGING_KEYWORD_PATTERN,
+    TRACKING_KEYWORD_PATTERN,
+    TRACKING_NUMBER_PATTERN,
+)
+from ..tool_runtime import ToolSaturatedError, tool_executor
+from .store import extract_tracking_numbers, get_tracking_store, sync_tracking_feed
+
+TRACKING_STATUS_CACHE_ENABLED = os.environ.get("TRACKING_STATUS_CACHE_ENABLED", "true").lower() == "true"
+# Messages with more words than this (tracking numbers excluded) are more
+# than a status question and are left to the model
+TRACKING_CACHE_MAX_WORDS = int(os.environ.get("TRACKING_CACHE_MAX_WORDS", 25))
+
+# Last summary version served per tracking number, kept in session state
+SERVED_VERSIONS_STATE_KEY = "tracking_served_versions"
+
+cache_stats = {"hits": 0, "misses": 0}
+
+def _user_query(callback_context: CallbackContext) -> str:
+    content = callback_context.user_content
+    if not content or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+def is_status_query(query: str) -> bool:
+    """True if the text around the tracking numbers only asks for their status."""
+    remainder = TRACKING_NUMBER_PATTERN.sub(" ", query)
+    words = remainder.split()
+    if len(words) > TRACKING_CACHE_MAX_WORDS:
+        return False
+    if not any(any(c.isalnum() for c in word) for word in words):
+        return True
+    if BOOKING_KEYWORD_PATTERN.search(remainder) or PACKAGING_KEYWORD_PATTERN.search(remainder):
+        return False
+    return TRACKING_KEYWORD_PATTERN.search(remainder) is not None
+
+
+def _lookup_latest_status(tracking_numbers: List[str]) -> Dict[str, dict]:
+    sync_tracking_feed()
+    return get_tracking_store().get_latest_status(tracking_numbers)
+
+
+async def serve_cached_status(callback_context: CallbackContext) -> Optional[types.Content]:
+    """before_agent_callback: answers from precomputed summaries and skips the agent on a hit."""
+    if not TRACKING_STATUS_CACHE_ENABLED:
+        return None
+    query = _user_query(callback_context)
+    tracking_numbers = extract_tracking_numbers(query)
+    if not tracking_numbers or not is_status_query(query):
+        return None
+
+    # The feed catch-up writes to SQLite, so it runs on the tool pool
+    try:
+        latest = await tool_executor.run("tracking_status_cache", _lookup_latest_status, tracking_numbers)
+    except ToolSaturatedError as e:
+        print(f"Tracking status cache skipped: {e}")
+        return None
+    if len(latest) != len(tracking_numbers):
+        cache_stats["misses"] += 1
+        return None
+
+    served = dict(callback_context.state.get(SERVED_VERSIONS_STATE_KEY) or {})
+    unchanged = sum(1 for n in tracking_numbers if served.get(n) == latest[n]["version"])
+    served.update({n: latest[n]["version"] for n in tracking_numbers})
+    callback_context.state[SERVED_VERSIONS_STATE_KEY] = served
+
+    cache_stats["hits"] += 1
+    print(f"Tracking status served from cache for {len(tracking_numbers)} shipments ({unchanged} unchanged since last asked)")
+    lines = [latest[n]["summary"] for n in tracking_numbers]
+    if unchanged == len(tracking_numbers):
+        lines.append("There has been no update since you last asked.")
+    return types.Content(role="model", parts=[types.Part(text="\n".join(lines))])
@@ -0,0 +1,485 @@
+"""
+Tracking store behind tracking_tool.
+
+TrackingStore is the interface the tracking agent reads shipments through.
+SqliteTrackingStore is the local implementation. Shipments are keyed by
+their 9-digit tracking number, stored as an integer primary key of a
+WITHOUT ROWID table. A point lookup is then a single b-tree search that reads
+the status and details from the same page, with no separate index or rowid
+hop. Millions of shipments can be loaded in batched transactions with
+bulk_load().
+
+Shipment updates arrive as an append-only change feed (shipment_events).
+The store consumes the feed incrementally from a persisted cursor. Each
+event is merged into the shipment, and the latest_status view is refreshed
+with the new status and a precomputed customer-facing summary. The tracking
+agent answers repeat status questions straight from that view.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..entity_patterns import TRACKING_NUMBER_PATTERN
+
+TRACKING_DB_PATH = os.path.abspath(os.environ.get(
+    "TRACKING_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "tracking.db"),
+))
+# Minimum time between two catch-ups on the change feed
+TRACKING_FEED_POLL_SECONDS = float(os.environ.get("TRACKING_FEED_POLL_SECONDS", 2))
+FEED_CONSUME_BATCH_SIZE = 10_000
+FEED_CONSUMER = "tracking_store"
+BULK_LOAD_BATCH_SIZE = 50_000
+# Stays under SQLITE_MAX_VARIABLE_NUMBER of older SQLite builds (999)
+LOOKUP_BATCH_SIZE = 500
+
+# Demo shipments, loaded into an empty store
+MOCK_SHIPMENTS = {
+    "123456789": {"status": "delivered", "delivery_date": "11-June-2025", "delivery_note": "Package left with the neighbour. Mr. Jesper signed for the same."},
+    "987654321": {"status": "delivered", "delivery_date": "12-June-2025"},
+    "123459876": {"status": "depart_hub", "hub_depart_date": "09-June-2025"},
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shipments (
+    tracking_number INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    details TEXT NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS latest_status (
+    tracking_number INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS shipment_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tracking_number INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS feed_cursors (
+    consumer TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+_STATUS_PHRASES = {
+    "booked": "has been booked and is awaiting collection",
+    "collected": "has been collected",
+    "depart_hub": "has departed the hub",
+    "arrive_hub": "has arrived at the hub",
+    "out_for_delivery": "is out for delivery",
+    "delivered": "has been delivered",
+}
+
+
+def parse_tracking_number(tracking_number: str) -> Optional[int]:
+    """Returns the tracking number as an int, or None if it is not 9 digits."""
+    tracking_number = str(tracking_number).strip()
+    if len(tracking_number) != 9 or not tracking_number.isdigit():
+        return None
+    return int(tracking_number)
+
+
+def extract_tracking_numbers(text: str) -> List[str]:
+    """Returns every distinct 9-digit tracking number in text, in order of appearance."""
+    return list(dict.fromkeys(TRACKING_NUMBER_PATTERN.findall(text)))
+
+
+def summarize_shipment(tracking_number: str, details: dict) -> str:
+    """Customer-facing one-line status of a shipment."""
+    status = details.get("status", "unknown")
+    phrase = _STATUS_PHRASES.get(status, f"has status '{status.replace('_', ' ')}'")
+    summary = f"Shipment {tracking_number} {phrase}"
+    if status == "delivered" and details.get("delivery_date"):
+        summary += f" on {details['delivery_date']}"
+    elif status == "depart_hub" and details.get("hub_depart_date"):
+        summary += f" on {details['hub_depart_date']}"
+    elif status != "delivered" and details.get("hub_depart_date"):
+        summary += f" (departed hub on {details['hub_depart_date']})"
+    summary += "."
+    if details.get("delivery_note"):
+        summary += f" {details['delivery_note']}"
+    return summary
+
+
+class TrackingStore:
+    """Base class for tracking stores."""
+
+    def get(self, tracking_number: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def get_many(self, tracking_numbers: Iterable[str]) -> Dict[str, dict]:
+        """Returns the shipments found, keyed by tracking number."""
+        found = {}
+        for tracking_number in tracking_numbers:
+            data = self.get(tracking_number)
+            if data is not None:
+                found[tracking_number] = data
+        return found
+
+    def bulk_load(self, shipments: Iterable[Tuple[str, dict]]) -> int:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def get_latest_status(self, tracking_numbers: Iterable[str]) -> Dict[str, dict]:
+        """Returns {status, summary, version} per tracking number found."""
+        return {
+            tracking_number: {"status": data.get("status", "unknown"), "summary": summarize_shipment(tracking_number, data), "version": 0}
+            for tracking_number, data in self.get_many(tracking_numbers).items()
+        }
+
+    def append_events(self, events: Iterable[dict]) -> int:
+        raise NotImplementedError
+
+    def consume_events(self, limit: int = FEED_CONSUME_BATCH_SIZE) -> int:
+        raise NotImplementedError
+
+
+class SqliteTrackingStore(TrackingStore):
+    """
+    Tracking store backed by SQLite (WAL).
+
+    Safe to share between threads. All access is serialized on one
+    connection, which keeps its compiled statements cached.
+    """
+
+    def __init__(self, db_path: str = TRACKING_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        has_latest_status = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'latest_status'"
+        ).fetchone()
+        self._conn.executescript(_SCHEMA)
+        if not has_latest_status:
+            self._backfill_latest_status()
+
+    def _backfill_latest_status(self, batch_size: int = BULK_LOAD_BATCH_SIZE) -> int:
+        """Summarizes shipments stored before the latest_status view existed."""
+        written = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            rows = self._conn.execute(
+                "SELECT s.tracking_number, s.status, s.details, s.updated_at FROM shipments s "
+                "LEFT JOIN latest_status l ON l.tracking_number = s.tracking_number "
+                "WHERE l.tracking_number IS NULL"
+            )
+            while True:
+                batch = rows.fetchmany(batch_size)
+                if not batch:
+                    break
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO latest_status (tracking_number, status, summary, version, updated_at) VALUES (?, ?, ?, 0, ?)",
+                    [
+                        (key, status, summarize_shipment(f"{key:09d}", json.loads(details)), updated_at)
+                        for key, status, details, updated_at in batch
+                    ],
+                )
+                written += len(batch)
+            self._conn.execute("COMMIT")
+        if written:
+            print(f"Backfilled the latest_status view for {written} shipments")
+        return written
+
+    def get(self, tracking_number: str) -> Optional[dict]:
+        key = parse_tracking_number(tracking_number)
+        if key is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT details FROM shipments WHERE tracking_number = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, tracking_numbers: Iterable[str]) -> Dict[str, dict]:
+        """Resolves many tracking numbers with one IN query per LOOKUP_BATCH_SIZE keys."""
+        keys = {}
+        for tracking_number in tracking_numbers:
+            key = parse_tracking_number(tracking_number)
+            if key is not None:
+                keys[key] = tracking_number
+        with self._lock:
+            rows = self._select_in("SELECT tracking_number, details FROM shipments WHERE tracking_number IN", list(keys))
+        return {keys[key]: json.loads(details) for key, details in rows}
+
+    def bulk_load(self, shipments: Iterable[Tuple[str, dict]], batch_size: int = BULK_LOAD_BATCH_SIZE) -> int:
+        """
+        Inserts or replaces shipments, committing every batch_size rows.
+
+        Rows with an invalid tracking number are skipped. Returns the number
+        of shipments written.
+        """
+        written = 0
+        batch = []
+
+        def flush():
+            # Key order keeps b-tree page splits sequential within a batch
+            batch.sort()
+            with self._lock:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO shipments (tracking_number, status, details, updated_at) VALUES (?, ?, ?, ?)",
+                    [row[:4] for row in batch],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO latest_status (tracking_number, status, summary, version, updated_at) VALUES (?, ?, ?, 0, ?)",
+                    [(row[0], row[1], row[4], row[3]) for row in batch],
+                )
+                self._conn.execute("COMMIT")
+
+        now = time.time()
+        for tracking_number, details in shipments:
+            key = parse_tracking_number(tracking_number)
+            if key is None:
+                continue
+            batch.append((
+                key, details.get("status", "unknown"), json.dumps(details), now,
+                summarize_shipment(f"{key:09d}", details),
+            ))
+            if len(batch) >= batch_size:
+                flush()
+                written += len(batch)
+                batch = []
+        if batch:
+            flush()
+            written += len(batch)
+        return written
+
+    def _select_in(self, sql: str, keys: List[int]) -> List[tuple]:
+        """Runs sql, which ends in an IN clause, for keys in chunks. Caller holds the lock."""
+        rows = []
+        for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            chunk = keys[start:start + LOOKUP_BATCH_SIZE]
+            rows.extend(self._conn.execute(f"{sql} ({','.join('?' * len(chunk))})", chunk).fetchall())
+        return rows
+
+    def get_latest_status(self, tracking_numbers: Iterable[str]) -> Dict[str, dict]:
+        keys = {}
+        for tracking_number in tracking_numbers:
+            key = parse_tracking_number(tracking_number)
+            if key is not None:
+                keys[key] = tracking_number
+        with self._lock:
+            rows = self._select_in(
+                "SELECT tracking_number, status, summary, version FROM latest_status WHERE tracking_number IN",
+                list(keys),
+            )
+        return {
+            keys[key]: {"status": status, "summary": summary, "version": version}
+            for key, status, summary, version in rows
+        }
+
+    def append_events(self, events: Iterable[dict]) -> int:
+        """
+        Appends shipment events to the change feed.
+
+        An event is a dict with a tracking_number and the fields that changed,
+        e.g. {"tracking_number": "123459876", "status": "out_for_delivery"}.
+        Returns the number of events appended.
+        """
+        now = time.time()
+        rows = []
+        for event in events:
+            key = parse_tracking_number(event.get("tracking_number", ""))
+            if key is None:
+                continue
+            fields = {k: v for k, v in event.items() if k != "tracking_number"}
+            rows.append((key, json.dumps(fields), now))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO shipment_events (tracking_number, payload, created_at) VALUES (?, ?, ?)", rows
+            )
+            self._conn.execute("COMMIT")
+        return len(rows)
+
+    def consume_events(self, limit: int = FEED_CONSUME_BATCH_SIZE) -> int:
+        """
+        Applies up to limit events after the feed cursor and advances it.
+
+        Events are merged into the shipment details in feed order. Every
+        touched shipment gets a new latest_status row with a fresh summary and
+        a bumped version. The cursor moves in the same transaction, so an
+        event is applied exactly once even with several processes consuming.
+        Returns the number of events applied.
+        """
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, serializing consumers
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT seq FROM feed_cursors WHERE consumer = ?", (FEED_CONSUMER,)
+                ).fetchone()
+                cursor = row[0] if row else 0
+                events = self._conn.execute(
+                    "SELECT seq, tracking_number, payload FROM shipment_events WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (cursor, limit),
+                ).fetchall()
+                if not events:
+                    self._conn.execute("COMMIT")
+                    return 0
+
+                keys = list({key for _, key, _ in events})
+                details = {
+                    key: json.loads(value)
+                    for key, value in self._select_in(
+                        "SELECT tracking_number, details FROM shipments WHERE tracking_number IN", keys
+                    )
+                }
+                versions = dict(self._select_in(
+                    "SELECT tracking_number, version FROM latest_status WHERE tracking_number IN", keys
+                ))
+                for _, key, payload in events:
+                    details[key] = {**details.get(key, {}), **json.loads(payload)}
+                    versions[key] = versions.get(key, 0) + 1
+
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO shipments (tracking_number, status, details, updated_at) VALUES (?, ?, ?, ?)",
+                    [(key, details[key].get("status", "unknown"), json.dumps(details[key]), now) for key in keys],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO latest_status (tracking_number, status, summary, version, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (key, details[key].get("status", "unknown"),
+                         summarize_shipment(f"{key:09d}", details[key]), versions[key], now)
+                        for key in keys
+                    ],
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO feed_cursors (consumer, seq) VALUES (?, ?)",
+                    (FEED_CONSUMER, events[-1][0]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(events)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM shipments").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[TrackingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_tracking_store() -> TrackingStore:
+    """Returns the process-wide tracking store, seeding the demo shipments into an empty one."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = SqliteTrackingStore()
+                if store.count() == 0:
+                    store.bulk_load(MOCK_SHIPMENTS.items())
+                _store = store
+    return _store
+
+
+_last_feed_sync = 0.0
+_feed_sync_lock = threading.Lock()
+
+
+def sync_tracking_feed(force: bool = False) -> int:
+    """
+    Catches the store up with the change feed.
+
+    Runs at most once per TRACKING_FEED_POLL_SECONDS unless forced, so it is
+    cheap to call before every lookup. Returns the number of events applied.
+    """
+    global _last_feed_sync
+    now = time.monotonic()
+    if not force and now - _last_feed_sync < TRACKING_FEED_POLL_SECONDS:
+        return 0
+    if not _feed_sync_lock.acquire(blocking=False):
+        return 0
+    try:
+        _last_feed_sync = now
+        store = get_tracking_store()
+        applied = 0
+        while True:
+            consumed = store.consume_events()
+            applied += consumed
+            if consumed < FEED_CONSUME_BATCH_SIZE:
+                break
+        if applied:
+            print(f"Applied {applied} shipment events from the change feed")
+        return applied
+    except Exception as e:
+        print(f"Could not consume the shipment change feed: {e}")
+        return 0
+    finally:
+        _feed_sync_lock.release()
+
+
+def benchmark(num_shipments: int = 1_000_000, num_lookups: int = 100_000, db_path: str = "tracking_benchmark.db") -> dict:
+    """
+    Bulk loads num_shipments synthetic shipments and times random point lookups.
+
+    Reports load throughput, lookup latency percentiles (hits and misses
+    mixed), per-key cost of 50-number get_many calls and the on-disk size of
+    the database.
+    """
+    import random
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    store = SqliteTrackingStore(db_path=db_path)
+    statuses = ["booked", "collected", "depart_hub", "arrive_hub", "out_for_delivery", "delivered"]
+    numbers = random.sample(range(100_000_000, 1_000_000_000), num_shipments)
+
+    start = time.perf_counter()
+    store.bulk_load(
+        (str(n), {"status": statuses[n % len(statuses)], "hub_depart_date": "09-June-2025"})
+        for n in numbers
+    )
+    load_seconds = time.perf_counter() - start
+
+    probes = [str(random.choice(numbers)) if i % 10 else str(random.randint(100_000_000, 999_999_999))
+              for i in range(num_lookups)]
+    timings = []
+    for probe in probes:
+        t = time.perf_counter()
+        store.get(probe)
+        timings.append(time.perf_counter() - t)
+    timings.sort()
+
+    # Bulk lookups, as made by bulk_tracking_tool for a pasted list of numbers
+    start = time.perf_counter()
+    for i in range(0, num_lookups, 50):
+        store.get_many(probes[i:i + 50])
+    bulk_us_per_key = (time.perf_counter() - start) / num_lookups * 1e6
+
+    store.close()
+    return {
+        "shipments": num_shipments,
+        "load_per_second": round(num_shipments / load_seconds),
+        "lookup_p50_us": round(timings[len(timings) // 2] * 1e6, 1),
+        "lookup_p99_us": round(timings[int(len(timings) * 0.99)] * 1e6, 1),
+        "get_many_50_us_per_key": round(bulk_us_per_key, 1),
+        "db_bytes": os.path.getsize(db_path),
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark())
@@ -0,0 +1,149 @@
+"""
+Long-lived Google Cloud clients for the OCR service.
+
+Building a storage.Client or vision.ImageAnnotatorClient repeats credential
+discovery and channel/TLS setup, so each is created once and reused:
+
+- Vision: one ImageAnnotatorClient per process. Its gRPC channel is
+  thread-safe and multiplexes concurrent calls.
+- Storage: a fixed pool of STORAGE_CLIENT_POOL_SIZE storage.Clients. Its HTTP
+  session is not meant to be shared across threads, so a call checks a client
+  out for its duration. The number of clients stays fixed however many
+  threads the endpoint and archive pools run.
+
+Clients are created lazily on first use and dropped in a forked child
+(os.register_at_fork), because gRPC channels and HTTP connections must not
+cross a fork. Calls made through track() update per-client counters: calls,
+errors and latency.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+from google.cloud import storage, vision
+
+STORAGE_CLIENT_POOL_SIZE = int(os.environ.get("STORAGE_CLIENT_POOL_SIZE", 8))
+
+
+class ClientStats:
+    def __init__(self):
+        self.created = 0
+        self.calls = 0
+        self.errors = 0
+        self.latency_seconds_total = 0.0
+        self.latency_seconds_max = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "created": self.created,
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_latency_ms": round(self.latency_seconds_total / self.calls * 1000, 3) if self.calls else 0.0,
+            "max_latency_ms": round(self.latency_seconds_max * 1000, 3),
+        }
+
+
+class ManagedClient:
+    """A lazily created client, shared per process or checked out from a fixed-size pool."""
+
+    def __init__(self, name: str, factory: Callable[[], object], pool_size: int = 0):
+        self.name = name
+        self.factory = factory
+        self.pool_size = pool_size
+        self.stats = ClientStats()
+        # Reentrant: get() creates the client, and counts it, while holding the lock
+        self._lock = threading.RLock()
+        self._client = None
+        self._idle: List[object] = []
+        self._available = threading.BoundedSemaphore(pool_size) if pool_size else None
+        self._generation = 0
+
+    def get(self):
+        """The shared client. Pooled clients are only handed out by track()."""
+        if self.pool_size:
+            raise RuntimeError(f"{self.name} clients are pooled, use track()")
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._create()
+        return self._client
+
+    def _create(self):
+        client = self.factory()
+        with self._lock:
+            self.stats.created += 1
+        return client
+
+    def _checkout(self):
+        """Waits for a free pool slot and returns an idle client, or a new one."""
+        self._available.acquire()
+        try:
+            with self._lock:
+                generation = self._generation
+                if self._idle:
+                    return self._idle.pop(), generation
+            return self._create(), generation
+        except BaseException:
+            self._available.release()
+            raise
+
+    def _checkin(self, client, generation: int) -> None:
+        with self._lock:
+            # Clients from before a fork are not reused
+            if generation != self._generation:
+                return
+            self._idle.append(client)
+        self._available.release()
+
+    def reset(self) -> None:
+        """Drops the client(s); the next call creates new ones."""
+        self._lock = threading.RLock()
+        self._client = None
+        self._idle = []
+        self._available = threading.BoundedSemaphore(self.pool_size) if self.pool_size else None
+        self._generation += 1
+
+    @contextmanager
+    def track(self):
+        """Times a call made with this client and counts failures."""
+        if self.pool_size:
+            client, generation = self._checkout()
+        else:
+            client, generation = self.get(), None
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield client
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stats.calls += 1
+                self.stats.errors += failed
+                self.stats.latency_seconds_total += elapsed
+                self.stats.latency_seconds_max = max(self.stats.latency_seconds_max, elapsed)
+            if generation is not None:
+                self._checkin(client, generation)
+
+
+vision_client = ManagedClient("vision", vision.ImageAnnotatorClient)
+storage_client = ManagedClient("storage", storage.Client, pool_size=STORAGE_CLIENT_POOL_SIZE)
+_clients: Dict[str, ManagedClient] = {c.name: c for c in (vision_client, storage_client)}
+
+
+def client_metrics() -> Dict[str, dict]:
+    return {name: client.stats.snapshot() for name, client in _clients.items()}
+
+
+def _reset_after_fork() -> None:
+    for client in _clients.values():
+        client.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -7,9 +7,9 @@ import os
 import sys
 import logging
 import base64
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-# Add the project root to the Python path
+# Add the project root to the Python path (the image copies sub_agents/tool_runtime there too)
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(project_root)
 
@@ -18,12 +18,15 @@ from mcp import types as mcp_types
 from mcp.server.lowlevel import Server
 from mcp.server.sse import SseServerTransport
 from starlette.applications import Starlette
+from starlette.responses import JSONResponse
 from starlette.routing import Mount, Route
 from google.adk.tools.function_tool import FunctionTool
 from google.adk.tools.mcp_tool.conversion_utils import adk_to_mcp_tool_type
 
 # Import the original tool functions
-from ocr_api import tool_upload_and_extract, tool_upload_file, tool_extract_pan
+from ocr_api import ArchiveQueueFullError, tool_upload_and_extract, tool_batch_upload_and_extract, tool_upload_file, tool_extract_pan
+from sub_agents.tool_runtime import offload_tool, tool_executor
+from gcp_clients import client_metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -64,10 +67,30 @@ def wrapped_upload_and_extract(file_bytes: str) -> Dict:
     # Convert base64 string to bytes inside the wrapper
     try:
         binary_data = base64.b64decode(file_bytes)
-        return tool_upload_and_extract(binary_data)
     except Exception as e:
         logger.error(f"Error decoding base64 in wrapped_upload_and_extract: {e}")
         return {"error": f"Failed to decode base64: {str(e)}"}
+    try:
+        return tool_upload_and_extract(binary_data)
+    except ArchiveQueueFullError as e:
+        return {"error": str(e), "retry_after": e.retry_after}
+
+def wrapped_batch_upload_and_extract(files_base64: List[str]) -> Dict:
+    """Upload several image files and extract text from each with batched OCR.
+    
+    Args:
+        files_base64: The content of each file as a base64-encoded string
+        
+    Returns:
+        Dict: One result per file, in the order given, with extracted text and file information
+    """
+    # Convert base64 strings to bytes inside the wrapper
+    try:
+        binary_files = [base64.b64decode(file_bytes) for file_bytes in files_base64]
+        return tool_batch_upload_and_extract(binary_files)
+    except Exception as e:
+        logger.error(f"Error decoding base64 in wrapped_batch_upload_and_extract: {e}")
+        return {"error": f"Failed to decode base64: {str(e)}"}
 
 def wrapped_extract_pan(text: str) -> Dict:
     """Extract PAN card details from text.
@@ -80,14 +103,18 @@ def wrapped_extract_pan(text: str) -> Dict:
     """
     return tool_extract_pan(text)
 
-# Create FunctionTool objects
-upload_file_tool = FunctionTool(wrapped_upload_file)
-upload_and_extract_tool = FunctionTool(wrapped_upload_and_extract)
-extract_pan_tool = FunctionTool(wrapped_extract_pan)
+# Create FunctionTool objects. The Vision/GCS calls block, so each tool runs
+# on the bounded executor instead of the server's event loop.
+upload_file_tool = FunctionTool(offload_tool(wrapped_upload_file))
+upload_and_extract_tool = FunctionTool(offload_tool(wrapped_upload_and_extract))
+# Each call already fans out over the Vision batch pool
+batch_upload_and_extract_tool = FunctionTool(offload_tool(wrapped_batch_upload_and_extract, max_concurrency=2))
+extract_pan_tool = FunctionTool(offload_tool(wrapped_extract_pan, max_concurrency=16))
 
 # Use the wrapped tools
 tool_objects = [
     upload_and_extract_tool,
+    batch_upload_and_extract_tool,
     upload_file_tool,
     extract_pan_tool
 ]
@@ -160,10 +187,20 @@ async def handle_sse(request):
             streams[0], streams[1], app.create_initialization_options()
         )
 
+async def handle_tool_metrics(request):
+    """Per-tool queue depth, in-flight calls and latency of the tool executor."""
+    return JSONResponse(tool_executor.metrics())
+
+async def handle_client_metrics(request):
+    """Calls, errors and latency of the shared Vision and Storage clients."""
+    return JSONResponse(client_metrics())
+
 starlette_app = Starlette(
     debug=True,
     routes=[
         Route("/sse", endpoint=handle_sse),
+        Route("/metrics/tools", endpoint=handle_tool_metrics),
+        Route("/metrics/clients", endpoint=handle_client_metrics),
         Mount("/messages/", app=sse.handle_post_message),
     ],
 )
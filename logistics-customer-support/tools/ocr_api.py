@@ -1,21 +1,60 @@
 import os
+import sys
 import uuid
 import posixpath
 import re
 import requests
 import json
-from fastapi import FastAPI, File, UploadFile, Form
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from google.cloud import vision, storage
+from fastapi.responses import StreamingResponse
+from google.api_core import exceptions as google_exceptions
+from google.cloud import vision
+import asyncio
 import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
 from google.adk import Agent
 
+from gcp_clients import client_metrics, storage_client, vision_client
+
+# The shared tool executor lives in sub_agents/tool_runtime; the image copies it next to this folder's modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from sub_agents.tool_runtime import BlockingToolExecutor, ToolSaturatedError
+
 # Service URL from environment variable
 MODEL = "gemini-2.0-flash"
 
 GCS_BUCKET_NAME = os.environ.get("GCS_BUCKET_NAME", "logistics_customer_support_bucket")
 IMAGE_TEMP_FOLDER = "image_temp"
 
+# "concurrent": the archival upload to GCS runs alongside OCR and is finished
+# before the response is returned. "background": the response is returned as
+# soon as OCR is done and the upload completes from a queue. The gcs_uri is
+# returned up front with archive_status "pending"; GET /archive_status/ tells
+# whether it was archived or failed.
+GCS_ARCHIVE_MODE = os.environ.get("GCS_ARCHIVE_MODE", "concurrent").lower()
+GCS_ARCHIVE_WORKERS = int(os.environ.get("GCS_ARCHIVE_WORKERS", 8))
+# Uploads queued or running at once; further archive requests are rejected
+# (ArchiveQueueFullError) instead of blocking the caller
+GCS_ARCHIVE_MAX_PENDING = int(os.environ.get("GCS_ARCHIVE_MAX_PENDING", 256))
+GCS_ARCHIVE_RETRIES = 3
+# Archival outcomes remembered for GET /archive_status/
+GCS_ARCHIVE_STATUS_SIZE = int(os.environ.get("GCS_ARCHIVE_STATUS_SIZE", 10_000))
+
+# The HTTP endpoints run their blocking GCS/Vision/LLM work on a bounded pool.
+# Each endpoint has OCR_ENDPOINT_CONCURRENCY slots; up to OCR_ENDPOINT_MAX_QUEUE
+# requests wait for one, for at most OCR_ENDPOINT_QUEUE_TIMEOUT seconds, and
+# the rest get 429. Per-endpoint overrides use the tool_runtime variables,
+# e.g. TOOL_CONCURRENCY_EXTRACT_PAN=8 or TOOL_MAX_QUEUE_UPLOAD_FILE=0.
+OCR_ENDPOINT_WORKERS = int(os.environ.get("OCR_ENDPOINT_WORKERS", 16))
+OCR_ENDPOINT_CONCURRENCY = int(os.environ.get("OCR_ENDPOINT_CONCURRENCY", 4))
+OCR_ENDPOINT_MAX_QUEUE = int(os.environ.get("OCR_ENDPOINT_MAX_QUEUE", 16))
+OCR_ENDPOINT_QUEUE_TIMEOUT = float(os.environ.get("OCR_ENDPOINT_QUEUE_TIMEOUT", 10))
+
 PAN_EXTRACTION_INSTRUCTION = """
 You are an expert information extraction agent. Your task is to extract details from Indian PAN card text with maximum accuracy and completeness.
 
@@ -58,46 +97,114 @@ app.add_middleware(
     allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
 )
 
-def upload_to_gcs_from_bytes(file_bytes: bytes, filename: str = None, bucket_name: str = GCS_BUCKET_NAME) -> str:
+def new_gcs_object_name(filename: str = None) -> str:
+    """Unique object name for an upload, so its gcs_uri is known before the upload runs."""
     if not filename:
         filename = f"upload_{uuid.uuid4().hex}.jpg"
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    unique_name = posixpath.join(IMAGE_TEMP_FOLDER, f"{uuid.uuid4().hex}_{filename}")
-    blob = bucket.blob(unique_name)
-    blob.upload_from_string(file_bytes)
-    return f"gs://{bucket_name}/{unique_name}"
+    return posixpath.join(IMAGE_TEMP_FOLDER, f"{uuid.uuid4().hex}_{filename}")
+
+def upload_to_gcs_from_bytes(file_bytes: bytes, filename: str = None, bucket_name: str = GCS_BUCKET_NAME, object_name: str = None) -> str:
+    if not object_name:
+        object_name = new_gcs_object_name(filename)
+    with storage_client.track() as client:
+        client.bucket(bucket_name).blob(object_name).upload_from_string(file_bytes)
+    return f"gs://{bucket_name}/{object_name}"
+
+_archive_pool = ThreadPoolExecutor(max_workers=GCS_ARCHIVE_WORKERS, thread_name_prefix="gcs-archive")
+_archive_slots = threading.BoundedSemaphore(GCS_ARCHIVE_MAX_PENDING)
+
+_archive_outcomes: "OrderedDict[str, dict]" = OrderedDict()
+_archive_outcomes_lock = threading.Lock()
+
+class ArchiveQueueFullError(ToolSaturatedError):
+    """
+    Raised when GCS_ARCHIVE_MAX_PENDING uploads are already queued or running.
+
+    A ToolSaturatedError, so run_endpoint answers it with 429 and Retry-After.
+    """
+
+def _record_archive_outcome(gcs_uri: str, outcome: dict) -> None:
+    with _archive_outcomes_lock:
+        _archive_outcomes[gcs_uri] = outcome
+        _archive_outcomes.move_to_end(gcs_uri)
+        while len(_archive_outcomes) > GCS_ARCHIVE_STATUS_SIZE:
+            _archive_outcomes.popitem(last=False)
+
+def _on_archive_done(gcs_uri: str, future: Future) -> None:
+    _archive_slots.release()
+    error = future.exception()
+    _record_archive_outcome(gcs_uri, {"status": "failed", "error": str(error)} if error else {"status": "archived"})
+
+def archive_status(gcs_uri: str) -> dict:
+    """Outcome of a recent archival upload: pending, archived, failed or unknown."""
+    with _archive_outcomes_lock:
+        outcome = _archive_outcomes.get(gcs_uri)
+    return {"gcs_uri": gcs_uri, **(outcome or {"status": "unknown"})}
+
+def _archive_with_retry(file_bytes: bytes, object_name: str, bucket_name: str) -> str:
+    for attempt in range(1, GCS_ARCHIVE_RETRIES + 1):
+        try:
+            return upload_to_gcs_from_bytes(file_bytes, bucket_name=bucket_name, object_name=object_name)
+        except Exception as e:
+            if attempt == GCS_ARCHIVE_RETRIES:
+                logging.error(f"Archival upload of {object_name} failed after {attempt} attempts: {e}")
+                raise
+            time.sleep(0.5 * 2 ** (attempt - 1))
+
+def archive_to_gcs(file_bytes: bytes, filename: str = None, bucket_name: str = GCS_BUCKET_NAME):
+    """
+    Starts the archival upload of file_bytes on the archive pool.
+
+    Returns the gcs_uri the object will have and a future for the upload.
+    Raises ArchiveQueueFullError, without waiting, if the archive queue is full.
+    """
+    object_name = new_gcs_object_name(filename)
+    if not _archive_slots.acquire(blocking=False):
+        raise ArchiveQueueFullError("gcs_archive", f"{GCS_ARCHIVE_MAX_PENDING} archival uploads pending")
+    gcs_uri = f"gs://{bucket_name}/{object_name}"
+    _record_archive_outcome(gcs_uri, {"status": "pending"})
+    future = _archive_pool.submit(_archive_with_retry, file_bytes, object_name, bucket_name)
+    future.add_done_callback(lambda done: _on_archive_done(gcs_uri, done))
+    return gcs_uri, future
+
+def background_upload_state(upload: Future) -> Tuple[Optional[str], str]:
+    """(upload error, archive_status) of an upload that is not waited for."""
+    if not upload.done():
+        return None, "pending"
+    error = upload.exception()
+    return (str(error), "failed") if error else (None, "archived")
 
 def download_gcs_blob_as_bytes(gcs_uri: str) -> bytes:
     assert gcs_uri.startswith("gs://")
     parts = gcs_uri.replace("gs://", "").split("/", 1)
     bucket_name, blob_name = parts[0], parts[1]
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-    return blob.download_as_bytes()
+    with storage_client.track() as client:
+        return client.bucket(bucket_name).blob(blob_name).download_as_bytes()
+
+OCR_LANGUAGE_HINTS = ["en", "hi", "ta"]
+
+def _ocr_result_from_response(response) -> dict:
+    """Turns one Vision AnnotateImageResponse into the OCR result dict."""
+    if response.error.message:
+        return {"error": response.error.message}
+    if response.full_text_annotation and response.full_text_annotation.text:
+        return {"full_text": response.full_text_annotation.text.strip()}
+    if response.text_annotations:
+        return {"full_text": response.text_annotations[0].description.strip()}
+    return {"error": "No text found in image."}
 
 def extract_id_details_from_bytes(image_bytes: bytes) -> dict:
     try:
-        client = vision.ImageAnnotatorClient()
         image = vision.Image(content=image_bytes)
-        response = client.document_text_detection(
-            image=image,
-            image_context={
-                "language_hints": ["en", "hi", "ta"],
-                "text_detection_params": {"enable_text_detection_confidence_score": True}
-            }
-        )
-        if response.error.message:
-            return {"error": response.error.message}
-        extracted_text = ""
-        if response.full_text_annotation and response.full_text_annotation.text:
-            extracted_text = response.full_text_annotation.text
-        elif response.text_annotations:
-            extracted_text = response.text_annotations[0].description
-        else:
-            return {"error": "No text found in image."}
-        return {"full_text": extracted_text.strip()}
+        with vision_client.track() as client:
+            response = client.document_text_detection(
+                image=image,
+                image_context={
+                    "language_hints": OCR_LANGUAGE_HINTS,
+                    "text_detection_params": {"enable_text_detection_confidence_score": True}
+                }
+            )
+        return _ocr_result_from_response(response)
     except Exception as e:
         return {"error": str(e)}
 
@@ -107,6 +214,189 @@ def extract_id_details_from_gcs(gcs_uri: str) -> dict:
     result["gcs_uri"] = gcs_uri
     return result
 
+# --- Batch OCR ---
+
+# Vision accepts at most 16 images per synchronous batch_annotate_images request,
+# and about 10 MB of request JSON, where image content is base64 (4/3 larger)
+VISION_BATCH_SIZE = 16
+VISION_BATCH_MAX_BYTES = int(os.environ.get("VISION_BATCH_MAX_BYTES", 7 * 1024 * 1024))
+OCR_BATCH_CONCURRENCY = int(os.environ.get("OCR_BATCH_CONCURRENCY", 4))
+OCR_BATCH_MAX_IMAGES = int(os.environ.get("OCR_BATCH_MAX_IMAGES", 256))
+# Images that may be waiting for or in a Vision call at once, across all
+# batches; a batch that would go over the limit is refused (429 over HTTP)
+OCR_BATCH_MAX_PENDING_IMAGES = int(os.environ.get("OCR_BATCH_MAX_PENDING_IMAGES", 4 * OCR_BATCH_MAX_IMAGES))
+
+_vision_batch_pool = ThreadPoolExecutor(max_workers=OCR_BATCH_CONCURRENCY, thread_name_prefix="vision-batch")
+_vision_pending_lock = threading.Lock()
+_vision_pending_images = 0
+
+def _reserve_vision_images(count: int) -> None:
+    """Reserves room on the batch pool for count images, or raises ToolSaturatedError."""
+    global _vision_pending_images
+    with _vision_pending_lock:
+        if _vision_pending_images + count > OCR_BATCH_MAX_PENDING_IMAGES:
+            raise ToolSaturatedError(
+                "batch_extract", f"{_vision_pending_images} of {OCR_BATCH_MAX_PENDING_IMAGES} images queued for Vision"
+            )
+        _vision_pending_images += count
+
+def _release_vision_images(count: int) -> None:
+    global _vision_pending_images
+    with _vision_pending_lock:
+        _vision_pending_images -= count
+
+def _submit_groups(groups: List[List[Tuple[int, bytes]]]) -> List[Future]:
+    """Submits reserved groups to the batch pool; each group frees its room when it finishes."""
+    futures = []
+    for group in groups:
+        future = _vision_batch_pool.submit(_annotate_group, group)
+        future.add_done_callback(lambda _, count=len(group): _release_vision_images(count))
+        futures.append(future)
+    return futures
+
+def _group_images(indexed: List[Tuple[int, bytes]]) -> List[List[Tuple[int, bytes]]]:
+    """Groups (index, image) pairs in order, by VISION_BATCH_SIZE images and VISION_BATCH_MAX_BYTES."""
+    groups, group, group_bytes = [], [], 0
+    for index, image_bytes in indexed:
+        if group and (len(group) >= VISION_BATCH_SIZE or group_bytes + len(image_bytes) > VISION_BATCH_MAX_BYTES):
+            groups.append(group)
+            group, group_bytes = [], 0
+        group.append((index, image_bytes))
+        group_bytes += len(image_bytes)
+    if group:
+        groups.append(group)
+    return groups
+
+def _is_size_error(error: Exception) -> bool:
+    """A request rejected for its size: INVALID_ARGUMENT from Vision, or RESOURCE_EXHAUSTED from the gRPC message limit."""
+    message = str(error).lower()
+    return isinstance(error, google_exceptions.InvalidArgument) or "larger than" in message or "exceeds" in message
+
+def _annotate_group(group: List[Tuple[int, bytes]]) -> List[Tuple[int, dict]]:
+    """
+    Runs one batch_annotate_images call for up to VISION_BATCH_SIZE (index, image) pairs.
+
+    If Vision rejects the request as too large, the group is split in half and
+    each half retried.
+    """
+    batch_requests = [
+        vision.AnnotateImageRequest(
+            image=vision.Image(content=image_bytes),
+            features=[vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)],
+            image_context=vision.ImageContext(
+                language_hints=OCR_LANGUAGE_HINTS,
+                text_detection_params=vision.TextDetectionParams(enable_text_detection_confidence_score=True),
+            ),
+        )
+        for _, image_bytes in group
+    ]
+    try:
+        with vision_client.track() as client:
+            response = client.batch_annotate_images(requests=batch_requests)
+        return [(index, _ocr_result_from_response(r)) for (index, _), r in zip(group, response.responses)]
+    except (google_exceptions.InvalidArgument, google_exceptions.ResourceExhausted) as e:
+        if len(group) == 1 or not _is_size_error(e):
+            return [(index, {"error": str(e)}) for index, _ in group]
+        middle = len(group) // 2
+        logging.warning(f"Vision rejected a batch of {len(group)} images ({e}), retrying in two halves")
+        return _annotate_group(group[:middle]) + _annotate_group(group[middle:])
+    except Exception as e:
+        return [(index, {"error": str(e)}) for index, _ in group]
+
+def _start_archive(image: bytes, filename: Optional[str]):
+    """archive_to_gcs for one batch item; a full queue fails only that item's upload."""
+    try:
+        return archive_to_gcs(image, filename)
+    except ArchiveQueueFullError as e:
+        upload = Future()
+        upload.set_exception(e)
+        return None, upload
+
+def _prepare_batch(images: List[bytes], filenames: Optional[List[str]], archive: bool):
+    """
+    Starts the archive uploads and the Vision calls of a batch.
+
+    Raises ToolSaturatedError, before anything is started, when the batch
+    pool has no room for the images.
+    """
+    if len(images) > OCR_BATCH_MAX_IMAGES:
+        raise ValueError(f"At most {OCR_BATCH_MAX_IMAGES} images per batch, got {len(images)}")
+    _reserve_vision_images(len(images))
+    try:
+        filenames = list(filenames or [])
+        filenames += [None] * (len(images) - len(filenames))
+        uploads = [_start_archive(image, name) if archive else (None, None) for image, name in zip(images, filenames)]
+        groups = _group_images(list(enumerate(images)))
+    except BaseException:
+        _release_vision_images(len(images))
+        raise
+    return filenames, uploads, _submit_groups(groups)
+
+def _batch_item(index: int, filename: Optional[str], gcs_uri: Optional[str], ocr_result: dict,
+                upload_error: Optional[str], archive_status: Optional[str] = None) -> dict:
+    item = {"index": index, "filename": filename, "ocr_result": ocr_result}
+    if gcs_uri:
+        item["gcs_uri"] = gcs_uri
+    if archive_status:
+        item["archive_status"] = archive_status
+    if upload_error:
+        item["error"] = f"Failed to upload file to Google Cloud Storage: {upload_error}"
+    elif "error" in ocr_result:
+        item["error"] = ocr_result["error"]
+    return item
+
+def batch_extract(images: List[bytes], filenames: Optional[List[str]] = None, archive: bool = True) -> Iterator[dict]:
+    """
+    OCRs many images with Vision batch annotation.
+
+    Images are grouped into requests of at most VISION_BATCH_SIZE images and
+    VISION_BATCH_MAX_BYTES, and the groups run
+    concurrently on the batch pool. Per-image results are yielded as their
+    group completes, so they are not in input order; each carries its index.
+    With archive, every image is also archived to GCS (see GCS_ARCHIVE_MODE).
+    """
+    filenames, uploads, futures = _prepare_batch(images, filenames, archive)
+    for future in as_completed(futures):
+        for index, ocr_result in future.result():
+            gcs_uri, upload = uploads[index]
+            upload_error, archive_status = None, None
+            if upload is not None and GCS_ARCHIVE_MODE == "background":
+                upload_error, archive_status = background_upload_state(upload)
+            elif upload is not None:
+                try:
+                    upload.result()
+                except Exception as e:
+                    upload_error = str(e)
+            yield _batch_item(index, filenames[index], gcs_uri, ocr_result, upload_error, archive_status)
+
+async def batch_extract_stream(images: List[bytes], filenames: Optional[List[str]] = None, archive: bool = True) -> AsyncIterator[dict]:
+    """
+    Async form of batch_extract, for streaming HTTP responses.
+
+    The batch is prepared on the endpoint pool under the "batch_extract"
+    limits, so this raises ToolSaturatedError when that pool, or the Vision
+    batch pool, is saturated.
+    """
+    prepared = await endpoint_executor.run("batch_extract", _prepare_batch, images, filenames, archive)
+    async for item in stream_prepared_batch(*prepared):
+        yield item
+
+async def stream_prepared_batch(filenames: List[Optional[str]], uploads: list, futures: List[Future]) -> AsyncIterator[dict]:
+    """Yields the items of a batch from _prepare_batch as its Vision groups complete."""
+    pending = [asyncio.wrap_future(future) for future in futures]
+    for next_group in asyncio.as_completed(pending):
+        for index, ocr_result in await next_group:
+            gcs_uri, upload = uploads[index]
+            upload_error, archive_status = None, None
+            if upload is not None and GCS_ARCHIVE_MODE == "background":
+                upload_error, archive_status = background_upload_state(upload)
+            elif upload is not None:
+                try:
+                    await asyncio.wrap_future(upload)
+                except Exception as e:
+                    upload_error = str(e)
+            yield _batch_item(index, filenames[index], gcs_uri, ocr_result, upload_error, archive_status)
+
 # --- Tool functions for MCP agent ---
 
 def tool_upload_and_extract(file_bytes: bytes, filename: str = None):
@@ -121,6 +411,7 @@ def tool_upload_and_extract(file_bytes: bytes, filename: str = None):
         dict: A dictionary containing:
             {
                 "gcs_uri": str,  # The Google Cloud Storage URI where the file was uploaded
+                "archive_status": str,  # Only with GCS_ARCHIVE_MODE=background: "pending" until the upload finishes
                 "ocr_result": {
                     "full_text": str,  # The full text extracted from the image
                     # Additional extracted fields if available
@@ -128,32 +419,71 @@ def tool_upload_and_extract(file_bytes: bytes, filename: str = None):
             }
             
             If an error occurs, returns: {"error": error_message}
+
+    Raises:
+        ArchiveQueueFullError: The archive queue is full; retry after its retry_after seconds.
     """
     if not file_bytes or not isinstance(file_bytes, bytes):
         return {"error": "No file data provided or invalid file format."}
     
     try:
-        # Upload the file to GCS
-        gcs_uri = upload_to_gcs_from_bytes(file_bytes, filename)
-        if not gcs_uri:
-            return {"error": "Failed to upload file to Google Cloud Storage."}
-            
-        print(f"Successfully uploaded file to: {gcs_uri}")
-        
-        # Extract text using OCR
-        ocr_result = extract_id_details_from_gcs(gcs_uri)
+        # Archive to GCS while OCR runs on the bytes already in memory
+        gcs_uri, upload = archive_to_gcs(file_bytes, filename)
+        ocr_result = extract_id_details_from_bytes(file_bytes)
+        ocr_result["gcs_uri"] = gcs_uri
+
+        archive_state = {}
+        if GCS_ARCHIVE_MODE == "background":
+            upload_error, archive_state["archive_status"] = background_upload_state(upload)
+            if upload_error:
+                return {"error": f"Failed to upload file to Google Cloud Storage: {upload_error}"}
+        else:
+            try:
+                upload.result()
+            except Exception as e:
+                return {"error": f"Failed to upload file to Google Cloud Storage: {e}"}
+            print(f"Successfully uploaded file to: {gcs_uri}")
+
         if not ocr_result or "error" in ocr_result:
             error_msg = ocr_result.get("error", "Unknown error during OCR processing.")
-            return {"error": error_msg, "gcs_uri": gcs_uri}
+            return {"error": error_msg, "gcs_uri": gcs_uri, **archive_state}
             
         print(f"Successfully extracted text from image at {gcs_uri}")
-        return {"gcs_uri": gcs_uri, "ocr_result": ocr_result}
+        return {"gcs_uri": gcs_uri, "ocr_result": ocr_result, **archive_state}
         
+    except ArchiveQueueFullError:
+        # Saturation, not bad input: the endpoint answers 429
+        raise
     except Exception as e:
         error_message = f"Error in upload and extract process: {str(e)}"
         print(error_message)
         return {"error": error_message}
 
+def tool_batch_upload_and_extract(files: List[bytes], filenames: List[str] = None):
+    """
+    Archives many image files to Google Cloud Storage and extracts their text with batched OCR.
+
+    Args:
+        files (List[bytes]): The binary content of each image file.
+        filenames (List[str], optional): The name of each file, in the same order.
+
+    Returns:
+        dict: {"results": [...]} with one entry per image, ordered by index:
+            {"index": int, "filename": str, "gcs_uri": str, "ocr_result": {"full_text": str}}
+            Entries that failed also carry an "error" message. With GCS_ARCHIVE_MODE=background,
+            entries carry an "archive_status" ("pending" until the upload finishes).
+    """
+    if not files or not all(isinstance(f, bytes) and f for f in files):
+        return {"error": "No file data provided or invalid file format."}
+    try:
+        results = sorted(batch_extract(files, filenames), key=lambda item: item["index"])
+        print(f"Batch OCR finished for {len(results)} images")
+        return {"results": results}
+    except Exception as e:
+        error_message = f"Error in batch upload and extract process: {str(e)}"
+        print(error_message)
+        return {"error": error_message}
+
 def tool_upload_file(file_bytes: bytes, filename: str = None):
     """
     Uploads an image file to Google Cloud Storage.
@@ -213,29 +543,78 @@ def tool_extract_pan(text: str) -> dict:
         error_message = f"Error extracting PAN card details: {str(e)}"
         logging.error(error_message)
         return {"error": error_message}
+
+
+def extract_pan_from_upload(file_bytes: bytes = None, text: str = None) -> dict:
+    if file_bytes:
+        ocr_result = extract_id_details_from_bytes(file_bytes)
+        text = ocr_result.get("full_text", "")
+    elif not text:
+        return {"error": "No file or text provided."}
+    return tool_extract_pan(text)
+
 # --- FastAPI endpoints ---
 
+endpoint_executor = BlockingToolExecutor(
+    max_workers=OCR_ENDPOINT_WORKERS,
+    default_concurrency=OCR_ENDPOINT_CONCURRENCY,
+    thread_name_prefix="ocr-endpoint",
+)
+for _endpoint in ("upload_and_extract", "batch_extract", "upload_file", "extract_pan"):
+    endpoint_executor.register(_endpoint, max_queue=OCR_ENDPOINT_MAX_QUEUE, queue_timeout=OCR_ENDPOINT_QUEUE_TIMEOUT)
+
+async def run_endpoint(endpoint: str, func, *args):
+    """Runs the blocking part of an endpoint on the endpoint pool, answering 429 when it is saturated."""
+    try:
+        return await endpoint_executor.run(endpoint, func, *args)
+    except ToolSaturatedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+
+@app.get("/metrics/clients")
+async def clients_metrics():
+    return client_metrics()
+
+@app.get("/metrics/endpoints")
+async def endpoints_metrics():
+    return endpoint_executor.metrics()
+
 @app.post("/upload_and_extract/")
 async def upload_and_extract(file: UploadFile = File(...)):
     file_bytes = await file.read()
-    return tool_upload_and_extract(file_bytes, file.filename)
+    return await run_endpoint("upload_and_extract", tool_upload_and_extract, file_bytes, file.filename)
+
+@app.post("/batch_extract/")
+async def batch_upload_and_extract(files: List[UploadFile] = File(...)):
+    """Streams one NDJSON line per image as its Vision batch completes."""
+    if len(files) > OCR_BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {OCR_BATCH_MAX_IMAGES} images per batch, got {len(files)}")
+    images = [await file.read() for file in files]
+    filenames = [file.filename for file in files]
+    # Admitted before the response starts, so a saturated endpoint or Vision pool answers 429
+    prepared = await run_endpoint("batch_extract", _prepare_batch, images, filenames, True)
+
+    async def results():
+        async for item in stream_prepared_batch(*prepared):
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.get("/archive_status/")
+async def get_archive_status(gcs_uri: str):
+    """Whether a gcs_uri returned with archive_status "pending" was archived or failed."""
+    return archive_status(gcs_uri)
 
 @app.post("/upload/")
 async def upload_file(file: UploadFile = File(...)):
     file_bytes = await file.read()
-    return tool_upload_file(file_bytes, file.filename)
+    return await run_endpoint("upload_file", tool_upload_file, file_bytes, file.filename)
 
 @app.post("/extract/")
 async def extract_pan(file: UploadFile = File(None), text: str = Form(None)):
-    if file:
-        file_bytes = await file.read()
-        ocr_result = extract_id_details_from_bytes(file_bytes)
-        text_to_extract = ocr_result.get("full_text", "")
-    elif text:
-        text_to_extract = text
-    else:
+    if not file and not text:
         return {"error": "No file or text provided."}
-    return tool_extract_pan(text_to_extract)
+    file_bytes = await file.read() if file else None
+    return await run_endpoint("extract_pan", extract_pan_from_upload, file_bytes, text)
 
 if __name__ == "__main__":
     import uvicorn
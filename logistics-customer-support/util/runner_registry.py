@@ -0,0 +1,99 @@
+"""
+Registry of long-lived ADK Runners.
+
+A Runner only wires an agent to its services; the per-turn state lives in the
+session passed to run_async. One Runner per (app, agent) can therefore be
+built once at startup and shared by every concurrent session.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService
+
+
+class RunnerRegistry:
+    """Long-lived Runners keyed by app name and agent name."""
+
+    def __init__(
+        self,
+        session_service: BaseSessionService,
+        artifact_service=None,
+        memory_service=None,
+    ):
+        self.session_service = session_service
+        self.artifact_service = artifact_service
+        self.memory_service = memory_service
+        self._runners: Dict[Tuple[str, str], Runner] = {}
+        self._lock = threading.Lock()
+
+    def _build(self, app_name: str, agent: BaseAgent) -> Runner:
+        return Runner(
+            app_name=app_name,
+            agent=agent,
+            session_service=self.session_service,
+            artifact_service=self.artifact_service,
+            memory_service=self.memory_service,
+        )
+
+    def get(self, app_name: str, agent: BaseAgent) -> Runner:
+        """Returns the Runner for the agent, building it on first use."""
+        key = (app_name, agent.name)
+        runner = self._runners.get(key)
+        if runner is None:
+            with self._lock:
+                runner = self._runners.get(key)
+                if runner is None:
+                    runner = self._build(app_name, agent)
+                    self._runners[key] = runner
+        return runner
+
+    def warm(self, app_name: str, agents: Iterable[Optional[BaseAgent]]) -> None:
+        """Builds the Runners up front so the first turn does not pay for it."""
+        for agent in agents:
+            if agent is not None:
+                self.get(app_name, agent)
+
+    def __len__(self) -> int:
+        return len(self._runners)
+
+
+def benchmark_runner_overhead(agent: BaseAgent, app_name: str, iterations: int = 1000) -> dict:
+    """
+    Measures the per-turn runner setup cost with and without the registry.
+
+    Returns the mean microseconds per turn for building a new Runner on
+    every call (the old call_agent behaviour) and for a registry lookup.
+    """
+    from google.adk.sessions import InMemorySessionService
+
+    session_service = InMemorySessionService()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        Runner(agent=agent, app_name=app_name, session_service=session_service)
+    per_turn_new = (time.perf_counter() - start) / iterations * 1e6
+
+    registry = RunnerRegistry(session_service=session_service)
+    registry.warm(app_name, [agent])
+    start = time.perf_counter()
+    for _ in range(iterations):
+        registry.get(app_name, agent)
+    per_turn_registry = (time.perf_counter() - start) / iterations * 1e6
+
+    return {
+        "iterations": iterations,
+        "new_runner_per_turn_us": round(per_turn_new, 3),
+        "registry_per_turn_us": round(per_turn_registry, 3),
+        "speedup": round(per_turn_new / per_turn_registry, 1) if per_turn_registry else None,
+    }
+
+
+if __name__ == "__main__":
+    from google.adk.agents import LlmAgent
+
+    bench_agent = LlmAgent(name="bench_agent", model="gemini-2.0-flash", instruction="Benchmark agent.")
+    print(benchmark_runner_overhead(bench_agent, app_name="runner-benchmark"))
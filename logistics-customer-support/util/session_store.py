@@ -0,0 +1,517 @@
+"""
+Durable, bounded session service for the ADK runners.
+
+Sessions live in a local SQLite database in WAL mode with a small LRU cache
+of hot sessions in front of it. Events are appended as individual rows, so a
+turn writes only its new events and the changed state, never the whole
+session. Sessions untouched for longer than the TTL are evicted.
+
+All SQLite work runs on one dedicated thread, off the event loop; cache hits
+are served on the loop. Callers always get a copy of the session, as with
+InMemorySessionService, and appended events are applied to the cached
+instance, so a truncated copy from get_session(config=...) never replaces the
+full cached history.
+
+As with the ADK session services, "app:" state is shared by every session of
+the app and "user:" state by every session of the user. They are stored once
+per app and per user, and merged into each session returned. "temp:" state is
+never stored. Creating a session with an id that already exists raises
+AlreadyExistsError.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+SESSION_DB_PATH = os.path.abspath(os.environ.get(
+    "SESSION_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db"),
+))
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", 1024))
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", 7 * 24 * 3600))
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.environ.get("SESSION_SWEEP_INTERVAL_SECONDS", 300))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_last_update ON sessions (last_update_time);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id, seq);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+) WITHOUT ROWID;
+"""
+
+
+def _split_state(state: dict) -> tuple[dict, dict, dict]:
+    """Splits state into its app, user and session scopes, dropping temp keys."""
+    app_state, user_state, session_state = {}, {}, {}
+    for key, value in (state or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app_state[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_state[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_state[key] = value
+    return app_state, user_state, session_state
+
+
+class SqliteSessionService(BaseSessionService):
+    """
+    A session service backed by SQLite (WAL) with an in-process LRU cache.
+
+    Safe to share between threads; all database access is serialized on a
+    single connection. The async methods run their database work on the
+    store's own thread.
+    """
+
+    def __init__(
+        self,
+        db_path: str = SESSION_DB_PATH,
+        cache_size: int = SESSION_CACHE_SIZE,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        sweep_interval_seconds: float = SESSION_SWEEP_INTERVAL_SECONDS,
+    ):
+        self.db_path = os.path.abspath(db_path)
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._cache: "OrderedDict[tuple[str, str, str], Session]" = OrderedDict()
+        # App and user state by (app_name, user_id), for the users of cached sessions
+        self._scope_cache: "OrderedDict[tuple[str, str], tuple[dict, dict]]" = OrderedDict()
+        # _lock guards the connection, _cache_lock the caches and the cached sessions
+        self._lock = threading.RLock()
+        self._cache_lock = threading.Lock()
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+        self._last_sweep = time.time()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    async def _run_db(self, func: Callable[..., Any], *args) -> Any:
+        """Runs blocking database work on the store's thread, in submission order."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, functools.partial(func, *args))
+
+    # --- cache helpers (caller holds _cache_lock) ---
+
+    def _cache_get(self, key: tuple[str, str, str]) -> Optional[Session]:
+        session = self._cache.get(key)
+        if session is not None:
+            self._cache.move_to_end(key)
+        return session
+
+    def _cache_put(self, key: tuple[str, str, str], session: Session) -> None:
+        self._cache[key] = session
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _scopes_get(self, app_name: str, user_id: str) -> Optional[tuple[dict, dict]]:
+        scopes = self._scope_cache.get((app_name, user_id))
+        if scopes is not None:
+            self._scope_cache.move_to_end((app_name, user_id))
+        return scopes
+
+    def _scopes_put(self, app_name: str, user_id: str, scopes: tuple[dict, dict]) -> None:
+        self._scope_cache[(app_name, user_id)] = scopes
+        self._scope_cache.move_to_end((app_name, user_id))
+        while len(self._scope_cache) > self.cache_size:
+            self._scope_cache.popitem(last=False)
+
+    def _is_expired(self, last_update_time: float, now: Optional[float] = None) -> bool:
+        return (now or time.time()) - last_update_time > self.ttl_seconds
+
+    def _maybe_sweep(self) -> None:
+        now = time.time()
+        if now - self._last_sweep >= self.sweep_interval_seconds:
+            self._last_sweep = now
+            self.evict_expired(now)
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Deletes every session (and its events) older than the TTL."""
+        cutoff = (now or time.time()) - self.ttl_seconds
+        with self._lock:
+            expired = self._conn.execute(
+                "SELECT app_name, user_id, id FROM sessions WHERE last_update_time < ?",
+                (cutoff,),
+            ).fetchall()
+            if not expired:
+                return 0
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                expired,
+            )
+            self._conn.execute("DELETE FROM sessions WHERE last_update_time < ?", (cutoff,))
+            self._conn.execute("COMMIT")
+        with self._cache_lock:
+            for key in expired:
+                self._cache.pop(tuple(key), None)
+        return len(expired)
+
+    @staticmethod
+    def _apply_event(session: Session, event: Event) -> None:
+        """Applies an already committed event to the cached session, whose state holds only session keys."""
+        if event.actions and event.actions.state_delta:
+            session.state.update(_split_state(event.actions.state_delta)[2])
+        session.events.append(event)
+        session.last_update_time = event.timestamp
+
+    @staticmethod
+    def _copy(session: Session, scopes: tuple[dict, dict], config: Optional[GetSessionConfig] = None) -> Session:
+        """A deep copy of a cached session with app and user state merged in, and its events filtered by config."""
+        copy = session.model_copy(deep=True)
+        app_state, user_state = json.loads(json.dumps(scopes[0])), json.loads(json.dumps(scopes[1]))
+        copy.state.update({State.APP_PREFIX + key: value for key, value in app_state.items()})
+        copy.state.update({State.USER_PREFIX + key: value for key, value in user_state.items()})
+        if config is not None:
+            events = copy.events
+            if config.after_timestamp:
+                events = [e for e in events if e.timestamp >= config.after_timestamp]
+            if config.num_recent_events:
+                events = events[-config.num_recent_events:]
+            copy.events = events
+        return copy
+
+    def _load_scopes(self, app_name: str, user_id: str) -> tuple[dict, dict]:
+        """Returns the app and user state, from the cache or SQLite. Runs on the database thread."""
+        with self._cache_lock:
+            scopes = self._scopes_get(app_name, user_id)
+        if scopes is not None:
+            return scopes
+        with self._lock:
+            app_row = self._conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+            user_row = self._conn.execute(
+                "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?",
+                (app_name, user_id),
+            ).fetchone()
+        scopes = (json.loads(app_row[0]) if app_row else {}, json.loads(user_row[0]) if user_row else {})
+        with self._cache_lock:
+            self._scopes_put(app_name, user_id, scopes)
+        return scopes
+
+    def _update_scopes(self, app_name: str, user_id: str, app_delta: dict, user_delta: dict) -> None:
+        """
+        Writes app and user state deltas. The caller holds _lock inside an open transaction.
+
+        Other cached users of the app see the app delta too.
+        """
+        if not app_delta and not user_delta:
+            return
+        app_state, user_state = self._load_scopes(app_name, user_id)
+        with self._cache_lock:
+            if app_delta:
+                app_state.update(app_delta)
+                for (cached_app, _), (other_app_state, _) in self._scope_cache.items():
+                    if cached_app == app_name and other_app_state is not app_state:
+                        other_app_state.update(app_delta)
+                app_json = json.dumps(app_state)
+            if user_delta:
+                user_state.update(user_delta)
+                user_json = json.dumps(user_state)
+        if app_delta:
+            self._conn.execute(
+                "INSERT INTO app_states (app_name, state) VALUES (?, ?) "
+                "ON CONFLICT (app_name) DO UPDATE SET state = excluded.state",
+                (app_name, app_json),
+            )
+        if user_delta:
+            self._conn.execute(
+                "INSERT INTO user_states (app_name, user_id, state) VALUES (?, ?, ?) "
+                "ON CONFLICT (app_name, user_id) DO UPDATE SET state = excluded.state",
+                (app_name, user_id, user_json),
+            )
+
+    # --- BaseSessionService ---
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        app_delta, user_delta, session_state = _split_state(state)
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=session_state,
+            last_update_time=time.time(),
+        )
+        scopes = await self._run_db(self._insert_session, session, app_delta, user_delta)
+        with self._cache_lock:
+            return self._copy(session, scopes)
+
+    def _insert_session(self, session: Session, app_delta: dict, user_delta: dict) -> tuple[dict, dict]:
+        """Inserts a new session and its app and user state. Raises AlreadyExistsError for a live session id."""
+        with self._lock:
+            self._maybe_sweep()
+            existing = self._conn.execute(
+                "SELECT last_update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                (session.app_name, session.user_id, session.id),
+            ).fetchone()
+            if existing is not None and not self._is_expired(existing[0]):
+                raise AlreadyExistsError(f"Session with id {session.id} already exists.")
+            if existing is not None:
+                self._delete(session.app_name, session.user_id, session.id)
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO sessions (app_name, user_id, id, state, last_update_time) VALUES (?, ?, ?, ?, ?)",
+                    (session.app_name, session.user_id, session.id, json.dumps(session.state), session.last_update_time),
+                )
+                self._update_scopes(session.app_name, session.user_id, app_delta, user_delta)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        with self._cache_lock:
+            self._cache_put((session.app_name, session.user_id, session.id), session)
+        return self._load_scopes(session.app_name, session.user_id)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        with self._cache_lock:
+            session = self._cache_get(key)
+        if session is None:
+            session = await self._run_db(self._load_into_cache, key)
+            if session is None:
+                return None
+        if self._is_expired(session.last_update_time):
+            await self._run_db(self._delete, app_name, user_id, session_id)
+            return None
+        with self._cache_lock:
+            scopes = self._scopes_get(app_name, user_id)
+        if scopes is None:
+            scopes = await self._run_db(self._load_scopes, app_name, user_id)
+        with self._cache_lock:
+            return self._copy(session, scopes, config)
+
+    def _load_into_cache(self, key: tuple[str, str, str]) -> Optional[Session]:
+        """
+        Loads a session into the cache, unless an earlier task already did.
+
+        Runs on the database thread, so it is ordered with the event writes
+        and never caches a snapshot that misses an appended event.
+        """
+        with self._cache_lock:
+            session = self._cache_get(key)
+        if session is not None:
+            return session
+        with self._lock:
+            session = self._load(*key)
+        if session is not None:
+            with self._cache_lock:
+                self._cache_put(key, session)
+        return session
+
+    def _load(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+        row = self._conn.execute(
+            "SELECT state, last_update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+            (app_name, user_id, session_id),
+        ).fetchone()
+        if row is None:
+            return None
+        events = [
+            Event.model_validate_json(payload)
+            for (payload,) in self._conn.execute(
+                "SELECT payload FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq",
+                (app_name, user_id, session_id),
+            )
+        ]
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=_split_state(json.loads(row[0]))[2],
+            events=events,
+            last_update_time=row[1],
+        )
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        rows = await self._run_db(self._list_rows, app_name, user_id)
+        scopes = await self._run_db(self._load_scopes, app_name, user_id)
+        with self._cache_lock:
+            sessions = [
+                self._copy(
+                    Session(app_name=app_name, user_id=user_id, id=sid, state=json.loads(state), last_update_time=ts),
+                    scopes,
+                )
+                for sid, state, ts in rows
+                if not self._is_expired(ts)
+            ]
+        return ListSessionsResponse(sessions=sessions)
+
+    def _list_rows(self, app_name: str, user_id: str) -> list:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, state, last_update_time FROM sessions WHERE app_name = ? AND user_id = ?",
+                (app_name, user_id),
+            ).fetchall()
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self._run_db(self._delete, app_name, user_id, session_id)
+
+    def _delete(self, app_name: str, user_id: str, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (app_name, user_id, session_id),
+            )
+            self._conn.execute(
+                "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                (app_name, user_id, session_id),
+            )
+            self._conn.execute("COMMIT")
+        with self._cache_lock:
+            self._cache.pop((app_name, user_id, session_id), None)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        await self._run_db(self._write_event, session, event)
+        return event
+
+    def _write_event(self, session: Session, event: Event) -> None:
+        """
+        Persists an event and applies it to the cached session, if any.
+
+        The caller's session may be a truncated copy, so it is never cached
+        itself; only its identity is used.
+        """
+        key = (session.app_name, session.user_id, session.id)
+        with self._cache_lock:
+            cached = self._cache_get(key)
+            if cached is not None:
+                self._apply_event(cached, event.model_copy(deep=True))
+            state = _split_state((cached or session).state)[2]
+        app_delta, user_delta, session_delta = _split_state(event.actions.state_delta if event.actions else {})
+        state_changed = bool(session_delta)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._update_scopes(session.app_name, session.user_id, app_delta, user_delta)
+            self._conn.execute(
+                "INSERT INTO events (app_name, user_id, session_id, timestamp, payload) VALUES (?, ?, ?, ?, ?)",
+                (session.app_name, session.user_id, session.id, event.timestamp, event.model_dump_json(exclude_none=True)),
+            )
+            if state_changed:
+                self._conn.execute(
+                    "UPDATE sessions SET state = ?, last_update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (json.dumps(state), event.timestamp, session.app_name, session.user_id, session.id),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE sessions SET last_update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (event.timestamp, session.app_name, session.user_id, session.id),
+                )
+            self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        self._db_executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+
+async def benchmark(num_sessions: int = 100_000, db_path: str = "session_benchmark.db") -> dict:
+    """
+    Creates num_sessions sessions with one event each, then reads a sample back.
+
+    Reports creation and append throughput, hot (cached) and cold (SQLite)
+    read latency, and the on-disk size of the database.
+    """
+    import random
+
+    from google.genai import types
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    service = SqliteSessionService(db_path=db_path)
+    app_name, user_id = "session-benchmark", "bench_user"
+
+    start = time.perf_counter()
+    for i in range(num_sessions):
+        session = await service.create_session(app_name=app_name, user_id=user_id, session_id=f"s{i}")
+        event = Event(
+            author="user",
+            invocation_id=f"i{i}",
+            content=types.Content(role="user", parts=[types.Part(text=f"track 1234{i:05d}")]),
+        )
+        await service.append_event(session, event)
+    write_seconds = time.perf_counter() - start
+
+    sample = random.sample(range(num_sessions), min(1000, num_sessions))
+    start = time.perf_counter()
+    for i in sample:
+        await service.get_session(app_name=app_name, user_id=user_id, session_id=f"s{i}")
+    cold_read_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    start = time.perf_counter()
+    for i in sample:
+        await service.get_session(app_name=app_name, user_id=user_id, session_id=f"s{i}")
+    hot_read_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    service.close()
+    return {
+        "sessions": num_sessions,
+        "create_and_append_per_second": round(num_sessions / write_seconds),
+        "cold_read_us": round(cold_read_us, 1),
+        "hot_read_us": round(hot_read_us, 1),
+        "cache_size": len(service._cache),
+        "db_bytes": os.path.getsize(db_path),
+    }
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    print(asyncio.run(benchmark()))
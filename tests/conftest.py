@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import the agents the way the ADK loader does, from the project folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "logistics-customer-support")))
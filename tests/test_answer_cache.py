@@ -0,0 +1,51 @@
+import threading
+import time
+
+from sub_agents.faq_agent.answer_cache import SemanticAnswerCache
+from sub_agents.faq_agent.tools.embeddings import embed_text, normalize_query
+
+
+def _similarity(a: str, b: str) -> float:
+    return float(embed_text(normalize_query(a)) @ embed_text(normalize_query(b)))
+
+
+def test_different_question_sharing_most_words_is_not_served():
+    cache = SemanticAnswerCache(similarity_threshold=0.8)
+    cache.store("cancel booking", "To cancel, reply with your booking ID.")
+    cache.store(
+        "Can I cancel my booking after the parcel has been collected from my home address?",
+        "Cancellation is no longer possible once collected.",
+    )
+
+    assert cache.lookup("change booking") is None
+    long_question = "Can I change my booking after the parcel has been collected from my home address?"
+    # Above the threshold on hashed n-grams, but a different question
+    assert _similarity(long_question, "Can I cancel my booking after the parcel has been collected from my home address?") >= 0.8
+    assert cache.lookup(long_question) is None
+
+
+def test_rephrased_question_is_served():
+    cache = SemanticAnswerCache(similarity_threshold=0.8)
+    cache.store("How do I pack glass items?", "Wrap each item in bubble wrap.")
+
+    assert cache.lookup("how should I pack glass items") == "Wrap each item in bubble wrap."
+    # A plural differs in spelling only
+    assert cache.lookup("How do I pack a glass item?") == "Wrap each item in bubble wrap."
+
+
+def test_version_check_runs_off_the_calling_thread():
+    checked_on = []
+    release = threading.Event()
+
+    def slow_version():
+        checked_on.append(threading.current_thread().name)
+        release.wait(5)
+        return "v1"
+
+    cache = SemanticAnswerCache(version_provider=slow_version)
+    start = time.perf_counter()
+    assert cache.lookup("pack glass") is None
+    assert time.perf_counter() - start < 1
+    release.set()
+    cache._version_check.result(timeout=5)
+    assert checked_on and checked_on[0] != threading.current_thread().name
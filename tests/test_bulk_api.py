@@ -0,0 +1,51 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from sub_agents.booking_agent import bulk_api, ledger
+from sub_agents.booking_agent.id_allocator import BookingIdAllocator
+
+HEADER = "collection_address,delivery_address,package_description,package_weight,service_level,contact_email_address"
+ROW = '"1 Main Rd, Leeds","9 High St, York",Documents,{weight},EXPRESS,a@example.com'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(ledger, "_ledger", ledger.BookingLedger(str(tmp_path / "bookings.db")))
+    monkeypatch.setattr(ledger, "booking_id_allocator", BookingIdAllocator(node_id=1))
+    yield TestClient(bulk_api.app)
+    ledger._ledger.close()
+
+
+def _results(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_bulk_csv_import_books_valid_rows_and_is_idempotent(client):
+    body = "\n".join([HEADER, ROW.format(weight=2), ROW.format(weight=99)]) + "\n"
+
+    response = client.post("/bookings/bulk?format=csv&import_id=test-import", content=body)
+    assert response.status_code == 200
+    booked, invalid, summary = _results(response)
+    assert booked["status"] == "success" and not booked["duplicate"]
+    assert invalid["status"] == "error" and "package_weight" in invalid["errors"]
+    assert summary["summary"]["booked"] == 1
+
+    retried = _results(client.post("/bookings/bulk?format=csv&import_id=test-import", content=body))
+    assert retried[0]["booking_id"] == booked["booking_id"] and retried[0]["duplicate"]
+
+
+def test_unknown_csv_column_is_rejected_before_streaming(client):
+    response = client.post("/bookings/bulk?format=csv", content=HEADER + ",colour\n" + ROW.format(weight=2) + ",red\n")
+    assert response.status_code == 400
+    assert "colour" in response.json()["detail"]
+
+
+def test_line_limit_counts_bytes_not_characters(client, monkeypatch):
+    # 32 characters but 62 bytes in UTF-8
+    line = json.dumps("é" * 30, ensure_ascii=False)
+    monkeypatch.setattr(bulk_api, "BULK_MAX_LINE_BYTES", 50)
+
+    results = _results(client.post("/bookings/bulk?format=jsonl", content=line.encode("utf-8")))
+    assert results[0]["status"] == "aborted"
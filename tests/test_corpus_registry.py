@@ -0,0 +1,42 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from sub_agents.faq_agent.tools import utils
+
+RESOURCE = "projects/p/locations/l/ragCorpora/1"
+
+
+def _registry(monkeypatch, listing):
+    calls = []
+
+    def list_corpora():
+        calls.append(time.monotonic())
+        time.sleep(0.05)
+        return listing()
+
+    monkeypatch.setattr(utils.rag, "list_corpora", list_corpora)
+    return utils.CorpusRegistry(ttl_seconds=60, miss_refresh_seconds=60), calls
+
+
+def test_failed_listing_is_not_retried_on_every_lookup(monkeypatch):
+    def listing():
+        raise RuntimeError("Vertex AI unavailable")
+
+    registry, calls = _registry(monkeypatch, listing)
+    for _ in range(5):
+        assert registry.resolve("packaging_guidelines") is None
+    assert len(calls) == 1
+
+
+def test_concurrent_misses_share_one_listing(monkeypatch):
+    registry, calls = _registry(monkeypatch, lambda: [SimpleNamespace(display_name="packaging_guidelines", name=RESOURCE)])
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.resolve("packaging_guidelines"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [RESOURCE] * 8
+    assert len(calls) == 1
@@ -0,0 +1,30 @@
+import time
+
+from sub_agents.booking_agent import id_allocator
+from sub_agents.booking_agent.id_allocator import BookingIdAllocator, decode_booking_id
+
+
+def test_lapsed_lease_is_taken_over_and_its_idle_owner_leases_again(tmp_path):
+    db_path = str(tmp_path / "leases.db")
+    idle = BookingIdAllocator(lease_db_path=db_path, lease_ttl=0.2)
+    idle.next_id()
+    time.sleep(0.3)
+
+    newcomer = BookingIdAllocator(lease_db_path=db_path, lease_ttl=0.2)
+    newcomer.next_id()
+    assert newcomer.node_id == 0
+
+    booking_id = idle.next_id()
+    assert idle.node_id != newcomer.node_id
+    assert decode_booking_id(booking_id)["node_id"] == idle.node_id
+
+
+def test_released_lease_is_reused(tmp_path):
+    db_path = str(tmp_path / "leases.db")
+    first = BookingIdAllocator(lease_db_path=db_path)
+    first.next_id()
+    id_allocator.release_node_lease(first._lease_owner, db_path)
+
+    second = BookingIdAllocator(lease_db_path=db_path)
+    second.next_id()
+    assert second.node_id == first.node_id == 0
@@ -0,0 +1,27 @@
+from sub_agents.faq_agent.tools import retrieval
+
+
+def _write_docs(docs_dir, text):
+    docs_dir.mkdir(exist_ok=True)
+    (docs_dir / "guide.md").write_text(text, encoding="utf-8")
+
+
+def test_rebuilding_the_index_reloads_the_shared_backend_and_keeps_the_old_one_readable(tmp_path, monkeypatch):
+    docs_dir, index_dir = tmp_path / "docs", tmp_path / "index"
+    monkeypatch.setattr(retrieval, "FAQ_LOCAL_INDEX_DIR", str(index_dir))
+    monkeypatch.setattr(retrieval, "_local_backend", None)
+
+    _write_docs(docs_dir, "Wrap glass items in bubble wrap.")
+    retrieval.build_local_index(str(docs_dir), str(index_dir))
+    old = retrieval.get_retrieval_backend("packaging_guidelines", backend="local")
+    assert retrieval.get_retrieval_backend("packaging_guidelines", backend="local") is old
+
+    _write_docs(docs_dir, "Batteries must be taped at the terminals.\n\nLiquids go in sealed bottles.")
+    retrieval.build_local_index(str(docs_dir), str(index_dir))
+    new = retrieval.get_retrieval_backend("packaging_guidelines", backend="local")
+
+    assert new is not old and new.version() != old.version()
+    assert len(new.chunks) == 1 and "Batteries" in new.chunks[0]["text"]
+    # The old backend still reads the embeddings it mapped
+    assert old.retrieve_batch(["glass"], top_k=1, distance_threshold=2.0)[0][0]["text"].startswith("Wrap glass")
+    assert not [name for name in index_dir.iterdir() if name.suffix == ".tmp"]
@@ -0,0 +1,51 @@
+import asyncio
+
+import httpx
+import pytest
+
+# Needs an a2a-sdk release that still ships A2AClient
+remote_agent_connection = pytest.importorskip("remote_agent_connection", exc_type=ImportError)
+PoolStats = remote_agent_connection.PoolStats
+_HostLimitedTransport = remote_agent_connection._HostLimitedTransport
+
+
+class _SlowTransport(httpx.AsyncBaseTransport):
+    """Hangs until the first `hang` requests are cancelled, then answers at once."""
+
+    def __init__(self, hang: int):
+        self.hang = hang
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.hang:
+            self.hang -= 1
+            await asyncio.Event().wait()
+        return httpx.Response(200, content=b"ok")
+
+
+def test_cancelled_requests_release_their_host_slot():
+    stats = PoolStats(per_host_limit=2)
+    transport = _HostLimitedTransport(_SlowTransport(hang=3), per_host_limit=2, stats=stats)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=transport) as client:
+            for _ in range(3):
+                request = asyncio.create_task(client.get("http://agent.local/"))
+                await asyncio.sleep(0.01)
+                request.cancel()
+                await asyncio.gather(request, return_exceptions=True)
+            return await asyncio.wait_for(client.get("http://agent.local/"), 1)
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert stats.in_flight["agent.local"] == 0
+    assert stats.errors_total == 0
+
+
+def test_each_event_loop_gets_its_own_host_semaphores():
+    transport = _HostLimitedTransport(_SlowTransport(hang=0), per_host_limit=1, stats=PoolStats(1))
+
+    async def semaphore():
+        return transport._semaphore("agent.local")
+
+    first, second = asyncio.run(semaphore()), asyncio.run(semaphore())
+    assert first is not second
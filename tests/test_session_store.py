@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from util.session_store import SqliteSessionService
+
+APP, USER = "test-app", "user-1"
+
+
+def _event(text: str, state_delta: dict = None) -> Event:
+    return Event(
+        author="user",
+        invocation_id="inv",
+        content=types.Content(role="user", parts=[types.Part(text=text)]),
+        actions=EventActions(state_delta=state_delta or {}),
+    )
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def test_recreating_a_session_id_is_rejected_and_history_survives_a_reload(db_path):
+    async def scenario():
+        service = SqliteSessionService(db_path=db_path)
+        session = await service.create_session(app_name=APP, user_id=USER, session_id="s1", state={"step": 1})
+        await service.append_event(session, _event("track 123456789"))
+        with pytest.raises(AlreadyExistsError):
+            await service.create_session(app_name=APP, user_id=USER, session_id="s1")
+        service.close()
+
+        reloaded = SqliteSessionService(db_path=db_path)
+        session = await reloaded.get_session(app_name=APP, user_id=USER, session_id="s1")
+        reloaded.close()
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.state == {"step": 1}
+    assert [event.content.parts[0].text for event in session.events] == ["track 123456789"]
+
+
+def test_app_and_user_state_is_shared_across_sessions_and_temp_state_is_dropped(db_path):
+    async def scenario():
+        service = SqliteSessionService(db_path=db_path)
+        first = await service.create_session(app_name=APP, user_id=USER, session_id="s1", state={"app:region": "EU"})
+        await service.append_event(first, _event("hi", {"user:name": "Sam", "temp:scratch": 1, "step": 2}))
+        second = await service.create_session(app_name=APP, user_id=USER, session_id="s2")
+        other_user = await service.create_session(app_name=APP, user_id="user-2", session_id="s3")
+        service.close()
+
+        reloaded = SqliteSessionService(db_path=db_path)
+        first = await reloaded.get_session(app_name=APP, user_id=USER, session_id="s1")
+        reloaded.close()
+        return first, second, other_user
+
+    first, second, other_user = asyncio.run(scenario())
+    assert first.state == {"app:region": "EU", "user:name": "Sam", "step": 2}
+    assert second.state == {"app:region": "EU", "user:name": "Sam"}
+    assert other_user.state == {"app:region": "EU"}
@@ -0,0 +1,22 @@
+import importlib
+
+import pytest
+
+
+def test_tracking_agent_imports_as_a_top_level_package():
+    # The ADK loader imports sub-agents from the project folder, without the host package
+    importlib.import_module("sub_agents.tracking_agent")
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("123456789", True),
+    ("Where is 123456789?", True),
+    ("status of 123456789 and 987654321 please", True),
+    ("book a pickup for the same address as 123456789", False),
+    ("how should I pack the box for 123456789", False),
+    ("my parcel 123456789 was damaged, I want a refund", False),
+])
+def test_is_status_query(query, expected):
+    from sub_agents.tracking_agent.status_cache import is_status_query
+
+    assert is_status_query(query) is expected